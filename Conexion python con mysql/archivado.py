@@ -0,0 +1,150 @@
+"""
+Archivo de préstamos devueltos
+Mueve a `prestamos_historico` los préstamos 'Devuelto' cuya devolución es
+más antigua que DB_ARCHIVO_DIAS, de a un lote por transacción corta. Así la
+tabla `prestamos` conserva solo los préstamos recientes y sus índices siguen
+entrando en memoria; la vista `prestamos_todos` une ambas tablas para las
+consultas sobre el historial completo.
+
+Uso: python archivado.py [--dias DIAS] [--lote N] [--cada SEGUNDOS]
+"""
+import argparse
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+from pymysql import Error
+from pool_conexiones import obtener_conexion, liberar_conexion, cerrar_pool
+from config_database import get_archivado_config
+from migraciones import COLUMNAS_PRESTAMO
+from resiliencia import ErrorBaseDatos, convertir_error
+
+
+def archivar_prestamos(dias=None, tamaño_lote=None, pausa=0, mostrar=True):
+    """
+    Archiva los préstamos devueltos hace más de `dias` días
+
+    Cada lote se bloquea, se copia a prestamos_historico, se borra de
+    prestamos y se confirma en su propia transacción, de modo que el archivo
+    nunca retiene bloqueos sobre toda la tabla. Los préstamos archivados
+    conservan su id.
+
+    Args:
+        dias: Antigüedad mínima de la devolución (por defecto, DB_ARCHIVO_DIAS)
+        tamaño_lote: Préstamos por transacción (por defecto, DB_ARCHIVO_LOTE)
+        pausa: Segundos de espera entre lotes, para que las réplicas no se atrasen
+        mostrar: Si es True, imprime el resumen
+
+    Returns:
+        Cantidad de préstamos archivados
+
+    Raises:
+        ErrorBaseDatos: Si falla la operación en la base de datos; su atributo
+                        `archivados` indica cuántos préstamos se archivaron
+                        (en lotes ya confirmados) antes del error
+    """
+    config = get_archivado_config()
+    dias = config['dias'] if dias is None else dias
+    tamaño_lote = tamaño_lote or config['tamaño_lote']
+    corte = date.today() - timedelta(days=dias)
+    conexion = None
+    cursor = None
+    archivados = 0
+
+    try:
+        conexion = obtener_conexion()
+        cursor = conexion.cursor()
+
+        while True:
+            # Recorre el índice (estado, fecha_devolucion_real)
+            cursor.execute("""
+                SELECT id FROM prestamos
+                WHERE estado = 'Devuelto' AND fecha_devolucion_real < %s
+                ORDER BY fecha_devolucion_real, id
+                LIMIT %s
+                FOR UPDATE
+            """, (corte, tamaño_lote))
+            ids = [fila[0] for fila in cursor.fetchall()]
+            if not ids:
+                break
+
+            marcadores = ', '.join(['%s'] * len(ids))
+            cursor.execute(
+                f"INSERT INTO prestamos_historico ({COLUMNAS_PRESTAMO}) "
+                f"SELECT {COLUMNAS_PRESTAMO} FROM prestamos WHERE id IN ({marcadores})", ids)
+            cursor.execute(f"DELETE FROM prestamos WHERE id IN ({marcadores})", ids)
+            conexion.commit()
+            archivados += len(ids)
+
+            if len(ids) < tamaño_lote:
+                break
+            if pausa:
+                time.sleep(pausa)
+
+        if mostrar:
+            print(f"🗄️ Préstamos archivados (devueltos antes del {corte}): {archivados}")
+        return archivados
+    except Error as e:
+        error = convertir_error(e, "archivar préstamos")
+        error.archivados = archivados
+        if error is e:
+            raise
+        raise error from e
+    finally:
+        if cursor:
+            cursor.close()
+        if conexion:
+            liberar_conexion(conexion)
+
+
+def programar_archivado(intervalo=86400, dias=None, tamaño_lote=None, pausa=0):
+    """
+    Ejecuta archivar_prestamos periódicamente en un hilo en segundo plano
+
+    Args:
+        intervalo: Segundos entre ejecuciones
+        dias: Antigüedad mínima de la devolución
+        tamaño_lote: Préstamos por transacción
+        pausa: Segundos de espera entre lotes
+
+    Returns:
+        threading.Event que detiene el archivo al llamar a .set()
+    """
+    detener = threading.Event()
+
+    def ciclo():
+        while not detener.is_set():
+            try:
+                archivar_prestamos(dias, tamaño_lote, pausa, mostrar=False)
+            except ErrorBaseDatos as e:
+                # El próximo ciclo retoma desde el primer lote sin archivar
+                print(f"❌ {e}", file=sys.stderr)
+            detener.wait(intervalo)
+
+    threading.Thread(target=ciclo, name='archivo-prestamos', daemon=True).start()
+    return detener
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archiva los préstamos devueltos antiguos")
+    parser.add_argument('--dias', type=int, help="Antigüedad mínima de la devolución")
+    parser.add_argument('--lote', type=int, help="Préstamos por transacción")
+    parser.add_argument('--pausa', type=float, default=0, help="Segundos entre lotes")
+    parser.add_argument('--cada', type=float, help="Repetir cada N segundos (sin esto, una sola vez)")
+    args = parser.parse_args()
+
+    try:
+        archivar_prestamos(args.dias, args.lote, args.pausa)
+        while args.cada:
+            time.sleep(args.cada)
+            archivar_prestamos(args.dias, args.lote, args.pausa)
+    except ErrorBaseDatos as e:
+        print(f"❌ {e}")
+        if e.archivados:
+            print(f"   Se archivaron {e.archivados} préstamos antes del error")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cerrar_pool()
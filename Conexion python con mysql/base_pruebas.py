@@ -0,0 +1,58 @@
+"""
+Base de datos de las pruebas
+Las pruebas corren sobre una base SQLite temporal, compartida por todos los
+módulos de prueba de una misma ejecución y borrada al terminar. Con
+BIBLIOTECA_PRUEBAS_MYSQL=1 usan en cambio la base MySQL configurada en .env.
+
+El motor se elige al importar config_database, así que cada módulo de
+prueba importa este módulo antes que la biblioteca. Cada prueba crea sus
+propios libros y personas con nombres que no se repiten entre módulos.
+"""
+import atexit
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+PRUEBAS_MYSQL = os.getenv('BIBLIOTECA_PRUEBAS_MYSQL') == '1'
+
+if not PRUEBAS_MYSQL:
+    DIRECTORIO_TEMPORAL = tempfile.mkdtemp(prefix='biblioteca_pruebas_')
+    os.environ['DB_MOTOR'] = 'sqlite'
+    os.environ['DB_SQLITE_RUTA'] = os.path.join(DIRECTORIO_TEMPORAL, 'biblioteca.db')
+    atexit.register(shutil.rmtree, DIRECTORIO_TEMPORAL, ignore_errors=True)
+
+from pool_conexiones import cerrar_pool, obtener_conexion, liberar_conexion  # noqa: E402
+from conexion_pymysql import crear_estructura_biblioteca  # noqa: E402
+
+# atexit ejecuta en orden inverso: el pool se cierra antes de borrar el archivo
+atexit.register(cerrar_pool)
+
+
+def en_silencio(funcion, *args, **kwargs):
+    """Ejecuta la función sin los mensajes que la biblioteca imprime en stdout"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return funcion(*args, **kwargs)
+
+
+def consultar(query, params=None):
+    """Retorna las filas (tuplas) de una consulta sobre la base de las pruebas"""
+    conexion = obtener_conexion()
+    try:
+        with conexion.cursor() as cursor:
+            cursor.execute(query, params)
+            filas = list(cursor.fetchall())
+        conexion.commit()
+        return filas
+    finally:
+        liberar_conexion(conexion)
+
+
+class PruebaBiblioteca(unittest.TestCase):
+    """Prueba que necesita las tablas y migraciones de la biblioteca"""
+
+    @classmethod
+    def setUpClass(cls):
+        en_silencio(crear_estructura_biblioteca)
@@ -0,0 +1,809 @@
+"""
+Benchmarks de la biblioteca hogareña contra la base configurada en .env
+Uso:
+    python benchmark_biblioteca.py importacion --filas 5000 --lote 1000
+    python benchmark_biblioteca.py busqueda --libros 1000000
+    python benchmark_biblioteca.py estres-prestamos --hilos 8 --libros 3
+    python benchmark_biblioteca.py concurrencia --solicitudes 2000
+    python benchmark_biblioteca.py sentencias --repeticiones 2000
+    python benchmark_biblioteca.py presentacion --libros 100000
+    python benchmark_biblioteca.py memoria-filas --filas 100000
+    python benchmark_biblioteca.py sesion --operaciones 1000
+    python benchmark_biblioteca.py suite --escala 1m --comparar base.json
+    python benchmark_biblioteca.py limpiar
+
+Los libros de prueba se marcan en `notas` y se borran al terminar.
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+from pool_conexiones import obtener_conexion, liberar_conexion, cerrar_pool
+from config_database import get_motor
+from resiliencia import ConflictoTransaccionError
+from datos_sinteticos import (
+    MARCA_BENCHMARK, PALABRAS_TITULO, NOMBRES, APELLIDOS, ESCALAS,
+    GeneradorBiblioteca, sembrar_biblioteca, limpiar_datos_sinteticos
+)
+
+def generar_libros(cantidad, prefijo='B', semilla=42):
+    """
+    Genera registros de libros sintéticos con ISBN únicos
+
+    Args:
+        cantidad: Cantidad de libros a generar
+        prefijo: Prefijo de los ISBN generados (para no chocar entre corridas)
+        semilla: Semilla del generador aleatorio, para corridas reproducibles
+    """
+    azar = random.Random(semilla)
+    for i in range(cantidad):
+        palabras = azar.sample(PALABRAS_TITULO, azar.randint(2, 4))
+        yield {
+            'titulo': f"{' '.join(palabras).capitalize()} {i}",
+            'autor': f"{azar.choice(NOMBRES)} {azar.choice(APELLIDOS)}",
+            'isbn': f"{prefijo}{i:012d}",
+            'editorial': "Editorial Benchmark",
+            'año_publicacion': 1950 + i % 75,
+            'paginas': 100 + i % 900,
+            'notas': MARCA_BENCHMARK
+        }
+
+
+def _medir(funcion, *args, **kwargs):
+    inicio = time.perf_counter()
+    # Los mensajes por fila de las funciones no forman parte de la medición útil
+    with contextlib.redirect_stdout(io.StringIO()):
+        resultado = funcion(*args, **kwargs)
+    return time.perf_counter() - inicio, resultado
+
+
+def benchmark_importacion(filas=5000, tamaño_lote=1000):
+    """
+    Compara filas/segundo de importar_libros contra un bucle de agregar_libro
+
+    Returns:
+        Diccionario con las filas por segundo de cada estrategia
+    """
+    from conexion_pymysql import agregar_libro
+    from importacion_libros import importar_libros
+
+    def bucle_agregar_libro():
+        for libro in generar_libros(filas, prefijo='A'):
+            agregar_libro(libro['titulo'], libro['autor'], libro['isbn'],
+                          libro['editorial'], libro['año_publicacion'], None,
+                          libro['paginas'], None, libro['notas'])
+
+    try:
+        segundos_bucle, _ = _medir(bucle_agregar_libro)
+        segundos_lotes, _ = _medir(importar_libros, generar_libros(filas, prefijo='I'),
+                                   tamaño_lote)
+    finally:
+        limpiar_datos_sinteticos()
+
+    resultado = {
+        'filas': filas,
+        'tamaño_lote': tamaño_lote,
+        'agregar_libro_filas_por_segundo': filas / segundos_bucle,
+        'importar_libros_filas_por_segundo': filas / segundos_lotes
+    }
+    print(f"📊 Importación de {filas} libros")
+    print(f"   agregar_libro en bucle: {resultado['agregar_libro_filas_por_segundo']:.0f} filas/s")
+    print(f"   importar_libros (lote {tamaño_lote}): "
+          f"{resultado['importar_libros_filas_por_segundo']:.0f} filas/s")
+    print(f"   Aceleración: {segundos_bucle / segundos_lotes:.1f}x")
+    return resultado
+
+
+def benchmark_busqueda(libros=1_000_000, repeticiones=20):
+    """
+    Compara la latencia de buscar_libro con LIKE '%término%' y con los
+    índices FULLTEXT / B-tree sobre una tabla sintética
+
+    Args:
+        libros: Cantidad de libros sintéticos a cargar antes de medir
+        repeticiones: Ejecuciones de cada búsqueda
+
+    Returns:
+        Diccionario {término: {modo: mediana en milisegundos}}
+    """
+    from conexion_pymysql import buscar_libro
+    from importacion_libros import importar_libros
+
+    # Texto completo, apellido, prefijo corto e ISBN exacto
+    terminos = ['memoria viaje', 'Pérez', 'ja', '9000000012345']
+    resultado = {}
+
+    try:
+        print(f"⏳ Cargando {libros} libros sintéticos...")
+        importar_libros(generar_libros(libros, prefijo='9'), tamaño_lote=5000,
+                        mostrar_progreso=False)
+
+        for termino in terminos:
+            resultado[termino] = {}
+            for modo in ('contiene', 'auto'):
+                tiempos = [_medir(buscar_libro, termino, modo)[0] for _ in range(repeticiones)]
+                resultado[termino][modo] = statistics.median(tiempos) * 1000
+    finally:
+        limpiar_datos_sinteticos()
+
+    print(f"📊 Búsqueda sobre {libros} libros (mediana de {repeticiones} ejecuciones)")
+    for termino, tiempos in resultado.items():
+        print(f"   '{termino}': LIKE {tiempos['contiene']:.1f} ms -> "
+              f"índices {tiempos['auto']:.1f} ms")
+    return resultado
+
+
+def estres_prestamos(hilos=8, libros=3, operaciones=200):
+    """
+    Prueba de estrés: varios hilos prestan y devuelven los mismos libros a la vez
+    y al final se verifican los invariantes de la base
+
+    Invariantes:
+        - Ningún libro tiene más de un préstamo en estado 'Prestado'
+        - Un libro está 'Prestado' si y solo si tiene exactamente un préstamo activo
+        - Préstamos exitosos - devoluciones exitosas = préstamos activos
+
+    Returns:
+        Lista de violaciones encontradas (vacía si todo es consistente)
+    """
+    from conexion_pymysql import agregar_libro, prestar_libro, devolver_libro
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        ids = [agregar_libro(f"Libro de estrés {i}", "Autor Estrés", notas=MARCA_BENCHMARK)
+               for i in range(libros)]
+
+    contadores = {'prestamos': 0, 'devoluciones': 0}
+    lock = threading.Lock()
+
+    def trabajador(semilla):
+        azar = random.Random(semilla)
+        for _ in range(operaciones):
+            libro_id = azar.choice(ids)
+            try:
+                if azar.random() < 0.5:
+                    clave = 'prestamos' if prestar_libro(libro_id, f"Hilo {semilla}") else None
+                else:
+                    clave = 'devoluciones' if devolver_libro(libro_id) else None
+            except ConflictoTransaccionError:
+                # Deadlock que persistió tras los reintentos: la operación no se hizo
+                clave = None
+            if clave:
+                with lock:
+                    contadores[clave] += 1
+
+    violaciones = []
+    conexion = None
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            trabajadores = [threading.Thread(target=trabajador, args=(i,)) for i in range(hilos)]
+            for hilo in trabajadores:
+                hilo.start()
+            for hilo in trabajadores:
+                hilo.join()
+
+        conexion = obtener_conexion()
+        with conexion.cursor() as cursor:
+            marcadores = ', '.join(['%s'] * len(ids))
+            cursor.execute(f"""
+                SELECT l.id, l.estado, COUNT(p.id)
+                FROM libros l
+                LEFT JOIN prestamos p ON p.libro_id = l.id AND p.estado = 'Prestado'
+                WHERE l.id IN ({marcadores})
+                GROUP BY l.id, l.estado
+            """, ids)
+            activos_totales = 0
+            for libro_id, estado, activos in cursor.fetchall():
+                activos_totales += activos
+                if activos > 1:
+                    violaciones.append(f"Libro {libro_id}: {activos} préstamos activos")
+                if (estado == 'Prestado') != (activos == 1):
+                    violaciones.append(f"Libro {libro_id}: estado {estado} con {activos} préstamos activos")
+        if contadores['prestamos'] - contadores['devoluciones'] != activos_totales:
+            violaciones.append(
+                f"{contadores['prestamos']} préstamos - {contadores['devoluciones']} devoluciones "
+                f"!= {activos_totales} préstamos activos")
+    finally:
+        if conexion:
+            liberar_conexion(conexion)
+        limpiar_datos_sinteticos()
+
+    print(f"📊 Estrés de préstamos: {hilos} hilos x {operaciones} operaciones sobre {libros} libros")
+    print(f"   Préstamos: {contadores['prestamos']} | Devoluciones: {contadores['devoluciones']}")
+    if violaciones:
+        print("❌ Invariantes violados:")
+        for violacion in violaciones:
+            print(f"   {violacion}")
+    else:
+        print("✅ Todos los invariantes se cumplen")
+    return violaciones
+
+
+def benchmark_concurrencia(solicitudes=2000, libros=10000):
+    """
+    Compara solicitudes/segundo de la API asíncrona (un event loop) contra las
+    funciones síncronas ejecutadas en un pool de hilos del tamaño del pool de conexiones
+
+    Cada solicitud es una búsqueda o, una de cada diez, una lectura de estadísticas.
+
+    Returns:
+        Diccionario con las solicitudes por segundo de cada variante
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    import conexion_async
+    import conexion_pymysql
+    from config_database import get_pool_config
+    from importacion_libros import importar_libros
+
+    terminos = [' '.join(random.Random(i).sample(PALABRAS_TITULO, 2)) for i in range(50)]
+
+    def solicitud_sincronica(i):
+        if i % 10 == 0:
+            return conexion_pymysql.estadisticas_biblioteca()
+        return conexion_pymysql.buscar_libro(terminos[i % len(terminos)])
+
+    async def solicitud_asincronica(i):
+        if i % 10 == 0:
+            return await conexion_async.estadisticas_biblioteca()
+        return await conexion_async.buscar_libro(terminos[i % len(terminos)])
+
+    async def todas_asincronicas():
+        try:
+            await asyncio.gather(*(solicitud_asincronica(i) for i in range(solicitudes)))
+        finally:
+            await conexion_async.cerrar_pool_async()
+
+    def todas_sincronicas():
+        with ThreadPoolExecutor(max_workers=get_pool_config()['max_conexiones']) as ejecutor:
+            list(ejecutor.map(solicitud_sincronica, range(solicitudes)))
+
+    try:
+        importar_libros(generar_libros(libros, prefijo='C'), tamaño_lote=5000, mostrar_progreso=False)
+        segundos_hilos, _ = _medir(todas_sincronicas)
+        segundos_async, _ = _medir(asyncio.run, todas_asincronicas())
+    finally:
+        limpiar_datos_sinteticos()
+
+    resultado = {
+        'solicitudes': solicitudes,
+        'hilos_solicitudes_por_segundo': solicitudes / segundos_hilos,
+        'async_solicitudes_por_segundo': solicitudes / segundos_async
+    }
+    print(f"📊 {solicitudes} solicitudes concurrentes sobre {libros} libros")
+    print(f"   Funciones síncronas en hilos: {resultado['hilos_solicitudes_por_segundo']:.0f} solicitudes/s")
+    print(f"   API asíncrona (aiomysql): {resultado['async_solicitudes_por_segundo']:.0f} solicitudes/s")
+    return resultado
+
+
+def benchmark_sentencias(repeticiones=2000):
+    """
+    Compara la latencia por llamada de las sentencias frecuentes con y sin
+    sentencias preparadas en el servidor (protocolo binario)
+
+    PyMySQL, el driver de la biblioteca, solo tiene protocolo de texto; las
+    sentencias preparadas se miden con mysql-connector-python
+    (cursor(prepared=True), COM_STMT_PREPARE una vez y COM_STMT_EXECUTE en cada
+    llamada) frente al mismo driver sin preparar y frente a PyMySQL.
+
+    También mide, solo del lado del cliente, el armado del UPDATE de
+    actualizar_libro en cada llamada frente a la caché por campos.
+
+    Returns:
+        Diccionario {sentencia: {variante: mediana en microsegundos}}, o None
+        si el motor no es MySQL o falta mysql-connector-python
+    """
+    if get_motor() != 'mysql':
+        print("❌ Las sentencias preparadas solo existen en MySQL (DB_MOTOR=mysql)")
+        return None
+    try:
+        import mysql.connector
+    except ImportError:
+        print("❌ Falta mysql-connector-python (pip install -r requirements.txt)")
+        return None
+
+    from conexion_pymysql import (
+        agregar_libro, prestar_libro, SQL_TITULO_ESTADO_LIBRO, SQL_BLOQUEAR_PRESTAMO_RECIENTE
+    )
+    from config_database import get_database_config
+    from sentencias import sql_actualizar_libro, CAMPOS_ACTUALIZABLES_LIBRO
+
+    sentencias = {
+        'titulo_estado_libro': SQL_TITULO_ESTADO_LIBRO,
+        'bloquear_prestamo_reciente': SQL_BLOQUEAR_PRESTAMO_RECIENTE
+    }
+
+    def mediana_us(llamada):
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            llamada()
+            tiempos.append(time.perf_counter() - inicio)
+        return statistics.median(tiempos) * 1_000_000
+
+    resultado = {}
+    conexion = None
+    conector = None
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            libro_id = agregar_libro("Libro de sentencias", "Autor Benchmark", notas=MARCA_BENCHMARK)
+            prestar_libro(libro_id, "Lector Benchmark")
+
+        conexion = obtener_conexion()
+        conector = mysql.connector.connect(**dict(get_database_config(), autocommit=False))
+        texto = conector.cursor()
+        # Cada cursor preparado prepara la sentencia en su primera ejecución
+        # y la reutiliza mientras se ejecute la misma
+        preparados = {nombre: conector.cursor(prepared=True) for nombre in sentencias}
+        with conexion.cursor() as cursor:
+            for nombre, sql in sentencias.items():
+                def ejecutar(cursor_sentencia):
+                    cursor_sentencia.execute(sql, (libro_id,))
+                    cursor_sentencia.fetchall()
+
+                resultado[nombre] = {
+                    'pymysql_texto': mediana_us(lambda: ejecutar(cursor)),
+                    'connector_texto': mediana_us(lambda: ejecutar(texto)),
+                    'connector_preparada': mediana_us(lambda: ejecutar(preparados[nombre]))
+                }
+            conexion.rollback()
+            conector.rollback()
+    finally:
+        if conector:
+            conector.close()
+        if conexion:
+            liberar_conexion(conexion)
+        limpiar_datos_sinteticos()
+
+    campos = {'titulo': "Nuevo título", 'estado': 'Disponible', 'notas': MARCA_BENCHMARK}
+
+    def armar_en_cada_llamada():
+        asignaciones = []
+        valores = []
+        for campo, valor in campos.items():
+            if campo in CAMPOS_ACTUALIZABLES_LIBRO:
+                asignaciones.append(f"{campo} = %s")
+                valores.append(valor)
+        return f"UPDATE libros SET {', '.join(asignaciones)} WHERE id = %s", valores
+
+    def armar_con_cache():
+        claves = tuple(campo for campo in campos if campo in CAMPOS_ACTUALIZABLES_LIBRO)
+        return sql_actualizar_libro(claves), [campos[campo] for campo in claves]
+
+    resultado['armado_actualizar_libro'] = {
+        'en_cada_llamada': mediana_us(armar_en_cada_llamada),
+        'cache': mediana_us(armar_con_cache)
+    }
+
+    print(f"📊 Latencia por llamada (mediana de {repeticiones} ejecuciones, µs)")
+    for nombre, variantes in resultado.items():
+        detalle = ' | '.join(f"{variante} {us:.1f}" for variante, us in variantes.items())
+        print(f"   {nombre}: {detalle}")
+    return resultado
+
+
+def _imprimir_libros_por_linea(libros):
+    """Listado de listar_libros tal como se imprimía antes: un print por línea"""
+    print(f"\n📚 Libros encontrados: {len(libros)}")
+    print("-" * 80)
+    for libro in libros:
+        print(f"   [{libro[0]}] {libro[1]}")
+        print(f"       Autor: {libro[2]} | Estado: {libro[7]} | Categoría: {libro[9] or 'Sin categoría'}")
+        if libro[3]:
+            print(f"       ISBN: {libro[3]}")
+        if libro[4]:
+            print(f"       Editorial: {libro[4]}")
+        if libro[5]:
+            print(f"       Año: {libro[5]}")
+        if libro[6]:
+            print(f"       Páginas: {libro[6]}")
+        if libro[8]:
+            print(f"       Ubicación: {libro[8]}")
+        print()
+
+
+def benchmark_presentacion(libros=100_000, repeticiones=3):
+    """
+    Mide listar_libros sobre `libros` filas separando el acceso a datos de la
+    impresión: un print por línea (como antes), el texto armado y escrito de
+    una vez (mostrar=True) y solo los datos (mostrar=False)
+
+    La salida va a /dev/null con buffer de línea, que es como se comporta una
+    terminal (vacía el buffer en cada salto de línea).
+
+    Returns:
+        Diccionario con la mediana en segundos de cada variante
+    """
+    import conexion_pymysql
+
+    def mediana(llamada):
+        tiempos = []
+        with open(os.devnull, 'w', buffering=1, encoding='utf-8') as terminal, \
+                contextlib.redirect_stdout(terminal):
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                llamada()
+                tiempos.append(time.perf_counter() - inicio)
+        return statistics.median(tiempos)
+
+    def print_por_linea():
+        _imprimir_libros_por_linea(conexion_pymysql.listar_libros(mostrar=False))
+
+    try:
+        if sembrar_biblioteca(libros, prestamos_por_libro=0, mostrar_progreso=False) is None:
+            return None
+        resultado = {
+            'print_por_linea': mediana(print_por_linea),
+            'escritura_unica': mediana(lambda: conexion_pymysql.listar_libros(mostrar=True)),
+            'sin_salida': mediana(lambda: conexion_pymysql.listar_libros(mostrar=False))
+        }
+    finally:
+        limpiar_datos_sinteticos()
+
+    print(f"📊 listar_libros sobre {libros} libros (mediana de {repeticiones} ejecuciones)")
+    print(f"   Un print por línea: {resultado['print_por_linea']:.2f} s")
+    print(f"   Texto armado y escrito de una vez: {resultado['escritura_unica']:.2f} s")
+    print(f"   Solo datos (mostrar=False): {resultado['sin_salida']:.2f} s")
+    return resultado
+
+
+def benchmark_sesion(operaciones=1000):
+    """
+    Compara la latencia de una operación corta (SELECT 1) abriendo una
+    conexión nueva cada vez, pidiéndola al pool (con ping en cada entrega)
+    y con la sesión persistente del menú
+
+    Returns:
+        Diccionario con la mediana en microsegundos de cada variante
+    """
+    import pymysql
+
+    from pool_conexiones import sesion_persistente, obtener_pool
+
+    def operacion():
+        conexion = obtener_conexion()
+        try:
+            with conexion.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+        finally:
+            liberar_conexion(conexion)
+
+    def conexion_nueva():
+        conexion = pymysql.connect(**obtener_pool().config)
+        try:
+            with conexion.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+        finally:
+            conexion.close()
+
+    def mediana_us(llamada, repeticiones):
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            llamada()
+            tiempos.append(time.perf_counter() - inicio)
+        return statistics.median(tiempos) * 1_000_000
+
+    resultado = {'conexion_nueva': mediana_us(conexion_nueva, min(operaciones, 100)),
+                 'pool': mediana_us(operacion, operaciones)}
+    with sesion_persistente():
+        resultado['sesion_persistente'] = mediana_us(operacion, operaciones)
+
+    print(f"📊 SELECT 1 por operación (mediana de {operaciones} ejecuciones, µs)")
+    print(f"   Conexión nueva: {resultado['conexion_nueva']:.0f}")
+    print(f"   Pool (ping al entregar): {resultado['pool']:.0f}")
+    print(f"   Sesión persistente: {resultado['sesion_persistente']:.0f}")
+    return resultado
+
+
+def benchmark_memoria_filas(filas=100_000):
+    """
+    Compara la memoria por fila de un Libro de modelos.py (__slots__) con una
+    tupla, una namedtuple y un diccionario con los mismos valores
+
+    Los valores se crean una sola vez y los comparten todas las variantes, así
+    que se mide solo el contenedor de cada fila (más su puntero en la lista).
+    No necesita la base de datos.
+
+    Returns:
+        Diccionario {variante: bytes por fila}
+    """
+    import tracemalloc
+    from collections import namedtuple
+
+    from modelos import Libro
+
+    campos = Libro.__slots__
+    LibroTupla = namedtuple('LibroTupla', campos)
+    generador = GeneradorBiblioteca(42)
+    valores = [[i, f"Título {i}", generador.autores[i % len(generador.autores)], generador.isbn(i),
+                "Editorial", 1950 + i % 75, 100 + i % 900, 'Disponible', f"Estante {i % 40}",
+                f"Categoría {i % 20}"]
+               for i in range(filas)]
+
+    variantes = {
+        'tupla': tuple,
+        'namedtuple': lambda fila: LibroTupla(*fila),
+        'dict': lambda fila: dict(zip(campos, fila)),
+        'slots': lambda fila: Libro(*fila)
+    }
+    resultado = {}
+    for nombre, construir in variantes.items():
+        tracemalloc.start()
+        convertidas = [construir(fila) for fila in valores]
+        resultado[nombre] = tracemalloc.get_traced_memory()[0] / filas
+        tracemalloc.stop()
+        del convertidas
+
+    print(f"📊 Memoria por fila de libros ({filas} filas, {len(campos)} campos, sin contar los valores)")
+    for nombre, bytes_fila in resultado.items():
+        print(f"   {nombre}: {bytes_fila:.0f} bytes ({bytes_fila / resultado['dict']:.0%} de dict)")
+    return resultado
+
+
+def _resumir_tiempos(tiempos):
+    """Resume una lista de duraciones en segundos como estadísticas en milisegundos"""
+    ordenados = sorted(tiempos)
+    return {
+        'repeticiones': len(ordenados),
+        'mediana_ms': statistics.median(ordenados) * 1000,
+        'p95_ms': ordenados[min(len(ordenados) - 1, int(len(ordenados) * 0.95))] * 1000,
+        'media_ms': statistics.fmean(ordenados) * 1000,
+        'minimo_ms': ordenados[0] * 1000,
+        'maximo_ms': ordenados[-1] * 1000
+    }
+
+
+def _casos_suite(generador, libros):
+    """
+    Arma las operaciones que mide la suite sobre los datos sintéticos
+
+    Returns:
+        Diccionario {nombre: función sin argumentos}, o None si no hay datos cargados
+    """
+    import conexion_pymysql as biblioteca
+
+    disponible = biblioteca._consultar(
+        "SELECT id FROM libros WHERE isbn BETWEEN %s AND %s AND estado = 'Disponible' "
+        "ORDER BY isbn LIMIT 1", (generador.isbn(0), generador.isbn(libros - 1)))
+    categoria = biblioteca._consultar(
+        "SELECT id FROM categorias WHERE descripcion = %s ORDER BY nombre LIMIT 1",
+        (MARCA_BENCHMARK,))
+    if not disponible or not categoria:
+        return None
+    libro_id, categoria_id = disponible[0][0], categoria[0][0]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        primera_pagina = biblioteca.listar_libros(limite=20)
+    despues_de = biblioteca.clave_pagina_libro(primera_pagina[-1])
+
+    def ciclo_prestamo():
+        if biblioteca.prestar_libro(libro_id, "Lector Benchmark"):
+            biblioteca.devolver_libro(libro_id)
+
+    return {
+        # Palabra frecuente (~1% de los títulos) y palabra de la cola de la distribución
+        'buscar_libro.texto_frecuente': lambda: biblioteca.buscar_libro(generador.palabra(30)),
+        'buscar_libro.texto_raro': lambda: biblioteca.buscar_libro(generador.palabra(3000)),
+        'buscar_libro.autor': lambda: biblioteca.buscar_libro(generador.autores[0]),
+        'buscar_libro.isbn': lambda: biblioteca.buscar_libro(generador.isbn(libros // 2)),
+        'buscar_libro.prefijo': lambda: biblioteca.buscar_libro(generador.palabra(3000)[:2]),
+        'listar_libros.primera_pagina': lambda: biblioteca.listar_libros(limite=20),
+        'listar_libros.pagina_siguiente': lambda: biblioteca.listar_libros(limite=20, despues_de=despues_de),
+        'listar_libros.disponibles': lambda: biblioteca.listar_libros('Disponible', limite=20),
+        'listar_libros.categoria': lambda: biblioteca.listar_libros(categoria_id=categoria_id, limite=20),
+        'listar_prestamos.primera_pagina': lambda: biblioteca.listar_prestamos(limite=20),
+        'listar_prestamos.activos': lambda: biblioteca.listar_prestamos('Prestado', limite=20),
+        'listar_prestamos.historico': lambda: biblioteca.listar_prestamos(limite=20, historico=True),
+        'prestamos_de_persona.activos': lambda: biblioteca.prestamos_de_persona(generador.personas[0]),
+        'prestamos_de_persona.historial': lambda: biblioteca.prestamos_de_persona(
+            generador.personas[0], historico=True, limite=20),
+        'personas_con_mas_prestamos': biblioteca.personas_con_mas_prestamos,
+        'estadisticas_biblioteca': biblioteca.estadisticas_biblioteca,
+        'prestar_y_devolver_libro': ciclo_prestamo,
+    }
+
+
+def suite_benchmarks(escala='10k', repeticiones=20, semilla=42, salida='resultados_benchmark.json',
+                     cargar=True, conservar=False):
+    """
+    Carga datos sintéticos a la escala pedida y mide cada función pública
+
+    Cada operación se ejecuta una vez para calentar cachés y luego `repeticiones`
+    veces. El informe se guarda en JSON para compararlo entre corridas.
+
+    Args:
+        escala: Clave de ESCALAS ('10k', '1m' o '10m')
+        repeticiones: Ejecuciones medidas de cada operación
+        semilla: Semilla de los datos sintéticos
+        salida: Ruta del archivo JSON de resultados
+        cargar: Si es False, reutiliza datos cargados antes con la misma escala y semilla
+        conservar: Si es True, no borra los datos al terminar
+
+    Returns:
+        Diccionario con 'metadatos', 'carga' y 'resultados', o None si hay error
+    """
+    import json
+    import platform
+    from datetime import datetime
+
+    import pymysql
+    import conexion_pymysql
+
+    libros = ESCALAS[escala]
+    generador = GeneradorBiblioteca(semilla)
+    carga = None
+    resultados = {}
+
+    try:
+        if cargar:
+            print(f"⏳ Cargando la escala {escala} ({libros} libros)...")
+            carga = sembrar_biblioteca(libros, semilla=semilla, mostrar_progreso=False)
+            if carga is None:
+                return None
+            print(f"   {carga['libros']} libros y {carga['prestamos']} préstamos "
+                  f"en {carga['segundos']:.1f}s")
+
+        casos = _casos_suite(generador, libros)
+        if casos is None:
+            print("❌ No hay datos sintéticos cargados para esta escala y semilla")
+            return None
+        for nombre, caso in casos.items():
+            _medir(caso)
+            resultados[nombre] = _resumir_tiempos([_medir(caso)[0] for _ in range(repeticiones)])
+        version_servidor = conexion_pymysql._consultar("SELECT VERSION()")[0][0]
+    finally:
+        if cargar and not conservar:
+            limpiar_datos_sinteticos()
+
+    informe = {
+        'metadatos': {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'escala': escala,
+            'libros': libros,
+            'semilla': semilla,
+            'repeticiones': repeticiones,
+            'python': platform.python_version(),
+            'pymysql': pymysql.__version__,
+            'motor': get_motor(),
+            'mysql': version_servidor
+        },
+        'carga': carga,
+        'resultados': resultados
+    }
+    with open(salida, 'w', encoding='utf-8') as archivo:
+        json.dump(informe, archivo, indent=2, ensure_ascii=False)
+
+    print(f"📊 Suite sobre {libros} libros (escala {escala}, {repeticiones} repeticiones)")
+    for nombre, tiempos in resultados.items():
+        print(f"   {nombre:<34} mediana {tiempos['mediana_ms']:9.2f} ms | "
+              f"p95 {tiempos['p95_ms']:9.2f} ms")
+    print(f"💾 Resultados guardados en {salida}")
+    return informe
+
+
+def comparar_resultados(actual, base, tolerancia=0.25):
+    """
+    Compara dos informes de suite_benchmarks
+
+    Args:
+        actual: Informe de la corrida nueva
+        base: Informe de referencia
+        tolerancia: Aumento relativo de la mediana que se acepta (0.25 = 25%)
+
+    Returns:
+        Lista de regresiones encontradas (vacía si no hay)
+    """
+    regresiones = []
+    for nombre, tiempos in actual['resultados'].items():
+        referencia = base['resultados'].get(nombre)
+        if referencia and tiempos['mediana_ms'] > referencia['mediana_ms'] * (1 + tolerancia):
+            regresiones.append(f"{nombre}: {referencia['mediana_ms']:.2f} ms -> "
+                               f"{tiempos['mediana_ms']:.2f} ms")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de la biblioteca hogareña")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    importacion = subparsers.add_parser('importacion', help="Importación masiva vs agregar_libro")
+    importacion.add_argument('--filas', type=int, default=5000)
+    importacion.add_argument('--lote', type=int, default=1000)
+
+    busqueda = subparsers.add_parser('busqueda', help="LIKE vs FULLTEXT en buscar_libro")
+    busqueda.add_argument('--libros', type=int, default=1_000_000)
+    busqueda.add_argument('--repeticiones', type=int, default=20)
+
+    estres = subparsers.add_parser('estres-prestamos',
+                                   help="Préstamos y devoluciones concurrentes sobre los mismos libros")
+    estres.add_argument('--hilos', type=int, default=8)
+    estres.add_argument('--libros', type=int, default=3)
+    estres.add_argument('--operaciones', type=int, default=200)
+
+    concurrencia = subparsers.add_parser('concurrencia', help="API asíncrona vs funciones síncronas en hilos")
+    concurrencia.add_argument('--solicitudes', type=int, default=2000)
+    concurrencia.add_argument('--libros', type=int, default=10000)
+
+    sentencias = subparsers.add_parser('sentencias',
+                                       help="Sentencias preparadas en el servidor vs sin preparar")
+    sentencias.add_argument('--repeticiones', type=int, default=2000)
+
+    presentacion = subparsers.add_parser('presentacion',
+                                         help="listar_libros con print por línea, escritura única y sin salida")
+    presentacion.add_argument('--libros', type=int, default=100_000)
+    presentacion.add_argument('--repeticiones', type=int, default=3)
+
+    sesion = subparsers.add_parser('sesion',
+                                   help="Conexión nueva vs pool vs sesión persistente por operación")
+    sesion.add_argument('--operaciones', type=int, default=1000)
+
+    memoria = subparsers.add_parser('memoria-filas',
+                                    help="Memoria por fila: __slots__ vs tupla, namedtuple y dict")
+    memoria.add_argument('--filas', type=int, default=100_000)
+
+    suite = subparsers.add_parser('suite', help="Carga sintética y latencia de cada función pública")
+    suite.add_argument('--escala', choices=ESCALAS, default='10k')
+    suite.add_argument('--repeticiones', type=int, default=20)
+    suite.add_argument('--semilla', type=int, default=42)
+    suite.add_argument('--salida', default='resultados_benchmark.json')
+    suite.add_argument('--sin-carga', action='store_true',
+                       help="Reutiliza datos cargados antes con --conservar")
+    suite.add_argument('--conservar', action='store_true', help="No borra los datos al terminar")
+    suite.add_argument('--comparar', metavar='JSON', help="Informe de referencia para detectar regresiones")
+    suite.add_argument('--tolerancia', type=float, default=0.25)
+
+    subparsers.add_parser('limpiar', help="Borra todos los datos sintéticos y de benchmarks")
+
+    args = parser.parse_args()
+    try:
+        if args.benchmark == 'importacion':
+            benchmark_importacion(args.filas, args.lote)
+        elif args.benchmark == 'busqueda':
+            benchmark_busqueda(args.libros, args.repeticiones)
+        elif args.benchmark == 'estres-prestamos':
+            if estres_prestamos(args.hilos, args.libros, args.operaciones):
+                sys.exit(1)
+        elif args.benchmark == 'concurrencia':
+            benchmark_concurrencia(args.solicitudes, args.libros)
+        elif args.benchmark == 'sentencias':
+            if benchmark_sentencias(args.repeticiones) is None:
+                sys.exit(1)
+        elif args.benchmark == 'presentacion':
+            if benchmark_presentacion(args.libros, args.repeticiones) is None:
+                sys.exit(1)
+        elif args.benchmark == 'sesion':
+            benchmark_sesion(args.operaciones)
+        elif args.benchmark == 'memoria-filas':
+            benchmark_memoria_filas(args.filas)
+        elif args.benchmark == 'suite':
+            informe = suite_benchmarks(args.escala, args.repeticiones, args.semilla, args.salida,
+                                       not args.sin_carga, args.conservar)
+            if informe is None:
+                sys.exit(1)
+            if args.comparar:
+                import json
+                with open(args.comparar, encoding='utf-8') as archivo:
+                    regresiones = comparar_resultados(informe, json.load(archivo), args.tolerancia)
+                if regresiones:
+                    print(f"❌ Regresiones respecto de {args.comparar}:")
+                    for regresion in regresiones:
+                        print(f"   {regresion}")
+                    sys.exit(1)
+                print(f"✅ Sin regresiones respecto de {args.comparar}")
+        elif args.benchmark == 'limpiar':
+            limpiar_datos_sinteticos()
+    finally:
+        cerrar_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,449 @@
+"""
+Línea de comandos de la biblioteca hogareña
+Cada subcomando equivale a una opción del menú interactivo, sin preguntas,
+para usarlo desde scripts y tareas programadas. Con --batch se ejecutan las
+operaciones de un archivo (una por línea, con la misma sintaxis) sobre una
+sola conexión, confirmando una transacción cada N operaciones.
+
+Arranca rápido: la biblioteca (y PyMySQL) se importa recién al ejecutar un
+subcomando y la conexión se abre con la primera consulta.
+
+Uso:
+    python biblioteca.py agregar "Rayuela" "Julio Cortázar" --isbn 9788437604572
+    python biblioteca.py buscar rayuela --json
+    python biblioteca.py prestar 12 "Ana Gómez" --devolucion 2026-11-01
+    python biblioteca.py --batch operaciones.txt --transaccion 500
+
+Salida: 0 si todo salió bien, 1 si alguna operación falló, 2 si los
+argumentos son inválidos.
+"""
+import argparse
+import json
+import os
+import shlex
+import sys
+import time
+from contextlib import redirect_stdout, nullcontext
+from datetime import date
+
+# Se ejecutan fuera de los grupos de --batch: confirman por su cuenta en lotes
+COMANDOS_SIN_AGRUPAR = ('importar', 'exportar', 'archivar')
+
+
+def _biblioteca():
+    import conexion_pymysql
+    return conexion_pymysql
+
+
+def _agregar(args):
+    return _biblioteca().agregar_libro(
+        args.titulo, args.autor, args.isbn, args.editorial, args.año, args.categoria,
+        args.paginas, args.ubicacion, args.notas)
+
+
+def _listar(args):
+    filtrar = bool(args.estado or args.categoria)
+    return _biblioteca().listar_libros(args.estado, args.categoria, not filtrar, args.limite,
+                                       mostrar=not args.json)
+
+
+def _prestamos(args):
+    return _biblioteca().listar_prestamos(args.estado, not args.estado, args.limite,
+                                          mostrar=not args.json, historico=args.historico,
+                                          activos=args.activos)
+
+
+def _persona(args):
+    return _biblioteca().prestamos_de_persona(args.nombre, args.historico, args.limite,
+                                              mostrar=not args.json)
+
+
+def _lectores(args):
+    return _biblioteca().personas_con_mas_prestamos(args.limite, mostrar=not args.json)
+
+
+def _limite_prestamos(args):
+    return _biblioteca().establecer_limite_prestamos(args.nombre, args.limite)
+
+
+def _unir_personas(args):
+    return _biblioteca().unir_personas(args.origen, args.destino)
+
+
+def _buscar(args):
+    return _biblioteca().buscar_libro(args.termino, args.modo, mostrar=not args.json)
+
+
+def _actualizar(args):
+    campos = {'titulo': args.titulo, 'autor': args.autor, 'isbn': args.isbn,
+              'editorial': args.editorial, 'año_publicacion': args.año,
+              'categoria_id': args.categoria, 'paginas': args.paginas, 'estado': args.estado,
+              'ubicacion': args.ubicacion, 'notas': args.notas}
+    return _biblioteca().actualizar_libro(
+        args.libro_id, **{campo: valor for campo, valor in campos.items() if valor is not None})
+
+
+def _eliminar(args):
+    return _biblioteca().eliminar_libro(args.libro_id)
+
+
+def _prestar(args):
+    return _biblioteca().prestar_libro(args.libro_id, args.persona, args.devolucion, args.notas)
+
+
+def _devolver(args):
+    return _biblioteca().devolver_libro(args.libro_id, args.prestamo)
+
+
+def _estadisticas(args):
+    return _biblioteca().estadisticas_biblioteca(mostrar=not args.json)
+
+
+def _importar(args):
+    from importacion_libros import importar_libros_archivo
+    return importar_libros_archivo(args.ruta, args.lote)
+
+
+def _exportar(args):
+    from exportacion import exportar
+    return exportar(args.tabla, args.ruta, args.formato, args.gzip, args.lectura,
+                    mostrar_progreso=not args.json)
+
+
+def _archivar(args):
+    from archivado import archivar_prestamos
+    from resiliencia import ErrorBaseDatos
+    try:
+        return archivar_prestamos(args.dias, args.lote, mostrar=not args.json)
+    except ErrorBaseDatos as e:
+        if e.archivados:
+            print(f"   Se archivaron {e.archivados} préstamos antes del error", file=sys.stderr)
+        raise
+
+
+def _agregar_subcomandos(parser):
+    """Agrega al parser los subcomandos de las operaciones de la biblioteca"""
+    # --json también se acepta después del subcomando, sin pisar el global
+    comunes = argparse.ArgumentParser(add_help=False)
+    comunes.add_argument('--json', action='store_true', default=argparse.SUPPRESS,
+                         help="Escribe el resultado como JSON (los mensajes van a stderr)")
+    subparsers = parser.add_subparsers(dest='comando', metavar='COMANDO')
+
+    def subcomando(nombre, funcion, ayuda):
+        sub = subparsers.add_parser(nombre, help=ayuda, parents=[comunes])
+        sub.set_defaults(funcion=funcion)
+        return sub
+
+    def datos_libro(sub):
+        sub.add_argument('--isbn')
+        sub.add_argument('--editorial')
+        sub.add_argument('--año', type=int, help="Año de publicación")
+        sub.add_argument('--categoria', type=int, help="ID de la categoría")
+        sub.add_argument('--paginas', type=int)
+        sub.add_argument('--ubicacion')
+        sub.add_argument('--notas')
+
+    sub = subcomando('agregar', _agregar, "Agrega un libro")
+    sub.add_argument('titulo')
+    sub.add_argument('autor')
+    datos_libro(sub)
+
+    sub = subcomando('listar', _listar, "Lista los libros")
+    sub.add_argument('--estado')
+    sub.add_argument('--categoria', type=int, help="ID de la categoría")
+    sub.add_argument('--limite', type=int, help="Cantidad máxima de libros")
+
+    sub = subcomando('prestamos', _prestamos, "Lista los préstamos")
+    sub.add_argument('--estado')
+    sub.add_argument('--limite', type=int, help="Cantidad máxima de préstamos")
+    sub.add_argument('--historico', action='store_true', help="Incluye los préstamos archivados")
+    sub.add_argument('--activos', action='store_true',
+                     help="Solo los préstamos sin devolver (incluye los vencidos)")
+
+    sub = subcomando('persona', _persona, "Lista los préstamos activos de una persona")
+    sub.add_argument('nombre')
+    sub.add_argument('--historico', action='store_true',
+                     help="Todos los préstamos de la persona, incluidos los devueltos y archivados")
+    sub.add_argument('--limite', type=int, help="Cantidad máxima de préstamos")
+
+    sub = subcomando('lectores', _lectores, "Lista las personas con más préstamos")
+    sub.add_argument('--limite', type=int, default=10, help="Cantidad de personas")
+
+    sub = subcomando('limite-prestamos', _limite_prestamos,
+                     "Define cuántos préstamos activos puede tener una persona")
+    sub.add_argument('nombre')
+    sub.add_argument('limite', type=int, nargs='?',
+                     help="0 = sin límite; sin valor, usa el límite general (DB_LIMITE_PRESTAMOS)")
+
+    sub = subcomando('unir-personas', _unir_personas,
+                     "Pasa los préstamos de una persona a otra (nombres mal escritos)")
+    sub.add_argument('origen', help="Persona que desaparece")
+    sub.add_argument('destino', help="Persona que se conserva")
+
+    sub = subcomando('buscar', _buscar, "Busca libros por título, autor o ISBN")
+    sub.add_argument('termino')
+    sub.add_argument('--modo', choices=('auto', 'texto', 'prefijo', 'isbn', 'contiene'),
+                     default='auto')
+
+    sub = subcomando('actualizar', _actualizar, "Actualiza los campos indicados de un libro")
+    sub.add_argument('libro_id', type=int)
+    sub.add_argument('--titulo')
+    sub.add_argument('--autor')
+    sub.add_argument('--estado')
+    datos_libro(sub)
+
+    sub = subcomando('eliminar', _eliminar, "Elimina un libro")
+    sub.add_argument('libro_id', type=int)
+
+    sub = subcomando('prestar', _prestar, "Presta un libro")
+    sub.add_argument('libro_id', type=int)
+    sub.add_argument('persona')
+    sub.add_argument('--devolucion', type=date.fromisoformat,
+                     help="Fecha de devolución esperada (AAAA-MM-DD)")
+    sub.add_argument('--notas')
+
+    sub = subcomando('devolver', _devolver, "Registra la devolución de un libro")
+    sub.add_argument('libro_id', type=int)
+    sub.add_argument('--prestamo', type=int, help="ID del préstamo (por defecto, el activo)")
+
+    subcomando('estadisticas', _estadisticas, "Muestra las estadísticas de la biblioteca")
+
+    sub = subcomando('importar', _importar, "Importa libros desde CSV o JSON Lines")
+    sub.add_argument('ruta')
+    sub.add_argument('--lote', type=int, default=1000, help="Filas por lote")
+
+    sub = subcomando('exportar', _exportar, "Exporta libros o préstamos a CSV / JSON Lines")
+    sub.add_argument('tabla', help="libros, prestamos o prestamos_historico")
+    sub.add_argument('ruta', nargs='?', default='-', help="Archivo de salida ('-' = stdout)")
+    sub.add_argument('--formato', help="csv o jsonl (por defecto se deduce de la extensión)")
+    sub.add_argument('--gzip', action='store_true', default=None, help="Comprime la salida con gzip")
+    sub.add_argument('--lectura', type=int, default=5000, help="Filas por bloque")
+
+    sub = subcomando('archivar', _archivar, "Archiva los préstamos devueltos antiguos")
+    sub.add_argument('--dias', type=int, help="Antigüedad mínima de la devolución")
+    sub.add_argument('--lote', type=int, help="Préstamos por transacción")
+    return subparsers
+
+
+def _a_json(valor):
+    """Convierte el resultado de una operación en algo que json.dumps acepta"""
+    if hasattr(valor, 'a_dict'):
+        return valor.a_dict()
+    if isinstance(valor, (list, tuple)):
+        return [_a_json(v) for v in valor]
+    if isinstance(valor, dict):
+        return {str(k): _a_json(v) for k, v in valor.items()}
+    return valor
+
+
+def ejecutar_comando(args):
+    """
+    Ejecuta el subcomando de `args` y, con --json, escribe su resultado
+
+    Returns:
+        True si la operación salió bien (no retornó None ni False)
+
+    Raises:
+        ErrorBaseDatos: Si falla la operación en la base de datos
+        ValueError: Si los argumentos no son válidos para la operación
+    """
+    # Con --json los mensajes de la biblioteca no se mezclan con el resultado;
+    # exportar ya los envía a stderr cuando escribe los datos en stdout
+    desviar = args.json and args.comando != 'exportar'
+    with redirect_stdout(sys.stderr) if desviar else nullcontext():
+        resultado = args.funcion(args)
+    if args.json:
+        print(json.dumps(_a_json(resultado), ensure_ascii=False, default=str))
+        # Vaciar aquí para que una tubería cerrada se detecte dentro de main
+        sys.stdout.flush()
+    return resultado is not None and resultado is not False
+
+
+def leer_lote(ruta, parser):
+    """
+    Lee y valida todas las operaciones del archivo antes de ejecutar ninguna
+
+    Cada línea es un subcomando con sus argumentos, con comillas como en el
+    shell; las líneas vacías y lo que sigue a un # se ignoran.
+
+    Returns:
+        Lista de (número de línea, argumentos)
+
+    Raises:
+        ValueError: Si alguna línea no es una operación válida
+    """
+    operaciones = []
+    with open(ruta, encoding='utf-8') if ruta != '-' else nullcontext(sys.stdin) as archivo:
+        for numero, linea in enumerate(archivo, 1):
+            try:
+                partes = shlex.split(linea, comments=True)
+            except ValueError as e:
+                raise ValueError(f"línea {numero}: {e}") from None
+            if not partes:
+                continue
+            # argparse informa el error en stderr y sale; aquí se convierte en ValueError
+            try:
+                args = parser.parse_args(partes)
+            except SystemExit:
+                raise ValueError(f"línea {numero}: operación inválida: {linea.strip()}") from None
+            if args.comando is None:
+                raise ValueError(f"línea {numero}: falta el comando")
+            operaciones.append((numero, args))
+    return operaciones
+
+
+def ejecutar_lote(operaciones, por_transaccion=100, seguir=False):
+    """
+    Ejecuta las operaciones sobre una sola conexión, confirmando una
+    transacción cada `por_transaccion` operaciones
+
+    Cada operación corre en un SAVEPOINT, así que una que falla se deshace
+    sola sin perder las demás del grupo. Si el servidor aborta la transacción
+    (por ejemplo, por un deadlock), las operaciones del grupo se repiten.
+
+    Args:
+        operaciones: Lista de (número de línea, argumentos), ver leer_lote
+        por_transaccion: Operaciones confirmadas en cada transacción
+        seguir: Si es True, continúa después de una operación fallida
+
+    Returns:
+        Diccionario con 'operaciones', 'errores', 'transacciones' y 'segundos'
+    """
+    from config_database import get_resiliencia_config
+    from pool_conexiones import sesion_persistente
+    from resiliencia import ErrorBaseDatos
+
+    if por_transaccion < 1:
+        raise ValueError("por_transaccion debe ser mayor que 0")
+    intentos = get_resiliencia_config()['intentos']
+    ejecutadas = errores = transacciones = 0
+    inicio = time.perf_counter()
+
+    def ejecutar(numero, args):
+        try:
+            if ejecutar_comando(args):
+                return True
+            print(f"❌ Línea {numero}: la operación no se realizó", file=sys.stderr)
+        except (ErrorBaseDatos, ValueError) as e:
+            print(f"❌ Línea {numero}: {e}", file=sys.stderr)
+        return False
+
+    with sesion_persistente() as sesion:
+        grupo = []
+        sesion.agrupar = True
+        try:
+            for numero, args in operaciones:
+                if args.comando in COMANDOS_SIN_AGRUPAR:
+                    if grupo:
+                        sesion.confirmar_grupo()
+                        transacciones += 1
+                        grupo = []
+                    sesion.agrupar = False
+                    try:
+                        correcta = ejecutar(numero, args)
+                    finally:
+                        sesion.agrupar = True
+                else:
+                    correcta = ejecutar(numero, args)
+                    if correcta:
+                        grupo.append((numero, args))
+                    repeticion = 1
+                    while sesion.grupo_perdido:
+                        if repeticion == intentos:
+                            raise ErrorBaseDatos(
+                                f"ejecutar las líneas {grupo[0][0]}-{numero}", None,
+                                "la transacción se abortó y no pudo repetirse", repeticion)
+                        print(f"↻ Transacción abortada por el servidor: se repiten "
+                              f"{len(grupo)} operaciones", file=sys.stderr)
+                        sesion.deshacer_grupo()
+                        repeticion += 1
+                        grupo = [(n, a) for n, a in grupo if ejecutar(n, a)]
+                        correcta = any(n == numero for n, _ in grupo)
+
+                ejecutadas += 1
+                if not correcta:
+                    errores += 1
+                    if not seguir:
+                        break
+                if len(grupo) >= por_transaccion:
+                    sesion.confirmar_grupo()
+                    transacciones += 1
+                    grupo = []
+            if grupo:
+                sesion.confirmar_grupo()
+                transacciones += 1
+        except BaseException:
+            sesion.deshacer_grupo()
+            raise
+        finally:
+            sesion.agrupar = False
+
+    return {
+        'operaciones': ejecutadas,
+        'errores': errores,
+        'transacciones': transacciones,
+        'segundos': time.perf_counter() - inicio
+    }
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        description="Biblioteca hogareña desde la línea de comandos",
+        epilog="Sin COMANDO ni --batch, usa el menú interactivo: python conexion_pymysql.py")
+    parser.add_argument('--json', action='store_true',
+                        help="Escribe el resultado como JSON (los mensajes van a stderr)")
+    parser.add_argument('--batch', metavar='ARCHIVO',
+                        help="Ejecuta las operaciones del archivo, una por línea ('-' = stdin)")
+    parser.add_argument('--transaccion', type=int, default=100, metavar='N',
+                        help="Con --batch, operaciones por transacción (por defecto 100)")
+    parser.add_argument('--seguir', action='store_true',
+                        help="Con --batch, continúa después de una operación fallida")
+    _agregar_subcomandos(parser)
+    return parser
+
+
+def main(argv=None):
+    parser = crear_parser()
+    args = parser.parse_args(argv)
+    if args.batch and args.comando:
+        parser.error("--batch no admite un COMANDO en la línea de comandos")
+    if not args.batch and not args.comando:
+        parser.error("indica un COMANDO o --batch ARCHIVO")
+    if args.transaccion < 1:
+        parser.error("--transaccion debe ser mayor que 0")
+
+    if args.batch:
+        lineas = argparse.ArgumentParser(prog='línea de --batch', add_help=False)
+        _agregar_subcomandos(lineas)
+        lineas.set_defaults(json=args.json)
+        try:
+            operaciones = leer_lote(args.batch, lineas)
+        except (OSError, ValueError) as e:
+            print(f"❌ Error al leer '{args.batch}': {e}", file=sys.stderr)
+            return 2
+
+    from pool_conexiones import cerrar_pool, sesion_persistente
+    from resiliencia import ErrorBaseDatos
+    try:
+        if args.batch:
+            resumen = ejecutar_lote(operaciones, args.transaccion, args.seguir)
+            print(f"✅ {resumen['operaciones']} operaciones en {resumen['transacciones']} "
+                  f"transacciones ({resumen['errores']} con error) en {resumen['segundos']:.2f}s",
+                  file=sys.stderr)
+            return 1 if resumen['errores'] else 0
+        with sesion_persistente():
+            return 0 if ejecutar_comando(args) else 1
+    except (ErrorBaseDatos, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # El consumidor (por ejemplo `head`) cerró la tubería antes del final:
+        # stdout se redirige a /dev/null para que Python no falle al vaciarlo
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    finally:
+        cerrar_pool()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+Caché en memoria del catálogo de categorías
+Las categorías casi nunca cambian, así que se leen una vez y se reutilizan
+hasta que vence el TTL o se invalidan explícitamente (agregar_categoria)
+"""
+import threading
+import time
+
+from config_database import get_cache_config
+from pool_conexiones import obtener_conexion, liberar_conexion
+
+CONSULTA_CATEGORIAS = "SELECT id, nombre, descripcion FROM categorias"
+
+
+class CacheCategorias:
+    """
+    Catálogo id -> (nombre, descripcion) con lectura a través de la base
+    """
+
+    def __init__(self, ttl=300):
+        """
+        Args:
+            ttl: Segundos que el catálogo se considera vigente
+        """
+        self.ttl = ttl
+        # Protege solo el catálogo en memoria; nunca se retiene durante una consulta
+        self._lock = threading.Lock()
+        # Una sola carga desde la base a la vez
+        self._lock_carga = threading.Lock()
+        self._categorias = None
+        self._cargado = 0.0
+        # Cambia con cada guardado o invalidación
+        self._version = 0
+
+    def _vigente(self):
+        return self._categorias is not None and time.monotonic() - self._cargado <= self.ttl
+
+    def _leer(self):
+        conexion = obtener_conexion(lectura=True)
+        try:
+            with conexion.cursor() as cursor:
+                cursor.execute(CONSULTA_CATEGORIAS)
+                return cursor.fetchall()
+        finally:
+            liberar_conexion(conexion)
+
+    def _guardar(self, filas):
+        self._categorias = {fila[0]: (fila[1], fila[2]) for fila in filas}
+        self._cargado = time.monotonic()
+        self._version += 1
+
+    def guardar(self, filas):
+        """
+        Reemplaza el catálogo con filas (id, nombre, descripcion) leídas por
+        otro medio, por ejemplo con la conexión asíncrona de conexion_async.py
+        """
+        with self._lock:
+            self._guardar(filas)
+
+    def obtener(self, refrescar=False):
+        """
+        Retorna el diccionario id -> (nombre, descripcion)
+
+        La consulta se hace fuera del lock del catálogo, de modo que una lectura
+        lenta de la base no bloquea a los hilos que encuentran el catálogo
+        vigente. Si varios hilos necesitan recargarlo a la vez, consulta uno
+        solo y los demás usan lo que él guardó.
+
+        Args:
+            refrescar: Si es True, vuelve a leer la base aunque el TTL no haya vencido
+
+        Raises:
+            pymysql.Error: Si la lectura de la base falla
+        """
+        with self._lock:
+            if not refrescar and self._vigente():
+                return self._categorias
+            version = self._version
+
+        with self._lock_carga:
+            with self._lock:
+                # Otro hilo recargó el catálogo mientras se esperaba
+                if self._version != version and self._vigente():
+                    return self._categorias
+                version = self._version
+            filas = self._leer()
+            with self._lock:
+                # Si se invalidó durante la lectura, lo leído puede ser anterior
+                # al cambio: se retorna pero no se guarda
+                if self._version != version:
+                    return {fila[0]: (fila[1], fila[2]) for fila in filas}
+                self._guardar(filas)
+                return self._categorias
+
+    def nombres(self, ids):
+        """
+        Retorna id -> nombre para los ids pedidos
+
+        Si alguno no está en el catálogo (otro cliente agregó una categoría),
+        el catálogo se vuelve a leer una vez antes de responder.
+        """
+        categorias = self.obtener()
+        if any(i is not None and i not in categorias for i in ids):
+            categorias = self.obtener(refrescar=True)
+        return {i: categorias[i][0] for i in ids if i in categorias}
+
+    def nombres_vigentes(self, ids):
+        """
+        Retorna id -> nombre sin consultar la base, o None si el catálogo
+        venció o no contiene alguno de los ids pedidos
+        """
+        with self._lock:
+            if not self._vigente():
+                return None
+            categorias = self._categorias
+            if any(i is not None and i not in categorias for i in ids):
+                return None
+            return {i: categorias[i][0] for i in ids if i in categorias}
+
+    def invalidar(self):
+        """
+        Descarta el catálogo; la próxima lectura irá a la base
+        """
+        with self._lock:
+            self._categorias = None
+            self._version += 1
+
+
+cache_categorias = CacheCategorias(get_cache_config()['ttl_categorias'])
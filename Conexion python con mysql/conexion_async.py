@@ -0,0 +1,299 @@
+"""
+API asíncrona de la biblioteca hogareña usando aiomysql
+Expone versiones `async` de las operaciones principales que comparten un
+pool de conexiones asíncrono, para atender muchas solicitudes concurrentes
+desde un único event loop sin un hilo por llamada.
+
+A diferencia de las funciones de conexion_pymysql.py, estas no imprimen
+resultados. Los errores de la base se propagan igual que en la versión
+síncrona: como ErrorBaseDatos (resiliencia.py), tras los mismos reintentos.
+
+Uso:
+    import asyncio
+    from conexion_async import buscar_libro, cerrar_pool_async
+
+    async def main():
+        libros = await buscar_libro("Quijote")
+        await cerrar_pool_async()
+
+    asyncio.run(main())
+"""
+import asyncio
+from datetime import date
+
+import aiomysql
+import pymysql
+
+from cache_categorias import cache_categorias, CONSULTA_CATEGORIAS
+from config_database import (
+    get_pymysql_config, get_pool_config, get_prestamos_config, get_resiliencia_config
+)
+from importacion_libros import INSERT_LIBRO
+from isbn import isbn13
+from personas import limpiar_nombre, normalizar_nombre, limite_efectivo
+from migraciones import CONTEO_ESTADISTICAS
+from modelos import Libro, LibroEncontrado
+from resiliencia import espera_reintento, operacion_bd_async
+from conexion_pymysql import (
+    _consulta_libros, _consulta_busqueda, _modo_busqueda, _armar_estadisticas,
+    CONSULTA_BUSQUEDA, CONSULTA_ESTADISTICAS, ERRORES_REINTENTABLES,
+    ER_FT_MATCHING_KEY_NOT_FOUND, ER_NO_SUCH_TABLE,
+    SQL_MARCAR_PRESTADO, SQL_INSERTAR_PRESTAMO, SQL_TITULO_ESTADO_LIBRO,
+    SQL_BLOQUEAR_LIBRO, SQL_BLOQUEAR_PRESTAMO_ACTIVO, SQL_BLOQUEAR_PRESTAMO_RECIENTE,
+    SQL_CERRAR_PRESTAMO, SQL_MARCAR_DISPONIBLE, SQL_BLOQUEAR_PERSONA, SQL_CREAR_PERSONA,
+    SQL_CONTAR_ACTIVOS_PERSONA
+)
+
+_pool = None
+_pool_lock = None
+
+
+async def obtener_pool_async():
+    """
+    Retorna el pool asíncrono compartido, creándolo en el primer uso
+    con la misma configuración (.env) que el pool síncrono
+    """
+    global _pool, _pool_lock
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    async with _pool_lock:
+        if _pool is None:
+            config = dict(get_pymysql_config())
+            config['db'] = config.pop('database')
+            # aiomysql solo admite connect_timeout; las esperas de lectura y
+            # escritura se acotan con asyncio.wait_for si hace falta
+            config.pop('read_timeout', None)
+            config.pop('write_timeout', None)
+            tamaños = get_pool_config()
+            # autocommit=True: aiomysql descarta las conexiones que vuelven al pool
+            # con una transacción abierta; las escrituras usan begin() explícito
+            _pool = await aiomysql.create_pool(
+                minsize=tamaños['min_conexiones'],
+                maxsize=tamaños['max_conexiones'],
+                pool_recycle=tamaños['vida_maxima'],
+                autocommit=True,
+                **config)
+    return _pool
+
+
+async def cerrar_pool_async():
+    """
+    Cierra el pool asíncrono y espera a que se liberen sus conexiones
+    """
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        await _pool.wait_closed()
+        _pool = None
+
+
+async def _consultar(query, params=None, registro=None):
+    pool = await obtener_pool_async()
+    async with pool.acquire() as conexion:
+        async with conexion.cursor() as cursor:
+            await cursor.execute(query, params or None)
+            filas = await cursor.fetchall()
+            if registro is None:
+                return filas
+            # Mismo mapeo por nombre de columna que cursor_registros en la versión síncrona
+            convertir = registro.mapeador(campo[0] for campo in cursor.description)
+            return [convertir(fila) for fila in filas]
+
+
+async def _deshacer(conexion):
+    # Si la conexión se perdió, el rollback también falla: se conserva el error original
+    try:
+        await conexion.rollback()
+    except pymysql.Error:
+        pass
+
+
+async def _transaccion(operacion, intentos=None, espera_base=None):
+    """
+    Versión asíncrona de _reintentar_transaccion: ejecuta await operacion(cursor)
+    en una transacción y la repite ante deadlocks o esperas de bloqueo, con
+    DB_INTENTOS intentos y la espera de espera_reintento
+    """
+    if intentos is None:
+        intentos = get_resiliencia_config()['intentos']
+    pool = await obtener_pool_async()
+    for intento in range(1, intentos + 1):
+        async with pool.acquire() as conexion:
+            await conexion.begin()
+            try:
+                async with conexion.cursor() as cursor:
+                    resultado = await operacion(cursor)
+                await conexion.commit()
+                return resultado
+            except pymysql.err.OperationalError as e:
+                await _deshacer(conexion)
+                if e.args[0] not in ERRORES_REINTENTABLES or intento == intentos:
+                    raise
+            except BaseException:
+                await _deshacer(conexion)
+                raise
+        await asyncio.sleep(espera_reintento(intento, espera_base))
+
+
+async def _con_nombre_categoria(filas):
+    ids = {fila.categoria for fila in filas}
+    nombres = cache_categorias.nombres_vigentes(ids)
+    if nombres is None:
+        cache_categorias.guardar(await _consultar(CONSULTA_CATEGORIAS))
+        nombres = cache_categorias.nombres_vigentes(ids) or {}
+    for fila in filas:
+        fila.categoria = nombres.get(fila.categoria)
+    return filas
+
+
+@operacion_bd_async("agregar el libro", idempotente=False)
+async def agregar_libro(titulo, autor, isbn=None, editorial=None, año=None, categoria_id=None,
+                        paginas=None, ubicacion=None, notas=None):
+    """
+    Agrega un nuevo libro a la biblioteca
+
+    Returns:
+        ID del libro insertado
+
+    Raises:
+        ErrorBaseDatos: Si falla la operación en la base de datos
+    """
+    pool = await obtener_pool_async()
+    async with pool.acquire() as conexion:
+        async with conexion.cursor() as cursor:
+            await cursor.execute(INSERT_LIBRO, (titulo, autor, isbn, editorial, año,
+                                                categoria_id, paginas, ubicacion, notas,
+                                                isbn13(isbn)))
+            return cursor.lastrowid
+
+
+@operacion_bd_async("listar libros")
+async def listar_libros(estado=None, categoria_id=None, mostrar_todos=True, limite=None, despues_de=None):
+    """
+    Lista libros con los mismos filtros y paginación por keyset que la versión síncrona
+
+    Returns:
+        Lista de filas Libro, como conexion_pymysql.listar_libros
+    """
+    query, params = _consulta_libros(estado, categoria_id, mostrar_todos, despues_de, limite)
+    return await _con_nombre_categoria(await _consultar(query, params, Libro))
+
+
+@operacion_bd_async("buscar libros")
+async def buscar_libro(termino_busqueda, modo='auto'):
+    """
+    Busca libros por título, autor o ISBN con los mismos modos que la versión síncrona
+
+    Returns:
+        Lista de filas LibroEncontrado
+    """
+    termino_busqueda = termino_busqueda.strip()
+    if modo == 'auto':
+        modo = _modo_busqueda(termino_busqueda)
+
+    async def ejecutar(modo_consulta):
+        desde, where, orden, params = _consulta_busqueda(termino_busqueda, modo_consulta)
+        return await _consultar(CONSULTA_BUSQUEDA.format(desde=desde, where=where, orden=orden),
+                                params, LibroEncontrado)
+
+    try:
+        libros = await ejecutar(modo)
+    except pymysql.Error as e:
+        if modo != 'texto' or e.args[0] != ER_FT_MATCHING_KEY_NOT_FOUND:
+            raise
+        libros = await ejecutar('contiene')
+    return await _con_nombre_categoria(libros)
+
+
+async def _bloquear_persona(cursor, nombre):
+    """Versión asíncrona de conexion_pymysql._bloquear_persona"""
+    clave = normalizar_nombre(nombre)
+    await cursor.execute(SQL_BLOQUEAR_PERSONA, (clave,))
+    persona = await cursor.fetchone()
+    if not persona:
+        await cursor.execute(SQL_CREAR_PERSONA, (limpiar_nombre(nombre), clave))
+        await cursor.execute(SQL_BLOQUEAR_PERSONA, (clave,))
+        persona = await cursor.fetchone()
+    persona_id, guardado, limite = persona
+    return persona_id, guardado, limite_efectivo(limite, get_prestamos_config()['limite_por_persona'])
+
+
+@operacion_bd_async("prestar el libro", idempotente=False, reintentar=False)
+async def prestar_libro(libro_id, persona, fecha_devolucion_esperada=None, notas=None):
+    """
+    Registra un préstamo con el mismo UPDATE condicional y el mismo control
+    del límite de la persona que la versión síncrona
+
+    Returns:
+        ID del préstamo, o None si el libro no existe o no está disponible,
+        o la persona alcanzó su límite de préstamos
+
+    Raises:
+        ErrorBaseDatos: Si falla la operación en la base de datos
+        ValueError: Si falta el nombre de la persona
+    """
+    if not normalizar_nombre(persona or ''):
+        raise ValueError("Falta el nombre de la persona")
+
+    async def operacion(cursor):
+        await cursor.execute(SQL_MARCAR_PRESTADO, (libro_id,))
+        if cursor.rowcount != 1:
+            return None
+        persona_id, nombre, limite = await _bloquear_persona(cursor, persona)
+        if limite is not None:
+            await cursor.execute(SQL_CONTAR_ACTIVOS_PERSONA, (persona_id,))
+            if (await cursor.fetchone())[0] >= limite:
+                await cursor.execute(SQL_MARCAR_DISPONIBLE, (libro_id,))
+                return None
+        await cursor.execute(SQL_INSERTAR_PRESTAMO,
+                             (libro_id, persona_id, nombre, date.today(), fecha_devolucion_esperada, notas))
+        return cursor.lastrowid
+
+    return await _transaccion(operacion)
+
+
+@operacion_bd_async("devolver el libro", idempotente=False, reintentar=False)
+async def devolver_libro(libro_id, prestamo_id=None):
+    """
+    Registra la devolución de un libro bloqueando libro y préstamo
+
+    Returns:
+        True si se devolvió, False si no hay un préstamo activo
+    """
+    async def operacion(cursor):
+        await cursor.execute(SQL_BLOQUEAR_LIBRO, (libro_id,))
+        if prestamo_id:
+            await cursor.execute(SQL_BLOQUEAR_PRESTAMO_ACTIVO, (prestamo_id, libro_id))
+        else:
+            await cursor.execute(SQL_BLOQUEAR_PRESTAMO_RECIENTE, (libro_id,))
+        prestamo = await cursor.fetchone()
+        if not prestamo:
+            return False
+        await cursor.execute(SQL_CERRAR_PRESTAMO, (date.today(), prestamo[0]))
+        await cursor.execute(SQL_MARCAR_DISPONIBLE, (libro_id,))
+        return True
+
+    return await _transaccion(operacion)
+
+
+@operacion_bd_async("consultar el libro")
+async def estado_libro(libro_id):
+    """
+    Retorna (titulo, estado) de un libro o None si no existe
+    """
+    filas = await _consultar(SQL_TITULO_ESTADO_LIBRO, (libro_id,))
+    return filas[0] if filas else None
+
+
+@operacion_bd_async("obtener las estadísticas")
+async def estadisticas_biblioteca():
+    """
+    Retorna el mismo diccionario de estadísticas que la versión síncrona
+    """
+    try:
+        filas = await _consultar(CONSULTA_ESTADISTICAS.format(fuente='estadisticas_contadores'))
+    except pymysql.Error as e:
+        if e.args[0] != ER_NO_SUCH_TABLE:
+            raise
+        filas = await _consultar(CONSULTA_ESTADISTICAS.format(fuente=f"({CONTEO_ESTADISTICAS})"))
+    return _armar_estadisticas(filas)
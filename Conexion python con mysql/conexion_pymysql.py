@@ -3,39 +3,64 @@ Ejemplo de conexión Python con MySQL usando PyMySQL
 PyMySQL es una biblioteca pura de Python para MySQL
 """
 import os
+import re
+import time
+from contextlib import closing
 import pymysql
-from config_database import get_pymysql_config
 from pymysql import Error
+from pool_conexiones import (
+    obtener_conexion, liberar_conexion, cerrar_pool, iterar_en_servidor, sesion_persistente
+)
+from importacion_libros import importar_libros_archivo, INSERT_LIBRO
+from migraciones import aplicar_migraciones, CONTEO_ESTADISTICAS
+from cache_categorias import cache_categorias
+from vencimientos import marcar_prestamos_vencidos
+from exportacion import exportar
+from modelos import Libro, LibroEncontrado, Prestamo, Categoria, Persona, cursor_registros
+from presentacion import (
+    escribir, formatear_libros, formatear_busqueda, formatear_prestamos,
+    formatear_categorias, formatear_estadisticas, formatear_personas
+)
+from sentencias import (
+    sql_actualizar_libro, asignaciones_libro, con_campos_calculados,
+    CAMPOS_ACTUALIZABLES_LIBRO
+)
+from isbn import es_isbn, isbn13
+from personas import limpiar_nombre, normalizar_nombre, limite_efectivo
+from config_database import get_prestamos_config, get_resiliencia_config
+from resiliencia import ErrorBaseDatos, ERRORES_CONFLICTO, espera_reintento, operacion_bd
+from motor_sqlite import es_sqlite, TABLAS_SQLITE
 
 
 def conectar_pymysql():
     """
     Función para establecer conexión con MySQL usando PyMySQL
     """
-    # Configuración de la conexión desde archivo .env
-    config = get_pymysql_config()
-    
     conexion = None
     cursor = None
     
     try:
         # Establecer la conexión
-        conexion = pymysql.connect(**config)
+        conexion = obtener_conexion()
         
         if conexion.open:
-            print("✅ Conexión exitosa a MySQL con PyMySQL")
+            print(f"✅ Conexión exitosa a {'SQLite' if es_sqlite(conexion) else 'MySQL con PyMySQL'}")
             
             # Obtener información del servidor
             cursor = conexion.cursor()
             cursor.execute("SELECT VERSION()")
             version = cursor.fetchone()
-            print(f"📊 Versión de MySQL: {version[0]}")
             
-            # Ejemplo de consulta simple
-            cursor.execute("SHOW DATABASES")
-            databases = cursor.fetchall()
-            print("🗄️ Bases de datos disponibles:")
-            for db in databases:
+            if es_sqlite(conexion):
+                print(f"📊 Versión: {version[0]} (archivo {conexion.ruta})")
+                cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")
+                print("🗄️ Tablas disponibles:")
+            else:
+                print(f"📊 Versión de MySQL: {version[0]}")
+                # Ejemplo de consulta simple
+                cursor.execute("SHOW DATABASES")
+                print("🗄️ Bases de datos disponibles:")
+            for db in cursor.fetchall():
                 print(f"   - {db[0]}")
                 
     except Error as e:
@@ -45,21 +70,19 @@ def conectar_pymysql():
         # Cerrar cursor y conexión
         if cursor:
             cursor.close()
-        if conexion and conexion.open:
-            conexion.close()
-            print("🔒 Conexión cerrada")
+        if conexion:
+            liberar_conexion(conexion)
+            print("🔒 Conexión liberada")
 
 def ejecutar_consulta_pymysql(consulta, parametros=None):
     """
     Función para ejecutar consultas SQL con PyMySQL
     """
-    config = get_pymysql_config()
-    
     conexion = None
     cursor = None
     
     try:
-        conexion = pymysql.connect(**config)
+        conexion = obtener_conexion()
         cursor = conexion.cursor()
         
         # Ejecutar consulta
@@ -84,20 +107,18 @@ def ejecutar_consulta_pymysql(consulta, parametros=None):
     finally:
         if cursor:
             cursor.close()
-        if conexion and conexion.open:
-            conexion.close()
+        if conexion:
+            liberar_conexion(conexion)
 
 def ejemplo_crud_pymysql():
     """
     Ejemplo completo de operaciones CRUD con PyMySQL
     """
-    config = get_pymysql_config()
-    
     conexion = None
     cursor = None
     
     try:
-        conexion = pymysql.connect(**config)
+        conexion = obtener_conexion()
         cursor = conexion.cursor()
         
         # Crear tabla de ejemplo
@@ -144,75 +165,27 @@ def ejemplo_crud_pymysql():
     finally:
         if cursor:
             cursor.close()
-        if conexion and conexion.open:
-            conexion.close()
+        if conexion:
+            liberar_conexion(conexion)
 
 def crear_estructura_biblioteca():
     """
     Crea la estructura completa de la base de datos para la biblioteca hogareña
     """
-    config = get_pymysql_config()
     conexion = None
     cursor = None
     
     try:
-        conexion = pymysql.connect(**config)
+        conexion = obtener_conexion()
         cursor = conexion.cursor()
         
-        # 1. Crear tabla de categorías
-        crear_categorias = """
-        CREATE TABLE IF NOT EXISTS categorias (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            nombre VARCHAR(100) NOT NULL UNIQUE,
-            descripcion TEXT,
-            fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """
-        cursor.execute(crear_categorias)
-        print("✅ Tabla 'categorias' creada")
-        
-        # 2. Crear tabla de libros
-        crear_libros = """
-        CREATE TABLE IF NOT EXISTS libros (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            titulo VARCHAR(200) NOT NULL,
-            autor VARCHAR(200) NOT NULL,
-            isbn VARCHAR(20) UNIQUE,
-            editorial VARCHAR(100),
-            año_publicacion INT,
-            categoria_id INT,
-            paginas INT,
-            estado ENUM('Disponible', 'Prestado', 'Perdido', 'En reparación') DEFAULT 'Disponible',
-            ubicacion VARCHAR(100),
-            notas TEXT,
-            fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (categoria_id) REFERENCES categorias(id) ON DELETE SET NULL,
-            INDEX idx_titulo (titulo),
-            INDEX idx_autor (autor),
-            INDEX idx_estado (estado)
-        )
-        """
-        cursor.execute(crear_libros)
-        print("✅ Tabla 'libros' creada")
-        
-        # 3. Crear tabla de préstamos (opcional)
-        crear_prestamos = """
-        CREATE TABLE IF NOT EXISTS prestamos (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            libro_id INT NOT NULL,
-            persona_prestamo VARCHAR(100) NOT NULL,
-            fecha_prestamo DATE NOT NULL,
-            fecha_devolucion_esperada DATE,
-            fecha_devolucion_real DATE,
-            estado ENUM('Prestado', 'Devuelto', 'Vencido') DEFAULT 'Prestado',
-            notas TEXT,
-            FOREIGN KEY (libro_id) REFERENCES libros(id) ON DELETE CASCADE,
-            INDEX idx_persona (persona_prestamo),
-            INDEX idx_estado (estado)
-        )
-        """
-        cursor.execute(crear_prestamos)
-        print("✅ Tabla 'prestamos' creada")
+        if es_sqlite(conexion):
+            # Mismas tablas con los tipos de SQLite (ver motor_sqlite.py)
+            for crear_tabla in TABLAS_SQLITE:
+                cursor.execute(crear_tabla)
+            print("✅ Tablas 'categorias', 'libros' y 'prestamos' creadas")
+        else:
+            _crear_tablas_mysql(cursor)
         
         # Insertar algunas categorías de ejemplo
         categorias_ejemplo = [
@@ -229,6 +202,11 @@ def crear_estructura_biblioteca():
         print("✅ Categorías de ejemplo insertadas")
         
         conexion.commit()
+        cache_categorias.invalidar()
+        
+        # Aplicar índices y cambios de esquema posteriores a la versión inicial
+        aplicar_migraciones(cursor)
+        
         print("\n🎉 Estructura de biblioteca creada exitosamente!")
         print("\n📚 Tablas creadas:")
         print("   - categorias: Para organizar libros por género")
@@ -237,17 +215,111 @@ def crear_estructura_biblioteca():
         
     except Error as e:
         print(f"❌ Error al crear estructura: {e}")
-        conexion.rollback()
+        if conexion:
+            conexion.rollback()
     finally:
         if cursor:
             cursor.close()
-        if conexion and conexion.open:
-            conexion.close()
+        if conexion:
+            liberar_conexion(conexion)
+
+def _crear_tablas_mysql(cursor):
+    """
+    Crea las tablas de la biblioteca en MySQL
+    """
+    # 1. Crear tabla de categorías
+    crear_categorias = """
+    CREATE TABLE IF NOT EXISTS categorias (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        nombre VARCHAR(100) NOT NULL UNIQUE,
+        descripcion TEXT,
+        fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """
+    cursor.execute(crear_categorias)
+    print("✅ Tabla 'categorias' creada")
+    
+    # 2. Crear tabla de libros
+    crear_libros = """
+    CREATE TABLE IF NOT EXISTS libros (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        titulo VARCHAR(200) NOT NULL,
+        autor VARCHAR(200) NOT NULL,
+        isbn VARCHAR(20) UNIQUE,
+        editorial VARCHAR(100),
+        año_publicacion INT,
+        categoria_id INT,
+        paginas INT,
+        estado ENUM('Disponible', 'Prestado', 'Perdido', 'En reparación') DEFAULT 'Disponible',
+        ubicacion VARCHAR(100),
+        notas TEXT,
+        fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (categoria_id) REFERENCES categorias(id) ON DELETE SET NULL,
+        INDEX idx_titulo (titulo),
+        INDEX idx_autor (autor),
+        INDEX idx_estado (estado)
+    )
+    """
+    cursor.execute(crear_libros)
+    print("✅ Tabla 'libros' creada")
+    
+    # 3. Crear tabla de préstamos (opcional)
+    crear_prestamos = """
+    CREATE TABLE IF NOT EXISTS prestamos (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        libro_id INT NOT NULL,
+        persona_prestamo VARCHAR(100) NOT NULL,
+        fecha_prestamo DATE NOT NULL,
+        fecha_devolucion_esperada DATE,
+        fecha_devolucion_real DATE,
+        estado ENUM('Prestado', 'Devuelto', 'Vencido') DEFAULT 'Prestado',
+        notas TEXT,
+        FOREIGN KEY (libro_id) REFERENCES libros(id) ON DELETE CASCADE,
+        INDEX idx_persona (persona_prestamo),
+        INDEX idx_estado (estado)
+    )
+    """
+    cursor.execute(crear_prestamos)
+    print("✅ Tabla 'prestamos' creada")
 
 # ============================================
 # FUNCIONES ÚTILES PARA LA BIBLIOTECA
 # ============================================
 
+def _marcadores(cantidad):
+    return ', '.join(['%s'] * cantidad)
+
+def _consultar(query, params=None, registro=None):
+    """
+    Ejecuta una consulta de lectura con una conexión del pool y retorna todas las filas
+    
+    Los errores de PyMySQL se propagan a quien llama.
+    
+    Args:
+        registro: Tipo de fila de modelos.py (opcional; por defecto, tuplas)
+    """
+    conexion = obtener_conexion(lectura=True)
+    try:
+        with conexion.cursor(cursor_registros(registro) if registro else None) as cursor:
+            cursor.execute(query, params or None)
+            return cursor.fetchall()
+    finally:
+        liberar_conexion(conexion)
+
+def _iterar_servidor(query, params=None, tamaño_lectura=1000, registro=None, transformar=None):
+    """
+    Genera las filas de una consulta con un SSCursor (ver pool_conexiones.iterar_en_servidor)
+    
+    Args:
+        registro: Tipo de fila de modelos.py (opcional; por defecto, tuplas)
+        transformar: Función opcional aplicada a cada bloque de filas leído
+    """
+    clase_cursor = cursor_registros(registro, servidor=True) if registro else None
+    with closing(iterar_en_servidor(query, params, tamaño_lectura, clase_cursor)) as bloques:
+        for filas in bloques:
+            yield from (transformar(filas) if transformar else filas)
+
+@operacion_bd("agregar el libro", idempotente=False)
 def agregar_libro(titulo, autor, isbn=None, editorial=None, año=None, categoria_id=None, paginas=None, ubicacion=None, notas=None):
     """
     Agrega un nuevo libro a la biblioteca
@@ -264,36 +336,148 @@ def agregar_libro(titulo, autor, isbn=None, editorial=None, año=None, categoria
         notas: Notas adicionales (opcional)
     
     Returns:
-        ID del libro insertado o None si hay error
+        ID del libro insertado
+    
+    Raises:
+        ErrorBaseDatos: Si falla la operación en la base de datos
     """
-    config = get_pymysql_config()
     conexion = None
     cursor = None
     
     try:
-        conexion = pymysql.connect(**config)
+        conexion = obtener_conexion()
         cursor = conexion.cursor()
         
-        insert_query = """
-        INSERT INTO libros (titulo, autor, isbn, editorial, año_publicacion, categoria_id, paginas, ubicacion, notas)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        cursor.execute(insert_query, (titulo, autor, isbn, editorial, año, categoria_id, paginas, ubicacion, notas))
+        cursor.execute(INSERT_LIBRO, (titulo, autor, isbn, editorial, año, categoria_id, paginas, ubicacion, notas,
+                                      isbn13(isbn)))
         conexion.commit()
         libro_id = cursor.lastrowid
         print(f"✅ Libro '{titulo}' agregado exitosamente (ID: {libro_id})")
         return libro_id
-    except Error as e:
-        print(f"❌ Error al agregar libro: {e}")
-        conexion.rollback()
-        return None
     finally:
         if cursor:
             cursor.close()
-        if conexion and conexion.open:
-            conexion.close()
+        if conexion:
+            liberar_conexion(conexion)
+
+# Errores de MySQL que se resuelven repitiendo la transacción (ver resiliencia.py)
+ERRORES_REINTENTABLES = ERRORES_CONFLICTO
+
+def _deshacer(conexion):
+    """
+    Deshace la transacción sin ocultar el error que la interrumpió: si la
+    conexión se perdió, el rollback también falla y ese segundo error se descarta
+    """
+    try:
+        conexion.rollback()
+    except Error:
+        pass
 
-def listar_libros(estado=None, categoria_id=None, mostrar_todos=True):
+def _reintentar_transaccion(operacion, intentos=None, espera_base=None):
+    """
+    Ejecuta operacion(cursor) en una transacción y la confirma, repitiéndola
+    con espera exponencial y aleatoria si MySQL la aborta por un deadlock o
+    por tiempo de espera de un bloqueo
+    
+    Args:
+        operacion: Función que recibe un cursor y retorna el resultado
+        intentos: Cantidad máxima de ejecuciones (por defecto, DB_INTENTOS)
+        espera_base: Segundos de espera antes del segundo intento
+                     (por defecto, DB_REINTENTO_ESPERA)
+    
+    Returns:
+        Lo que retorne operacion
+    
+    Raises:
+        pymysql.Error: Si la operación falla por otro motivo o se agotan los intentos
+    """
+    if intentos is None:
+        intentos = get_resiliencia_config()['intentos']
+    for intento in range(1, intentos + 1):
+        conexion = obtener_conexion()
+        try:
+            with conexion.cursor() as cursor:
+                resultado = operacion(cursor)
+            conexion.commit()
+            return resultado
+        except pymysql.err.OperationalError as e:
+            _deshacer(conexion)
+            if e.args[0] not in ERRORES_REINTENTABLES or intento == intentos:
+                raise
+        except Exception:
+            _deshacer(conexion)
+            raise
+        finally:
+            liberar_conexion(conexion)
+        time.sleep(espera_reintento(intento, espera_base))
+
+def _con_nombre_categoria(filas):
+    """
+    Reemplaza el categoria_id leído en el campo `categoria` de cada fila por
+    el nombre de la categoría, resuelto con la caché en memoria en lugar de
+    un JOIN con categorias
+    
+    Args:
+        filas: Filas Libro o LibroEncontrado leídas de libros
+    
+    Returns:
+        La misma lista, con el nombre (o None) en lugar del id
+    """
+    nombres = cache_categorias.nombres({fila.categoria for fila in filas})
+    for fila in filas:
+        fila.categoria = nombres.get(fila.categoria)
+    return filas
+
+def _consulta_libros(estado=None, categoria_id=None, mostrar_todos=True, despues_de=None, limite=None):
+    """
+    Arma la consulta de listar_libros ordenada por (titulo, id)
+    
+    La paginación usa un predicado de búsqueda sobre la última fila vista
+    (keyset) en lugar de OFFSET, para que cada página sea una lectura
+    sobre idx_titulo sin recorrer las filas anteriores.
+    
+    Returns:
+        Tupla (query, parámetros)
+    """
+    # El nombre de la categoría se resuelve después con _con_nombre_categoria
+    query = """
+    SELECT l.id, l.titulo, l.autor, l.isbn, l.editorial, l.año_publicacion, 
+           l.paginas, l.estado, l.ubicacion, l.categoria_id AS categoria
+    FROM libros l
+    WHERE 1=1
+    """
+    params = []
+    
+    if not mostrar_todos:
+        if estado:
+            query += " AND l.estado = %s"
+            params.append(estado)
+        if categoria_id:
+            query += " AND l.categoria_id = %s"
+            params.append(categoria_id)
+    
+    if despues_de:
+        titulo, libro_id = despues_de
+        query += " AND (l.titulo > %s OR (l.titulo = %s AND l.id > %s))"
+        params.extend([titulo, titulo, libro_id])
+    
+    query += " ORDER BY l.titulo, l.id"
+    
+    if limite:
+        query += " LIMIT %s"
+        params.append(limite)
+    
+    return query, params
+
+def clave_pagina_libro(libro):
+    """
+    Retorna la clave (titulo, id) de un libro, para pedir la página siguiente
+    """
+    return (libro.titulo, libro.id)
+
+@operacion_bd("listar libros")
+def listar_libros(estado=None, categoria_id=None, mostrar_todos=True, limite=None, despues_de=None,
+                  mostrar=True):
     """
     Lista todos los libros, opcionalmente filtrados por estado o categoría
     
@@ -301,115 +485,216 @@ def listar_libros(estado=None, categoria_id=None, mostrar_todos=True):
         estado: Filtrar por estado ('Disponible', 'Prestado', 'Perdido', 'En reparación')
         categoria_id: Filtrar por ID de categoría
         mostrar_todos: Si es True, muestra todos los libros sin filtros
+        limite: Cantidad máxima de libros a devolver (tamaño de página, opcional)
+        despues_de: Clave (titulo, id) del último libro de la página anterior,
+                    obtenida con clave_pagina_libro (opcional)
+        mostrar: Si es False, solo retorna los libros sin imprimir nada
     
     Returns:
-        Lista de tuplas con información de los libros
+        Lista de filas Libro (ver modelos.py)
+    
+    Raises:
+        ErrorBaseDatos: Si falla la operación en la base de datos
     """
-    config = get_pymysql_config()
     conexion = None
     cursor = None
     
     try:
-        conexion = pymysql.connect(**config)
-        cursor = conexion.cursor()
-        
-        query = """
-        SELECT l.id, l.titulo, l.autor, l.isbn, l.editorial, l.año_publicacion, 
-               l.paginas, l.estado, l.ubicacion, c.nombre as categoria
-        FROM libros l
-        LEFT JOIN categorias c ON l.categoria_id = c.id
-        WHERE 1=1
-        """
-        params = []
-        
-        if not mostrar_todos:
-            if estado:
-                query += " AND l.estado = %s"
-                params.append(estado)
-            if categoria_id:
-                query += " AND l.categoria_id = %s"
-                params.append(categoria_id)
+        conexion = obtener_conexion(lectura=True)
+        cursor = conexion.cursor(cursor_registros(Libro))
         
-        query += " ORDER BY l.titulo"
+        query, params = _consulta_libros(estado, categoria_id, mostrar_todos, despues_de, limite)
         
         cursor.execute(query, params if params else None)
-        libros = cursor.fetchall()
-        
-        print(f"\n📚 Libros encontrados: {len(libros)}")
-        print("-" * 80)
-        for libro in libros:
-            print(f"   [{libro[0]}] {libro[1]}")
-            print(f"       Autor: {libro[2]} | Estado: {libro[7]} | Categoría: {libro[9] or 'Sin categoría'}")
-            if libro[3]:
-                print(f"       ISBN: {libro[3]}")
-            if libro[4]:
-                print(f"       Editorial: {libro[4]}")
-            if libro[5]:
-                print(f"       Año: {libro[5]}")
-            if libro[6]:
-                print(f"       Páginas: {libro[6]}")
-            if libro[8]:
-                print(f"       Ubicación: {libro[8]}")
-            print()
+        libros = _con_nombre_categoria(list(cursor.fetchall()))
+        
+        if mostrar:
+            escribir(formatear_libros(libros))
         
         return libros
-    except Error as e:
-        print(f"❌ Error al listar libros: {e}")
-        return None
     finally:
         if cursor:
             cursor.close()
-        if conexion and conexion.open:
-            conexion.close()
+        if conexion:
+            liberar_conexion(conexion)
+
+def iterar_libros(estado=None, categoria_id=None, mostrar_todos=True, tamaño_pagina=1000, servidor=False):
+    """
+    Recorre los libros sin cargar el resultado completo en memoria
+    
+    Args:
+        estado: Filtrar por estado
+        categoria_id: Filtrar por ID de categoría
+        mostrar_todos: Si es True, no aplica filtros
+        tamaño_pagina: Filas leídas por consulta (o por lectura del socket si servidor=True)
+        servidor: Si es True, usa un único SSCursor (cursor del lado del servidor)
+                  en lugar de consultas paginadas por keyset
+    
+    Yields:
+        Filas Libro, como listar_libros
+    """
+    if servidor:
+        query, params = _consulta_libros(estado, categoria_id, mostrar_todos)
+        yield from _iterar_servidor(query, params, tamaño_pagina, Libro, _con_nombre_categoria)
+        return
+    
+    despues_de = None
+    while True:
+        query, params = _consulta_libros(estado, categoria_id, mostrar_todos, despues_de, tamaño_pagina)
+        libros = _con_nombre_categoria(_consultar(query, params, Libro))
+        yield from libros
+        if len(libros) < tamaño_pagina:
+            break
+        despues_de = clave_pagina_libro(libros[-1])
+
+# Longitud mínima de palabra indexada por FULLTEXT en InnoDB (innodb_ft_min_token_size)
+LONGITUD_MINIMA_FULLTEXT = 3
+# Stopwords por defecto de InnoDB que FULLTEXT no indexa
+STOPWORDS_FULLTEXT = frozenset([
+    'about', 'are', 'com', 'for', 'from', 'how', 'that', 'the', 'this',
+    'was', 'what', 'when', 'where', 'who', 'will', 'with', 'und', 'www'
+])
+# Error de MySQL cuando no existe el índice FULLTEXT (migración no aplicada)
+ER_FT_MATCHING_KEY_NOT_FOUND = 1191
+
+def _palabras_fulltext(termino):
+    """
+    Retorna las palabras del término que el índice FULLTEXT puede encontrar
+
+    El término se corta en cualquier carácter que no sea de palabra, como hace
+    el índice: así un guion interno ("García-Márquez") no llega a la expresión
+    booleana, donde excluiría la palabra siguiente.
+    """
+    palabras = re.findall(r'\w+', termino)
+    return [p for p in palabras
+            if len(p) >= LONGITUD_MINIMA_FULLTEXT and p.lower() not in STOPWORDS_FULLTEXT]
+
+def _escapar_like(texto):
+    # '!' como carácter de escape: SQLite no tiene uno por defecto y la barra
+    # invertida se interpreta distinto en los literales de cada motor
+    return texto.replace('!', '!!').replace('%', '!%').replace('_', '!_')
+
+def _consulta_busqueda(termino, modo, sqlite=False):
+    """
+    Arma el origen, la condición y el orden de buscar_libro según el modo de búsqueda
+    
+    Args:
+        sqlite: Si es True, la búsqueda de texto usa la tabla FTS5 libros_fts
+    
+    Returns:
+        Tupla (from, where, order_by, parámetros)
+    """
+    if modo == 'isbn':
+        # Un ISBN válido se busca por su forma canónica, con o sin guiones e
+        # igual si es ISBN-10 o ISBN-13; si no, por el texto exacto
+        canonico = isbn13(termino)
+        if canonico is not None:
+            return "libros l", "l.isbn13 = %s", "l.titulo", [canonico]
+        return "libros l", "l.isbn = %s", "l.titulo", [termino]
+    
+    if modo == 'prefijo':
+        prefijo = _escapar_like(termino) + '%'
+        return ("libros l", "(l.titulo LIKE %s ESCAPE '!' OR l.autor LIKE %s ESCAPE '!')",
+                "l.titulo", [prefijo, prefijo])
+    
+    if modo == 'contiene':
+        busqueda = f"%{_escapar_like(termino)}%"
+        return ("libros l", "(l.titulo LIKE %s ESCAPE '!' OR l.autor LIKE %s ESCAPE '!' "
+                "OR l.isbn LIKE %s ESCAPE '!')", "l.titulo", [busqueda, busqueda, busqueda])
+    
+    # Texto completo: todas las palabras son obligatorias y se aceptan como prefijo
+    if sqlite:
+        # En FTS5 cada palabra va entre comillas (sin operadores) seguida de *;
+        # rank es bm25, donde un valor menor indica más relevancia
+        expresion = ' '.join('"' + p.replace('"', '""') + '"*'
+                             for p in (p.strip('+-<>()~*"@') for p in termino.split()) if p)
+    else:
+        expresion = ' '.join(f"+{p}*" for p in _palabras_fulltext(termino))
+    if not expresion:
+        # Ninguna palabra llega al índice (todas cortas o stopwords): con una
+        # expresión vacía MATCH no encontraría nada, así que se busca con LIKE
+        return _consulta_busqueda(termino, 'contiene', sqlite)
+    if sqlite:
+        return ("libros_fts JOIN libros l ON l.id = libros_fts.rowid", "libros_fts MATCH %s",
+                "libros_fts.rank, l.titulo", [expresion])
+    match = "MATCH(l.titulo, l.autor) AGAINST(%s IN BOOLEAN MODE)"
+    return "libros l", match, f"{match} DESC, l.titulo", [expresion, expresion]
 
-def buscar_libro(termino_busqueda):
+def _modo_busqueda(termino):
+    """
+    Elige el modo de búsqueda más barato para el término
+    """
+    if es_isbn(termino):
+        return 'isbn'
+    if not _palabras_fulltext(termino):
+        # FULLTEXT ignora las palabras cortas: se busca por prefijo en los índices B-tree
+        return 'prefijo'
+    return 'texto'
+
+CONSULTA_BUSQUEDA = """
+SELECT l.id, l.titulo, l.autor, l.isbn, l.estado, l.categoria_id AS categoria, l.ubicacion
+FROM {desde}
+WHERE {where}
+ORDER BY {orden}
+"""
+
+@operacion_bd("buscar libros")
+def buscar_libro(termino_busqueda, modo='auto', mostrar=True):
     """
     Busca libros por título, autor o ISBN
     
     Args:
         termino_busqueda: Término a buscar en título, autor o ISBN
+        modo: 'auto' (por defecto) elige según el término; 'texto' usa el índice
+              FULLTEXT ordenado por relevancia (o 'contiene' si ninguna palabra
+              llega al índice); 'prefijo' busca títulos o autores que
+              empiezan con el término; 'isbn' busca el ISBN en el índice de isbn13
+              (con o sin guiones, ISBN-10 o ISBN-13); 'contiene' busca el
+              término en cualquier posición (recorre toda la tabla)
+        mostrar: Si es False, solo retorna los libros sin imprimir nada
     
     Returns:
-        Lista de libros encontrados
+        Lista de filas LibroEncontrado (ver modelos.py)
+    
+    Raises:
+        ErrorBaseDatos: Si falla la operación en la base de datos
     """
-    config = get_pymysql_config()
     conexion = None
     cursor = None
     
     try:
-        conexion = pymysql.connect(**config)
-        cursor = conexion.cursor()
-        
-        query = """
-        SELECT l.id, l.titulo, l.autor, l.isbn, l.estado, c.nombre as categoria, l.ubicacion
-        FROM libros l
-        LEFT JOIN categorias c ON l.categoria_id = c.id
-        WHERE l.titulo LIKE %s OR l.autor LIKE %s OR l.isbn LIKE %s
-        ORDER BY l.titulo
-        """
-        busqueda = f"%{termino_busqueda}%"
-        cursor.execute(query, (busqueda, busqueda, busqueda))
-        libros = cursor.fetchall()
-        
-        print(f"\n🔍 Resultados de búsqueda para '{termino_busqueda}': {len(libros)} encontrados")
-        print("-" * 80)
-        for libro in libros:
-            print(f"   [{libro[0]}] {libro[1]} - {libro[2]}")
-            print(f"       Estado: {libro[4]} | Categoría: {libro[5] or 'Sin categoría'}")
-            if libro[6]:
-                print(f"       Ubicación: {libro[6]}")
-            print()
+        conexion = obtener_conexion(lectura=True)
+        cursor = conexion.cursor(cursor_registros(LibroEncontrado))
+        
+        termino_busqueda = termino_busqueda.strip()
+        if modo == 'auto':
+            modo = _modo_busqueda(termino_busqueda)
+        
+        def ejecutar(modo_consulta):
+            desde, where, orden, params = _consulta_busqueda(termino_busqueda, modo_consulta,
+                                                             es_sqlite(conexion))
+            cursor.execute(CONSULTA_BUSQUEDA.format(desde=desde, where=where, orden=orden), params)
+            return _con_nombre_categoria(list(cursor.fetchall()))
+        
+        try:
+            libros = ejecutar(modo)
+        except Error as e:
+            if modo != 'texto' or e.args[0] not in (ER_FT_MATCHING_KEY_NOT_FOUND, ER_NO_SUCH_TABLE):
+                raise
+            # Base sin la migración del índice FULLTEXT (o de libros_fts): búsqueda anterior con LIKE
+            libros = ejecutar('contiene')
+        
+        if mostrar:
+            escribir(formatear_busqueda(termino_busqueda, libros))
         
         return libros
-    except Error as e:
-        print(f"❌ Error al buscar libro: {e}")
-        return None
     finally:
         if cursor:
             cursor.close()
-        if conexion and conexion.open:
-            conexion.close()
+        if conexion:
+            liberar_conexion(conexion)
 
+@operacion_bd("actualizar el libro")
 def actualizar_libro(libro_id, **kwargs):
     """
     Actualiza información de un libro
@@ -421,34 +706,29 @@ def actualizar_libro(libro_id, **kwargs):
     
     Returns:
         True si se actualizó correctamente, False en caso contrario
+    
+    Raises:
+        ErrorBaseDatos: Si falla la operación en la base de datos
     """
-    config = get_pymysql_config()
     conexion = None
     cursor = None
     
     try:
-        conexion = pymysql.connect(**config)
+        conexion = obtener_conexion()
         cursor = conexion.cursor()
         
-        # Construir la consulta dinámicamente
-        campos_permitidos = ['titulo', 'autor', 'isbn', 'editorial', 'año_publicacion', 
-                           'categoria_id', 'paginas', 'estado', 'ubicacion', 'notas']
-        campos_actualizar = []
-        valores = []
+        # El UPDATE se arma una vez por combinación de campos (ver sentencias.py)
+        campos = tuple(campo for campo in kwargs if campo in CAMPOS_ACTUALIZABLES_LIBRO)
         
-        for campo, valor in kwargs.items():
-            if campo in campos_permitidos:
-                campos_actualizar.append(f"{campo} = %s")
-                valores.append(valor)
-        
-        if not campos_actualizar:
+        if not campos:
             print("❌ No se proporcionaron campos válidos para actualizar")
             return False
         
-        query = f"UPDATE libros SET {', '.join(campos_actualizar)} WHERE id = %s"
+        # Si cambia el ISBN también cambia su forma canónica (isbn13)
+        campos, valores = con_campos_calculados(campos, [kwargs[campo] for campo in campos])
         valores.append(libro_id)
         
-        cursor.execute(query, valores)
+        cursor.execute(sql_actualizar_libro(campos), valores)
         conexion.commit()
         
         if cursor.rowcount > 0:
@@ -457,16 +737,126 @@ def actualizar_libro(libro_id, **kwargs):
         else:
             print(f"⚠️ No se encontró el libro con ID {libro_id}")
             return False
-    except Error as e:
-        print(f"❌ Error al actualizar libro: {e}")
-        conexion.rollback()
-        return False
     finally:
         if cursor:
             cursor.close()
-        if conexion and conexion.open:
-            conexion.close()
+        if conexion:
+            liberar_conexion(conexion)
+
+def _filtro_libros(estado=None, categoria_id=None, ubicacion=None, autor=None, ids=None):
+    """
+    Arma la condición WHERE de las operaciones masivas sobre libros
+    
+    Returns:
+        Tupla (condiciones, parámetros); condiciones vacía si no hay filtros
+    """
+    condiciones = []
+    params = []
+    if estado:
+        condiciones.append("estado = %s")
+        params.append(estado)
+    if categoria_id:
+        condiciones.append("categoria_id = %s")
+        params.append(categoria_id)
+    if ubicacion:
+        condiciones.append("ubicacion = %s")
+        params.append(ubicacion)
+    if autor:
+        condiciones.append("autor = %s")
+        params.append(autor)
+    if ids is not None:
+        ids = list(ids)
+        # Una lista vacía no debe convertirse en "sin filtro"
+        condiciones.append(f"id IN ({_marcadores(len(ids))})" if ids else "FALSE")
+        params.extend(ids)
+    return " AND ".join(condiciones), params
+
+@operacion_bd("actualizar libros en bloque")
+def actualizar_libros(cambios, estado=None, categoria_id=None, ubicacion=None, autor=None,
+                      ids=None, tamaño_lote=1000, simular=False):
+    """
+    Aplica los mismos cambios a todos los libros que cumplen un filtro
+    
+    Los libros se recorren por id en lotes: cada lote lee sus id con una lectura
+    sin bloqueos y los actualiza con un único UPDATE que vuelve a comprobar el
+    filtro, confirmado en su propia transacción corta. Así una operación sobre
+    miles de libros no retiene bloqueos sobre toda la tabla.
+    
+    Args:
+        cambios: Diccionario {campo: valor} con campos de CAMPOS_ACTUALIZABLES_LIBRO
+        estado, categoria_id, ubicacion, autor: Filtros por igualdad (se combinan con AND)
+        ids: Lista de IDs de libros
+        tamaño_lote: Libros por UPDATE/commit
+        simular: Si es True, solo cuenta los libros que se actualizarían
+    
+    Returns:
+        Cantidad de libros actualizados (o que se actualizarían si simular=True),
+        o None si no hay campos válidos
+    
+    Raises:
+        ErrorBaseDatos: Si falla la operación en la base de datos
+    """
+    campos = tuple(campo for campo in cambios if campo in CAMPOS_ACTUALIZABLES_LIBRO)
+    if not campos:
+        print("❌ No se proporcionaron campos válidos para actualizar")
+        return None
+    
+    filtro, params_filtro = _filtro_libros(estado, categoria_id, ubicacion, autor, ids)
+    if not filtro:
+        print("❌ Se necesita al menos un filtro para la actualización masiva")
+        return None
+    
+    if tamaño_lote < 1:
+        raise ValueError("tamaño_lote debe ser mayor que 0")
+    
+    conexion = None
+    cursor = None
+    
+    try:
+        conexion = obtener_conexion()
+        cursor = conexion.cursor()
+        
+        if simular:
+            cursor.execute(f"SELECT COUNT(*) FROM libros WHERE {filtro}", params_filtro)
+            cantidad = cursor.fetchone()[0]
+            print(f"🔎 Simulación: se actualizarían {cantidad} libros")
+            return cantidad
+        
+        campos, valores = con_campos_calculados(campos, [cambios[campo] for campo in campos])
+        actualizados = 0
+        lotes = 0
+        ultimo_id = 0
+        while True:
+            cursor.execute(f"""
+                SELECT id FROM libros
+                WHERE {filtro} AND id > %s
+                ORDER BY id
+                LIMIT %s
+            """, params_filtro + [ultimo_id, tamaño_lote])
+            lote = [fila[0] for fila in cursor.fetchall()]
+            if not lote:
+                break
+            
+            cursor.execute(f"""
+                UPDATE libros SET {asignaciones_libro(campos)}
+                WHERE id IN ({_marcadores(len(lote))}) AND {filtro}
+            """, valores + lote + params_filtro)
+            conexion.commit()
+            actualizados += cursor.rowcount
+            lotes += 1
+            ultimo_id = lote[-1]
+            if len(lote) < tamaño_lote:
+                break
+        
+        print(f"✅ {actualizados} libros actualizados en {lotes} lotes")
+        return actualizados
+    finally:
+        if cursor:
+            cursor.close()
+        if conexion:
+            liberar_conexion(conexion)
 
+@operacion_bd("eliminar el libro")
 def eliminar_libro(libro_id):
     """
     Elimina un libro de la biblioteca
@@ -476,13 +866,15 @@ def eliminar_libro(libro_id):
     
     Returns:
         True si se eliminó correctamente, False en caso contrario
+    
+    Raises:
+        ErrorBaseDatos: Si falla la operación en la base de datos
     """
-    config = get_pymysql_config()
     conexion = None
     cursor = None
     
     try:
-        conexion = pymysql.connect(**config)
+        conexion = obtener_conexion()
         cursor = conexion.cursor()
         
         # Primero obtener el título para mostrar
@@ -499,52 +891,41 @@ def eliminar_libro(libro_id):
         
         print(f"✅ Libro '{libro[0]}' (ID: {libro_id}) eliminado exitosamente")
         return True
-    except Error as e:
-        print(f"❌ Error al eliminar libro: {e}")
-        conexion.rollback()
-        return False
     finally:
         if cursor:
             cursor.close()
-        if conexion and conexion.open:
-            conexion.close()
+        if conexion:
+            liberar_conexion(conexion)
 
-def listar_categorias():
+@operacion_bd("listar categorías")
+def listar_categorias(refrescar=False, mostrar=True):
     """
     Lista todas las categorías disponibles
     
+    Las categorías se leen de la caché en memoria; la base solo se consulta
+    cuando la caché vence, se invalida o se pide refrescar.
+    
+    Args:
+        refrescar: Si es True, vuelve a leer las categorías de la base
+        mostrar: Si es False, solo retorna las categorías sin imprimir nada
+    
     Returns:
-        Lista de categorías
+        Lista de filas Categoria (ver modelos.py)
+    
+    Raises:
+        ErrorBaseDatos: Si falla la operación en la base de datos
     """
-    config = get_pymysql_config()
-    conexion = None
-    cursor = None
+    catalogo = cache_categorias.obtener(refrescar)
+    categorias = sorted((Categoria(cat_id, nombre, descripcion)
+                         for cat_id, (nombre, descripcion) in catalogo.items()),
+                        key=lambda cat: cat.nombre.casefold())
     
-    try:
-        conexion = pymysql.connect(**config)
-        cursor = conexion.cursor()
-        
-        cursor.execute("SELECT id, nombre, descripcion FROM categorias ORDER BY nombre")
-        categorias = cursor.fetchall()
-        
-        print(f"\n📂 Categorías disponibles: {len(categorias)}")
-        print("-" * 60)
-        for cat in categorias:
-            print(f"   [{cat[0]}] {cat[1]}")
-            if cat[2]:
-                print(f"       {cat[2]}")
-            print()
-        
-        return categorias
-    except Error as e:
-        print(f"❌ Error al listar categorías: {e}")
-        return None
-    finally:
-        if cursor:
-            cursor.close()
-        if conexion and conexion.open:
-            conexion.close()
+    if mostrar:
+        escribir(formatear_categorias(categorias))
+    
+    return categorias
 
+@operacion_bd("agregar la categoría", idempotente=False)
 def agregar_categoria(nombre, descripcion=None):
     """
     Agrega una nueva categoría
@@ -554,36 +935,106 @@ def agregar_categoria(nombre, descripcion=None):
         descripcion: Descripción opcional
     
     Returns:
-        ID de la categoría insertada o None si hay error
+        ID de la categoría insertada
+    
+    Raises:
+        ErrorBaseDatos: Si falla la operación en la base de datos
     """
-    config = get_pymysql_config()
     conexion = None
     cursor = None
     
     try:
-        conexion = pymysql.connect(**config)
+        conexion = obtener_conexion()
         cursor = conexion.cursor()
         
         insert_query = "INSERT INTO categorias (nombre, descripcion) VALUES (%s, %s)"
         cursor.execute(insert_query, (nombre, descripcion))
         conexion.commit()
+        cache_categorias.invalidar()
         categoria_id = cursor.lastrowid
         print(f"✅ Categoría '{nombre}' agregada exitosamente (ID: {categoria_id})")
         return categoria_id
-    except Error as e:
-        print(f"❌ Error al agregar categoría: {e}")
-        conexion.rollback()
-        return None
     finally:
         if cursor:
             cursor.close()
-        if conexion and conexion.open:
-            conexion.close()
+        if conexion:
+            liberar_conexion(conexion)
+
+# Sentencias de préstamo y devolución (compartidas con conexion_async.py)
+SQL_MARCAR_PRESTADO = """
+UPDATE libros SET estado = 'Prestado' WHERE id = %s AND estado = 'Disponible'
+"""
+SQL_INSERTAR_PRESTAMO = """
+INSERT INTO prestamos (libro_id, persona_id, persona_prestamo, fecha_prestamo,
+                       fecha_devolucion_esperada, notas)
+VALUES (%s, %s, %s, %s, %s, %s)
+"""
+SQL_BLOQUEAR_PERSONA = """
+SELECT id, nombre, limite_prestamos FROM personas WHERE nombre_normalizado = %s FOR UPDATE
+"""
+SQL_CREAR_PERSONA = """
+INSERT IGNORE INTO personas (nombre, nombre_normalizado) VALUES (%s, %s)
+"""
+SQL_CONTAR_ACTIVOS_PERSONA = """
+SELECT COUNT(*) FROM prestamos WHERE persona_id = %s AND estado IN ('Prestado', 'Vencido')
+"""
+SQL_TITULO_ESTADO_LIBRO = """
+SELECT titulo, estado FROM libros WHERE id = %s
+"""
+SQL_BLOQUEAR_LIBRO = """
+SELECT id FROM libros WHERE id = %s FOR UPDATE
+"""
+SQL_BLOQUEAR_PRESTAMO_ACTIVO = """
+SELECT id FROM prestamos
+WHERE id = %s AND libro_id = %s AND estado IN ('Prestado', 'Vencido')
+FOR UPDATE
+"""
+SQL_BLOQUEAR_PRESTAMO_RECIENTE = """
+SELECT id FROM prestamos
+WHERE libro_id = %s AND estado IN ('Prestado', 'Vencido')
+ORDER BY fecha_prestamo DESC, id DESC LIMIT 1
+FOR UPDATE
+"""
+SQL_CERRAR_PRESTAMO = """
+UPDATE prestamos
+SET estado = 'Devuelto', fecha_devolucion_real = %s
+WHERE id = %s
+"""
+SQL_MARCAR_DISPONIBLE = """
+UPDATE libros SET estado = 'Disponible' WHERE id = %s AND estado = 'Prestado'
+"""
 
+def _bloquear_persona(cursor, nombre):
+    """
+    Bloquea la fila de la persona (creándola si es la primera vez que pide un
+    libro), de modo que los préstamos simultáneos a una misma persona se
+    ordenan y su límite no se supera. Se llama después de bloquear el libro,
+    para que un préstamo rechazado no deje registrada a una persona nueva.
+    
+    Returns:
+        Tupla (persona_id, nombre guardado, límite efectivo o None si no tiene)
+    """
+    clave = normalizar_nombre(nombre)
+    cursor.execute(SQL_BLOQUEAR_PERSONA, (clave,))
+    persona = cursor.fetchone()
+    if not persona:
+        cursor.execute(SQL_CREAR_PERSONA, (limpiar_nombre(nombre), clave))
+        cursor.execute(SQL_BLOQUEAR_PERSONA, (clave,))
+        persona = cursor.fetchone()
+    persona_id, guardado, limite = persona
+    return persona_id, guardado, limite_efectivo(limite, get_prestamos_config()['limite_por_persona'])
+
+@operacion_bd("prestar el libro", idempotente=False, reintentar=False)
 def prestar_libro(libro_id, persona, fecha_devolucion_esperada=None, notas=None):
     """
     Registra un préstamo de libro
     
+    El cambio de estado del libro se hace con un UPDATE condicionado a
+    estado = 'Disponible', de modo que si varios clientes intentan prestar
+    el mismo libro a la vez solo uno lo consigue. Después se bloquea la fila
+    de la persona y se cuentan sus préstamos activos contra su límite; si lo
+    alcanzó, el libro vuelve a quedar disponible.
+    
     Args:
         libro_id: ID del libro a prestar
         persona: Nombre de la persona a quien se presta
@@ -591,253 +1042,844 @@ def prestar_libro(libro_id, persona, fecha_devolucion_esperada=None, notas=None)
         notas: Notas adicionales (opcional)
     
     Returns:
-        ID del préstamo o None si hay error
+        ID del préstamo, o None si el libro no existe o no está disponible,
+        o la persona alcanzó su límite de préstamos
+    
+    Raises:
+        ErrorBaseDatos: Si falla la operación en la base de datos
     """
     from datetime import date
     
-    config = get_pymysql_config()
-    conexion = None
-    cursor = None
+    if not normalizar_nombre(persona or ''):
+        print("❌ Falta el nombre de la persona")
+        return None
     
-    try:
-        conexion = pymysql.connect(**config)
-        cursor = conexion.cursor()
-        
-        # Verificar que el libro existe y está disponible
-        cursor.execute("SELECT titulo, estado FROM libros WHERE id = %s", (libro_id,))
-        libro = cursor.fetchone()
-        
-        if not libro:
-            print(f"❌ No se encontró el libro con ID {libro_id}")
-            return None
-        
-        if libro[1] != 'Disponible':
-            print(f"⚠️ El libro '{libro[0]}' no está disponible. Estado actual: {libro[1]}")
-            return None
-        
-        # Insertar préstamo
-        insert_prestamo = """
-        INSERT INTO prestamos (libro_id, persona_prestamo, fecha_prestamo, fecha_devolucion_esperada, notas)
-        VALUES (%s, %s, %s, %s, %s)
-        """
-        fecha_prestamo = date.today()
-        cursor.execute(insert_prestamo, (libro_id, persona, fecha_prestamo, fecha_devolucion_esperada, notas))
+    def operacion(cursor):
+        # Marcar el libro como prestado solo si sigue disponible (bloquea la fila)
+        cursor.execute(SQL_MARCAR_PRESTADO, (libro_id,))
+        if cursor.rowcount != 1:
+            cursor.execute(SQL_TITULO_ESTADO_LIBRO, (libro_id,))
+            return None, None, cursor.fetchone(), None
+        
+        persona_id, nombre, limite = _bloquear_persona(cursor, persona)
+        if limite is not None:
+            cursor.execute(SQL_CONTAR_ACTIVOS_PERSONA, (persona_id,))
+            activos = cursor.fetchone()[0]
+            if activos >= limite:
+                cursor.execute(SQL_MARCAR_DISPONIBLE, (libro_id,))
+                return None, nombre, None, limite
+        
+        cursor.execute(SQL_INSERTAR_PRESTAMO,
+                       (libro_id, persona_id, nombre, date.today(), fecha_devolucion_esperada, notas))
         prestamo_id = cursor.lastrowid
         
-        # Actualizar estado del libro
-        cursor.execute("UPDATE libros SET estado = 'Prestado' WHERE id = %s", (libro_id,))
-        
-        conexion.commit()
-        print(f"✅ Libro '{libro[0]}' prestado a {persona} (Préstamo ID: {prestamo_id})")
-        return prestamo_id
-    except Error as e:
-        print(f"❌ Error al prestar libro: {e}")
-        conexion.rollback()
+        cursor.execute(SQL_TITULO_ESTADO_LIBRO, (libro_id,))
+        return prestamo_id, nombre, cursor.fetchone(), None
+    
+    prestamo_id, nombre, libro, limite_alcanzado = _reintentar_transaccion(operacion)
+    
+    if limite_alcanzado:
+        print(f"⚠️ {nombre} alcanzó su límite de {limite_alcanzado} préstamos activos")
         return None
-    finally:
-        if cursor:
-            cursor.close()
-        if conexion and conexion.open:
-            conexion.close()
+    
+    if not libro:
+        print(f"❌ No se encontró el libro con ID {libro_id}")
+        return None
+    
+    if prestamo_id is None:
+        print(f"⚠️ El libro '{libro[0]}' no está disponible. Estado actual: {libro[1]}")
+        return None
+    
+    print(f"✅ Libro '{libro[0]}' prestado a {nombre} (Préstamo ID: {prestamo_id})")
+    return prestamo_id
 
+@operacion_bd("devolver el libro", idempotente=False, reintentar=False)
 def devolver_libro(libro_id, prestamo_id=None):
     """
     Registra la devolución de un libro
     
+    El libro y el préstamo se bloquean (en ese orden, el mismo que usa
+    prestar_libro) antes de modificarlos, para que dos devoluciones
+    simultáneas no cierren el mismo préstamo.
+    
     Args:
         libro_id: ID del libro a devolver
         prestamo_id: ID del préstamo (opcional, si no se proporciona busca el préstamo activo)
     
     Returns:
         True si se devolvió correctamente, False en caso contrario
+    
+    Raises:
+        ErrorBaseDatos: Si falla la operación en la base de datos
     """
     from datetime import date
     
-    config = get_pymysql_config()
-    conexion = None
-    cursor = None
-    
-    try:
-        conexion = pymysql.connect(**config)
-        cursor = conexion.cursor()
+    def operacion(cursor):
+        cursor.execute(SQL_BLOQUEAR_LIBRO, (libro_id,))
         
-        # Si no se proporciona prestamo_id, buscar el préstamo activo
-        if not prestamo_id:
-            cursor.execute("""
-                SELECT id FROM prestamos 
-                WHERE libro_id = %s AND estado = 'Prestado' 
-                ORDER BY fecha_prestamo DESC LIMIT 1
-            """, (libro_id,))
-            prestamo = cursor.fetchone()
-            if prestamo:
-                prestamo_id = prestamo[0]
-            else:
-                print(f"❌ No se encontró un préstamo activo para el libro ID {libro_id}")
-                return False
+        if prestamo_id:
+            cursor.execute(SQL_BLOQUEAR_PRESTAMO_ACTIVO, (prestamo_id, libro_id))
+        else:
+            # Buscar el préstamo activo más reciente
+            cursor.execute(SQL_BLOQUEAR_PRESTAMO_RECIENTE, (libro_id,))
+        prestamo = cursor.fetchone()
+        if not prestamo:
+            return False
         
         # Actualizar préstamo
-        cursor.execute("""
-            UPDATE prestamos 
-            SET estado = 'Devuelto', fecha_devolucion_real = %s 
-            WHERE id = %s
-        """, (date.today(), prestamo_id))
+        cursor.execute(SQL_CERRAR_PRESTAMO, (date.today(), prestamo[0]))
         
-        # Actualizar estado del libro
-        cursor.execute("UPDATE libros SET estado = 'Disponible' WHERE id = %s", (libro_id,))
-        
-        conexion.commit()
-        print(f"✅ Libro ID {libro_id} devuelto exitosamente")
+        # Actualizar estado del libro (si se marcó como perdido o en reparación, se respeta)
+        cursor.execute(SQL_MARCAR_DISPONIBLE, (libro_id,))
         return True
-    except Error as e:
-        print(f"❌ Error al devolver libro: {e}")
-        conexion.rollback()
+    
+    devuelto = _reintentar_transaccion(operacion)
+    
+    if not devuelto:
+        print(f"❌ No se encontró un préstamo activo para el libro ID {libro_id}")
         return False
-    finally:
-        if cursor:
-            cursor.close()
-        if conexion and conexion.open:
-            conexion.close()
+    
+    print(f"✅ Libro ID {libro_id} devuelto exitosamente")
+    return True
+
+@operacion_bd("prestar libros", idempotente=False, reintentar=False)
+def prestar_libros(prestamos):
+    """
+    Registra varios préstamos en una sola transacción
+    
+    Los libros pedidos se bloquean con un único SELECT ... FOR UPDATE (en orden
+    de id, para no provocar deadlocks con otros lotes), los préstamos se insertan
+    con un INSERT multi-fila y los libros cambian de estado con un único UPDATE.
+    Después se bloquean las personas con algún libro disponible, como en
+    prestar_libro, y sus préstamos activos se cuentan con una sola consulta
+    para respetar cada límite; una persona nueva se registra solo si hay
+    algún libro para ella.
+    Un libro que no existe, no está disponible, aparece repetido en la lista
+    o excede el límite de la persona se informa en su resultado sin impedir
+    el resto de los préstamos.
+    
+    Args:
+        prestamos: Lista de tuplas (libro_id, persona[, fecha_devolucion_esperada[, notas]])
+    
+    Returns:
+        Lista con una tupla (libro_id, prestamo_id, motivo) por préstamo pedido, en el
+        mismo orden; prestamo_id es None y motivo explica el rechazo si no se prestó
+    
+    Raises:
+        ErrorBaseDatos: Si falla la operación en la base de datos
+    """
+    from datetime import date
+    
+    pedidos = [tuple(prestamo) + (None,) * (4 - len(prestamo)) for prestamo in prestamos]
+    if not pedidos:
+        return []
+    claves = [normalizar_nombre(pedido[1] or '') for pedido in pedidos]
+    nombres = {}
+    for clave, pedido in zip(claves, pedidos):
+        if clave:
+            nombres.setdefault(clave, pedido[1])
+    
+    def operacion(cursor):
+        # Los libros y luego las personas en orden de nombre, como prestar_libro
+        ids = sorted({pedido[0] for pedido in pedidos})
+        cursor.execute(f"""
+            SELECT id, titulo, estado FROM libros
+            WHERE id IN ({_marcadores(len(ids))})
+            ORDER BY id
+            FOR UPDATE
+        """, ids)
+        estados = {fila[0]: fila[2] for fila in cursor.fetchall()}
+        
+        candidatos = []
+        motivos = {}
+        vistos = set()
+        for posicion, pedido in enumerate(pedidos):
+            libro_id = pedido[0]
+            if libro_id in vistos:
+                motivos[posicion] = "Libro repetido en la lista"
+            elif not claves[posicion]:
+                motivos[posicion] = "Falta el nombre de la persona"
+            elif libro_id not in estados:
+                motivos[posicion] = "Libro inexistente"
+            elif estados[libro_id] != 'Disponible':
+                motivos[posicion] = f"No disponible (estado: {estados[libro_id]})"
+            else:
+                candidatos.append(posicion)
+            vistos.add(libro_id)
+        
+        personas = {clave: _bloquear_persona(cursor, nombres[clave])
+                    for clave in sorted({claves[posicion] for posicion in candidatos})}
+        con_limite = [persona_id for persona_id, _, limite in personas.values() if limite is not None]
+        activos = {}
+        if con_limite:
+            cursor.execute(f"""
+                SELECT persona_id, COUNT(*) FROM prestamos
+                WHERE persona_id IN ({_marcadores(len(con_limite))}) AND estado IN ('Prestado', 'Vencido')
+                GROUP BY persona_id
+            """, con_limite)
+            activos = dict(cursor.fetchall())
+        
+        aceptados = []
+        for posicion in candidatos:
+            persona_id, _, limite = personas[claves[posicion]]
+            if limite is not None and activos.get(persona_id, 0) >= limite:
+                motivos[posicion] = f"Límite de préstamos de la persona alcanzado ({limite})"
+            else:
+                activos[persona_id] = activos.get(persona_id, 0) + 1
+                aceptados.append(posicion)
+        
+        ids_prestamo = {}
+        if aceptados:
+            libros_aceptados = [pedidos[posicion][0] for posicion in aceptados]
+            cursor.execute(f"""
+                UPDATE libros SET estado = 'Prestado'
+                WHERE id IN ({_marcadores(len(libros_aceptados))}) AND estado = 'Disponible'
+            """, libros_aceptados)
+            hoy = date.today()
+            cursor.executemany(SQL_INSERTAR_PRESTAMO, [
+                (pedidos[p][0],) + personas[claves[p]][:2] + (hoy,) + pedidos[p][2:]
+                for p in aceptados
+            ])
+            # Con los libros bloqueados, el préstamo más reciente de cada uno es el recién insertado
+            cursor.execute(f"""
+                SELECT libro_id, MAX(id) FROM prestamos
+                WHERE libro_id IN ({_marcadores(len(libros_aceptados))})
+                GROUP BY libro_id
+            """, libros_aceptados)
+            ids_prestamo = dict(cursor.fetchall())
+        
+        return [(pedido[0], ids_prestamo.get(pedido[0]) if posicion not in motivos else None,
+                 motivos.get(posicion))
+                for posicion, pedido in enumerate(pedidos)]
+    
+    resultados = _reintentar_transaccion(operacion)
+    
+    prestados = sum(1 for _, prestamo_id, _ in resultados if prestamo_id)
+    print(f"✅ {prestados} de {len(resultados)} libros prestados")
+    for libro_id, prestamo_id, motivo in resultados:
+        if motivo:
+            print(f"   ⚠️ Libro ID {libro_id}: {motivo}")
+    return resultados
+
+@operacion_bd("devolver libros", idempotente=False, reintentar=False)
+def devolver_libros(libro_ids):
+    """
+    Registra la devolución de varios libros en una sola transacción
+    
+    Bloquea los libros y luego sus préstamos activos (el mismo orden que
+    devolver_libro), cierra todos los préstamos con un UPDATE y marca los
+    libros como disponibles con otro.
+    
+    Args:
+        libro_ids: Lista de IDs de libros a devolver
+    
+    Returns:
+        Lista con una tupla (libro_id, prestamo_id, motivo) por libro pedido, en el
+        mismo orden; prestamo_id es el préstamo cerrado o None con el motivo del
+        rechazo
+    
+    Raises:
+        ErrorBaseDatos: Si falla la operación en la base de datos
+    """
+    from datetime import date
+    
+    libro_ids = list(libro_ids)
+    if not libro_ids:
+        return []
+    
+    def operacion(cursor):
+        ids = sorted(set(libro_ids))
+        cursor.execute(f"SELECT id FROM libros WHERE id IN ({_marcadores(len(ids))}) ORDER BY id FOR UPDATE",
+                       ids)
+        existentes = {fila[0] for fila in cursor.fetchall()}
+        
+        prestamo_activo = {}
+        if existentes:
+            cursor.execute(f"""
+                SELECT id, libro_id FROM prestamos
+                WHERE libro_id IN ({_marcadores(len(existentes))}) AND estado IN ('Prestado', 'Vencido')
+                ORDER BY libro_id, fecha_prestamo DESC, id DESC
+                FOR UPDATE
+            """, sorted(existentes))
+            for prestamo_id, libro_id in cursor.fetchall():
+                # Si un libro tuviera varios préstamos activos, se cierra el más reciente
+                prestamo_activo.setdefault(libro_id, prestamo_id)
+        
+        if prestamo_activo:
+            cursor.execute(f"""
+                UPDATE prestamos SET estado = 'Devuelto', fecha_devolucion_real = %s
+                WHERE id IN ({_marcadores(len(prestamo_activo))})
+            """, [date.today()] + list(prestamo_activo.values()))
+            cursor.execute(f"""
+                UPDATE libros SET estado = 'Disponible'
+                WHERE id IN ({_marcadores(len(prestamo_activo))}) AND estado = 'Prestado'
+            """, list(prestamo_activo))
+        
+        resultados = []
+        vistos = set()
+        for libro_id in libro_ids:
+            if libro_id in vistos:
+                resultados.append((libro_id, None, "Libro repetido en la lista"))
+            elif libro_id not in existentes:
+                resultados.append((libro_id, None, "Libro inexistente"))
+            elif libro_id not in prestamo_activo:
+                resultados.append((libro_id, None, "Sin préstamo activo"))
+            else:
+                resultados.append((libro_id, prestamo_activo[libro_id], None))
+            vistos.add(libro_id)
+        return resultados
+    
+    resultados = _reintentar_transaccion(operacion)
+    
+    devueltos = sum(1 for _, prestamo_id, _ in resultados if prestamo_id)
+    print(f"✅ {devueltos} de {len(resultados)} libros devueltos")
+    for libro_id, prestamo_id, motivo in resultados:
+        if motivo:
+            print(f"   ⚠️ Libro ID {libro_id}: {motivo}")
+    return resultados
 
-def listar_prestamos(estado=None, mostrar_todos=True):
+def _filtro_prestamos(estado=None, mostrar_todos=True, despues_de=None, alias='p',
+                      persona_id=None, activos=False):
+    """
+    Condiciones de persona, estado y keyset de _consulta_prestamos
+    
+    Returns:
+        Tupla (condiciones SQL que empiezan con AND, parámetros)
+    """
+    condiciones = ""
+    params = []
+    
+    if persona_id is not None:
+        condiciones += f" AND {alias}.persona_id = %s"
+        params.append(persona_id)
+    
+    if activos:
+        condiciones += f" AND {alias}.estado IN ('Prestado', 'Vencido')"
+    
+    if not mostrar_todos and estado:
+        condiciones += f" AND {alias}.estado = %s"
+        params.append(estado)
+    
+    if despues_de:
+        fecha_prestamo, prestamo_id = despues_de
+        condiciones += (f" AND ({alias}.fecha_prestamo < %s"
+                        f" OR ({alias}.fecha_prestamo = %s AND {alias}.id < %s))")
+        params.extend([fecha_prestamo, fecha_prestamo, prestamo_id])
+    
+    return condiciones, params
+
+def _consulta_prestamos(estado=None, mostrar_todos=True, despues_de=None, limite=None,
+                        historico=False, persona_id=None, activos=False):
+    """
+    Arma la consulta de listar_prestamos ordenada por (fecha_prestamo, id) descendente,
+    con paginación por keyset igual que _consulta_libros
+    
+    Con historico=True incluye prestamos_historico. En lugar de leer la vista
+    prestamos_todos, filtra y limita cada tabla por separado (cada una con
+    su índice) y une solo esas filas.
+    
+    Returns:
+        Tupla (query, parámetros)
+    """
+    columnas = """p.id, l.titulo, l.autor, p.persona_prestamo, p.fecha_prestamo, 
+           p.fecha_devolucion_esperada, p.fecha_devolucion_real, p.estado"""
+    
+    if historico:
+        partes = []
+        params = []
+        for tabla in ('prestamos', 'prestamos_historico'):
+            condiciones, params_tabla = _filtro_prestamos(estado, mostrar_todos, despues_de, 't',
+                                                          persona_id, activos)
+            parte = (f"SELECT t.id, t.libro_id, t.persona_prestamo, t.fecha_prestamo, "
+                     f"t.fecha_devolucion_esperada, t.fecha_devolucion_real, t.estado "
+                     f"FROM {tabla} t WHERE 1=1{condiciones}")
+            if limite:
+                parte += " ORDER BY t.fecha_prestamo DESC, t.id DESC LIMIT %s"
+                params_tabla.append(limite)
+            partes.append(f"SELECT * FROM ({parte}) {tabla}")
+            params.extend(params_tabla)
+        query = f"""
+    SELECT {columnas}
+    FROM ({' UNION ALL '.join(partes)}) p
+    JOIN libros l ON p.libro_id = l.id
+    """
+    else:
+        condiciones, params = _filtro_prestamos(estado, mostrar_todos, despues_de,
+                                                persona_id=persona_id, activos=activos)
+        query = f"""
+    SELECT {columnas}
+    FROM prestamos p
+    JOIN libros l ON p.libro_id = l.id
+    WHERE 1=1{condiciones}
+    """
+    
+    query += " ORDER BY p.fecha_prestamo DESC, p.id DESC"
+    
+    if limite:
+        query += " LIMIT %s"
+        params.append(limite)
+    
+    return query, params
+
+def clave_pagina_prestamo(prestamo):
+    """
+    Retorna la clave (fecha_prestamo, id) de un préstamo, para pedir la página siguiente
+    """
+    return (prestamo.fecha_prestamo, prestamo.id)
+
+@operacion_bd("listar préstamos")
+def listar_prestamos(estado=None, mostrar_todos=True, limite=None, despues_de=None, mostrar=True,
+                     historico=False, activos=False):
     """
     Lista los préstamos, opcionalmente filtrados por estado
     
     Args:
         estado: Filtrar por estado ('Prestado', 'Devuelto', 'Vencido')
         mostrar_todos: Si es True, muestra todos los préstamos
+        limite: Cantidad máxima de préstamos a devolver (tamaño de página, opcional)
+        despues_de: Clave (fecha_prestamo, id) del último préstamo de la página
+                    anterior, obtenida con clave_pagina_prestamo (opcional)
+        mostrar: Si es False, solo retorna los préstamos sin imprimir nada
+        historico: Si es True, incluye los préstamos archivados en prestamos_historico
+        activos: Si es True, solo los préstamos sin devolver ('Prestado' o 'Vencido')
     
     Returns:
-        Lista de préstamos
+        Lista de filas Prestamo (ver modelos.py)
+    
+    Raises:
+        ErrorBaseDatos: Si falla la operación en la base de datos
     """
-    config = get_pymysql_config()
     conexion = None
     cursor = None
     
     try:
-        conexion = pymysql.connect(**config)
-        cursor = conexion.cursor()
+        conexion = obtener_conexion(lectura=True)
+        cursor = conexion.cursor(cursor_registros(Prestamo))
         
-        query = """
-        SELECT p.id, l.titulo, l.autor, p.persona_prestamo, p.fecha_prestamo, 
-               p.fecha_devolucion_esperada, p.fecha_devolucion_real, p.estado
-        FROM prestamos p
-        JOIN libros l ON p.libro_id = l.id
-        WHERE 1=1
-        """
-        params = []
+        query, params = _consulta_prestamos(estado, mostrar_todos, despues_de, limite, historico,
+                                            activos=activos)
         
-        if not mostrar_todos and estado:
-            query += " AND p.estado = %s"
-            params.append(estado)
+        cursor.execute(query, params if params else None)
+        prestamos = list(cursor.fetchall())
         
-        query += " ORDER BY p.fecha_prestamo DESC"
+        if mostrar:
+            escribir(formatear_prestamos(prestamos))
         
-        cursor.execute(query, params if params else None)
-        prestamos = cursor.fetchall()
-        
-        print(f"\n📋 Préstamos encontrados: {len(prestamos)}")
-        print("-" * 80)
-        for p in prestamos:
-            print(f"   [{p[0]}] {p[1]} - {p[2]}")
-            print(f"       Prestado a: {p[3]} | Fecha préstamo: {p[4]} | Estado: {p[7]}")
-            if p[5]:
-                print(f"       Devolución esperada: {p[5]}")
-            if p[6]:
-                print(f"       Devolución real: {p[6]}")
-            print()
+        return prestamos
+    finally:
+        if cursor:
+            cursor.close()
+        if conexion:
+            liberar_conexion(conexion)
+
+def iterar_prestamos(estado=None, mostrar_todos=True, tamaño_pagina=1000, servidor=False,
+                     historico=False):
+    """
+    Recorre los préstamos sin cargar el resultado completo en memoria
+    
+    Args:
+        estado: Filtrar por estado
+        mostrar_todos: Si es True, no aplica filtros
+        tamaño_pagina: Filas leídas por consulta (o por lectura del socket si servidor=True)
+        servidor: Si es True, usa un único SSCursor en lugar de consultas paginadas
+        historico: Si es True, incluye los préstamos archivados
+    
+    Yields:
+        Filas Prestamo, como listar_prestamos
+    """
+    if servidor:
+        query, params = _consulta_prestamos(estado, mostrar_todos, historico=historico)
+        yield from _iterar_servidor(query, params, tamaño_pagina, Prestamo)
+        return
+    
+    despues_de = None
+    while True:
+        query, params = _consulta_prestamos(estado, mostrar_todos, despues_de, tamaño_pagina,
+                                            historico)
+        prestamos = _consultar(query, params, Prestamo)
+        yield from prestamos
+        if len(prestamos) < tamaño_pagina:
+            break
+        despues_de = clave_pagina_prestamo(prestamos[-1])
+
+SQL_ID_PERSONA = """
+SELECT id FROM personas WHERE nombre_normalizado = %s
+"""
+
+def _id_persona(cursor, persona):
+    """
+    Retorna el id de una persona dada por id o por nombre (sin importar
+    mayúsculas, acentos ni espacios), o None si no existe
+    """
+    if isinstance(persona, int):
+        return persona
+    cursor.execute(SQL_ID_PERSONA, (normalizar_nombre(persona),))
+    fila = cursor.fetchone()
+    return fila[0] if fila else None
+
+@operacion_bd("listar los préstamos de la persona")
+def prestamos_de_persona(persona, historico=False, limite=None, despues_de=None, mostrar=True):
+    """
+    Lista los préstamos activos de una persona o, con historico=True, todos
+    los que tuvo (incluidos los archivados)
+    
+    Las consultas buscan por persona_id en lugar de comparar nombres, sobre
+    el índice (persona_id, estado, fecha_prestamo) de prestamos y
+    (persona_id, fecha_prestamo) de prestamos_historico; como archivado.py
+    deja en prestamos solo los préstamos recientes, el historial ordena
+    pocas filas de esa tabla.
+    
+    Args:
+        persona: Nombre o id de la persona
+        historico: Si es True, lista el historial completo en lugar de los activos
+        limite: Cantidad máxima de préstamos a devolver (tamaño de página, opcional)
+        despues_de: Clave (fecha_prestamo, id) obtenida con clave_pagina_prestamo (opcional)
+        mostrar: Si es False, solo retorna los préstamos sin imprimir nada
+    
+    Returns:
+        Lista de filas Prestamo, o None si la persona no existe
+    
+    Raises:
+        ErrorBaseDatos: Si falla la operación en la base de datos
+    """
+    conexion = None
+    cursor = None
+    
+    try:
+        conexion = obtener_conexion(lectura=True)
+        with conexion.cursor() as cursor_persona:
+            persona_id = _id_persona(cursor_persona, persona)
+        if persona_id is None:
+            print(f"❌ No hay préstamos registrados a nombre de '{persona}'")
+            return None
+        
+        cursor = conexion.cursor(cursor_registros(Prestamo))
+        query, params = _consulta_prestamos(despues_de=despues_de, limite=limite, historico=historico,
+                                            persona_id=persona_id, activos=not historico)
+        cursor.execute(query, params)
+        prestamos = list(cursor.fetchall())
+        
+        if mostrar:
+            escribir(formatear_prestamos(prestamos))
         
         return prestamos
-    except Error as e:
-        print(f"❌ Error al listar préstamos: {e}")
-        return None
     finally:
         if cursor:
             cursor.close()
-        if conexion and conexion.open:
-            conexion.close()
+        if conexion:
+            liberar_conexion(conexion)
+
+@operacion_bd("listar las personas con más préstamos")
+def personas_con_mas_prestamos(limite=10, mostrar=True):
+    """
+    Personas ordenadas por cantidad total de préstamos (vigentes y archivados)
+    
+    El total se guarda en personas.total_prestamos, mantenido por triggers,
+    así que la consulta lee las primeras entradas de su índice en lugar de
+    agrupar todos los préstamos; solo se cuentan al leerlos los préstamos
+    activos de esas pocas personas.
+    
+    Args:
+        limite: Cantidad de personas
+        mostrar: Si es False, solo retorna las personas sin imprimir nada
+    
+    Returns:
+        Lista de filas Persona (ver modelos.py)
+    
+    Raises:
+        ErrorBaseDatos: Si falla la operación en la base de datos
+    """
+    personas = _consultar("""
+        SELECT pe.id, pe.nombre, pe.limite_prestamos, pe.total_prestamos,
+               (SELECT COUNT(*) FROM prestamos p
+                WHERE p.persona_id = pe.id AND p.estado IN ('Prestado', 'Vencido')) AS prestamos_activos
+        FROM personas pe
+        ORDER BY pe.total_prestamos DESC, pe.id DESC
+        LIMIT %s
+    """, (limite,), Persona)
+    
+    if mostrar:
+        escribir(formatear_personas(personas))
+    
+    return personas
+
+@operacion_bd("cambiar el límite de préstamos")
+def establecer_limite_prestamos(persona, limite):
+    """
+    Define cuántos préstamos activos puede tener una persona
+    
+    Args:
+        persona: Nombre de la persona (se crea si todavía no pidió libros) o su id
+        limite: Cantidad máxima de préstamos activos, 0 para no limitarla o
+                None para usar el límite general (DB_LIMITE_PRESTAMOS)
+    
+    Returns:
+        ID de la persona, o None si se indicó un id inexistente
+    
+    Raises:
+        ErrorBaseDatos: Si falla la operación en la base de datos
+        ValueError: Si el límite es negativo o falta el nombre
+    """
+    if limite is not None and limite < 0:
+        raise ValueError("El límite de préstamos no puede ser negativo")
+    if not isinstance(persona, int) and not normalizar_nombre(persona):
+        raise ValueError("Falta el nombre de la persona")
+    
+    def operacion(cursor):
+        if isinstance(persona, int):
+            persona_id = persona
+        else:
+            persona_id = _bloquear_persona(cursor, persona)[0]
+        cursor.execute("UPDATE personas SET limite_prestamos = %s WHERE id = %s", (limite, persona_id))
+        cursor.execute("SELECT nombre FROM personas WHERE id = %s", (persona_id,))
+        fila = cursor.fetchone()
+        return (persona_id, fila[0]) if fila else (None, None)
+    
+    persona_id, nombre = _reintentar_transaccion(operacion)
+    
+    if persona_id is None:
+        print(f"❌ No se encontró la persona con ID {persona}")
+        return None
+    
+    if limite is None:
+        print(f"✅ {nombre} usa el límite general de préstamos")
+    elif limite == 0:
+        print(f"✅ {nombre} no tiene límite de préstamos")
+    else:
+        print(f"✅ {nombre} puede tener hasta {limite} préstamos activos")
+    return persona_id
+
+@operacion_bd("unir las personas", idempotente=False, reintentar=False)
+def unir_personas(origen, destino):
+    """
+    Une dos registros de una misma persona (por ejemplo, un nombre mal
+    escrito): los préstamos de `origen`, vigentes y archivados, pasan a
+    `destino` con su nombre, su total se suma al de `destino` y `origen`
+    se elimina
+    
+    Args:
+        origen: Nombre o id de la persona que desaparece
+        destino: Nombre o id de la persona que se conserva
+    
+    Returns:
+        Cantidad de préstamos reasignados, o None si alguna persona no existe
+    
+    Raises:
+        ErrorBaseDatos: Si falla la operación en la base de datos
+    """
+    def operacion(cursor):
+        origen_id, destino_id = _id_persona(cursor, origen), _id_persona(cursor, destino)
+        if origen_id is None or destino_id is None or origen_id == destino_id:
+            return None
+        cursor.execute("""
+            SELECT id, nombre, total_prestamos FROM personas
+            WHERE id IN (%s, %s) ORDER BY id FOR UPDATE
+        """, (origen_id, destino_id))
+        filas = {fila[0]: fila for fila in cursor.fetchall()}
+        if len(filas) < 2:
+            return None
+        nombre_destino = filas[destino_id][1]
+        movidos = 0
+        for tabla in ('prestamos', 'prestamos_historico'):
+            cursor.execute(f"UPDATE {tabla} SET persona_id = %s, persona_prestamo = %s WHERE persona_id = %s",
+                           (destino_id, nombre_destino, origen_id))
+            movidos += cursor.rowcount
+        cursor.execute("UPDATE personas SET total_prestamos = total_prestamos + %s WHERE id = %s",
+                       (filas[origen_id][2], destino_id))
+        cursor.execute("DELETE FROM personas WHERE id = %s", (origen_id,))
+        return movidos, filas[origen_id][1], nombre_destino
+    
+    resultado = _reintentar_transaccion(operacion)
+    
+    if resultado is None:
+        print("❌ Hay que indicar dos personas distintas y existentes")
+        return None
+    
+    movidos, nombre_origen, nombre_destino = resultado
+    print(f"✅ '{nombre_origen}' unida a '{nombre_destino}': {movidos} préstamos reasignados")
+    return movidos
+
+# Error de MySQL cuando una tabla no existe (migración no aplicada)
+ER_NO_SUCH_TABLE = 1146
+
+# Lectura de las estadísticas en una sola consulta; {fuente} es la tabla de
+# contadores o, si todavía no existe, el conteo sobre las tablas reales
+CONSULTA_ESTADISTICAS = """
+SELECT e.tipo, e.clave, e.valor FROM {fuente} e WHERE e.tipo <> 'categoria'
+UNION ALL
+SELECT 'categoria', c.nombre, COALESCE(e.valor, 0)
+FROM categorias c
+LEFT JOIN {fuente} e ON e.tipo = 'categoria' AND e.clave = CAST(c.id AS CHAR)
+"""
+
+def _armar_estadisticas(filas):
+    """
+    Convierte las filas (tipo, clave, valor) de CONSULTA_ESTADISTICAS
+    en el diccionario que retorna estadisticas_biblioteca
+    """
+    totales = {clave: valor for tipo, clave, valor in filas if tipo == 'total'}
+    por_estado = [(clave, valor) for tipo, clave, valor in filas
+                  if tipo == 'estado' and valor > 0]
+    por_categoria = sorted(((clave, valor) for tipo, clave, valor in filas
+                            if tipo == 'categoria'),
+                           key=lambda fila: fila[1], reverse=True)
+    return {
+        'total_libros': totales.get('libros', 0),
+        'total_categorias': totales.get('categorias', 0),
+        'prestamos_activos': totales.get('prestamos_activos', 0),
+        'por_estado': dict(por_estado),
+        'por_categoria': dict(por_categoria)
+    }
 
-def estadisticas_biblioteca():
+@operacion_bd("obtener las estadísticas")
+def estadisticas_biblioteca(mostrar=True):
     """
     Muestra estadísticas de la biblioteca
     
+    Los valores se leen de la tabla estadisticas_contadores, que los triggers
+    mantienen al día en cada alta, baja o cambio de libros, préstamos y categorías.
+    
+    Args:
+        mostrar: Si es False, solo retorna las estadísticas sin imprimir nada
+    
     Returns:
         Diccionario con estadísticas
+    
+    Raises:
+        ErrorBaseDatos: Si falla la operación en la base de datos
     """
-    config = get_pymysql_config()
     conexion = None
     cursor = None
     
     try:
-        conexion = pymysql.connect(**config)
+        conexion = obtener_conexion(lectura=True)
         cursor = conexion.cursor()
         
-        # Total de libros
-        cursor.execute("SELECT COUNT(*) FROM libros")
-        total_libros = cursor.fetchone()[0]
+        try:
+            cursor.execute(CONSULTA_ESTADISTICAS.format(fuente='estadisticas_contadores'))
+        except Error as e:
+            if e.args[0] != ER_NO_SUCH_TABLE:
+                raise
+            # Base sin la migración de contadores: se cuenta sobre las tablas
+            cursor.execute(CONSULTA_ESTADISTICAS.format(fuente=f"({CONTEO_ESTADISTICAS})"))
+        estadisticas = _armar_estadisticas(cursor.fetchall())
         
-        # Libros por estado
-        cursor.execute("""
-            SELECT estado, COUNT(*) 
-            FROM libros 
-            GROUP BY estado
-        """)
-        por_estado = cursor.fetchall()
+        if mostrar:
+            escribir(formatear_estadisticas(estadisticas))
         
-        # Libros por categoría
-        cursor.execute("""
-            SELECT c.nombre, COUNT(l.id) 
-            FROM categorias c
-            LEFT JOIN libros l ON c.id = l.categoria_id
-            GROUP BY c.id, c.nombre
-            ORDER BY COUNT(l.id) DESC
-        """)
-        por_categoria = cursor.fetchall()
-        
-        # Préstamos activos
-        cursor.execute("SELECT COUNT(*) FROM prestamos WHERE estado = 'Prestado'")
-        prestamos_activos = cursor.fetchone()[0]
-        
-        # Total de categorías
-        cursor.execute("SELECT COUNT(*) FROM categorias")
-        total_categorias = cursor.fetchone()[0]
-        
-        print("\n📊 ESTADÍSTICAS DE LA BIBLIOTECA")
-        print("=" * 60)
-        print(f"📚 Total de libros: {total_libros}")
-        print(f"📂 Total de categorías: {total_categorias}")
-        print(f"📋 Préstamos activos: {prestamos_activos}")
-        print("\n📊 Libros por estado:")
-        for estado, cantidad in por_estado:
-            print(f"   {estado}: {cantidad}")
-        print("\n📊 Libros por categoría:")
-        for categoria, cantidad in por_categoria:
-            if cantidad > 0:
-                print(f"   {categoria}: {cantidad}")
-        
-        return {
-            'total_libros': total_libros,
-            'total_categorias': total_categorias,
-            'prestamos_activos': prestamos_activos,
-            'por_estado': dict(por_estado),
-            'por_categoria': dict(por_categoria)
-        }
-    except Error as e:
-        print(f"❌ Error al obtener estadísticas: {e}")
-        return None
+        return estadisticas
     finally:
         if cursor:
             cursor.close()
-        if conexion and conexion.open:
-            conexion.close()
+        if conexion:
+            liberar_conexion(conexion)
+
+@operacion_bd("recalcular las estadísticas")
+def recalcular_estadisticas():
+    """
+    Reconstruye la tabla estadisticas_contadores a partir de las tablas reales
+    y verifica si los contadores mantenidos por los triggers eran correctos
+    
+    Los contadores se bloquean durante el recálculo, de modo que las escrituras
+    concurrentes esperan y no se pierden.
+    
+    Returns:
+        Diccionario con 'consistente' (bool) y 'diferencias', una lista de
+        (tipo, clave, valor_guardado, valor_real)
+    
+    Raises:
+        ErrorBaseDatos: Si falla la operación en la base de datos
+    """
+    conexion = None
+    cursor = None
+    
+    try:
+        conexion = obtener_conexion()
+        cursor = conexion.cursor()
+        
+        cursor.execute("SELECT tipo, clave, valor FROM estadisticas_contadores FOR UPDATE")
+        guardados = {(tipo, clave): valor for tipo, clave, valor in cursor.fetchall() if valor != 0}
+        
+        cursor.execute(CONTEO_ESTADISTICAS)
+        reales = {(tipo, clave): valor for tipo, clave, valor in cursor.fetchall()}
+        
+        diferencias = [
+            (tipo, clave, guardados.get((tipo, clave), 0), reales.get((tipo, clave), 0))
+            for tipo, clave in sorted(set(guardados) | set(reales))
+            if guardados.get((tipo, clave), 0) != reales.get((tipo, clave), 0)
+        ]
+        
+        cursor.execute("DELETE FROM estadisticas_contadores")
+        cursor.executemany(
+            "INSERT INTO estadisticas_contadores (tipo, clave, valor) VALUES (%s, %s, %s)",
+            [(tipo, clave, valor) for (tipo, clave), valor in reales.items()])
+        conexion.commit()
+        
+        if diferencias:
+            print(f"⚠️ Se corrigieron {len(diferencias)} contadores inconsistentes:")
+            for tipo, clave, guardado, real in diferencias:
+                print(f"   {tipo}/{clave}: {guardado} -> {real}")
+        else:
+            print("✅ Los contadores de estadísticas son consistentes")
+        
+        return {'consistente': not diferencias, 'diferencias': diferencias}
+    finally:
+        if cursor:
+            cursor.close()
+        if conexion:
+            liberar_conexion(conexion)
 
 # ============================================
 # INTERFAZ DE MENÚ INTERACTIVO
 # ============================================
 
-def menu_principal():
+# Filas mostradas por página en los listados del menú
+TAMAÑO_PAGINA_MENU = 20
+
+def _paginar_en_menu(listar, clave, **filtros):
+    """
+    Muestra un listado página por página, pidiendo confirmación para continuar
+    
+    Args:
+        listar: listar_libros o listar_prestamos
+        clave: Función que obtiene la clave de paginación de la última fila
+        **filtros: Filtros que se pasan a la función de listado
+    """
+    despues_de = None
+    while True:
+        filas = listar(limite=TAMAÑO_PAGINA_MENU, despues_de=despues_de, **filtros)
+        if not filas or len(filas) < TAMAÑO_PAGINA_MENU:
+            break
+        seguir = input("⏎ Enter para la página siguiente, 'q' para terminar: ").strip().lower()
+        if seguir == 'q':
+            break
+        despues_de = clave(filas[-1])
+
+def menu_principal(sesion=True):
     """
     Interfaz de menú interactivo para gestionar la biblioteca
+    
+    Args:
+        sesion: Si es True, todas las opciones comparten una única conexión
+                persistente (ver pool_conexiones.sesion_persistente) en lugar
+                de pedir una al pool en cada operación
     """
+    if not sesion:
+        return _bucle_menu()
+    with sesion_persistente():
+        return _bucle_menu()
+
+def _bucle_menu():
+    # Un error de la base de datos se informa sin cerrar el menú; el circuito
+    # abierto (CircuitoAbiertoError) indica cuánto falta para volver a intentar
+    while True:
+        try:
+            return _atender_menu()
+        except ErrorBaseDatos as e:
+            print(f"❌ {e}")
+            input("\n⏎ Presiona Enter para continuar...")
+
+def _atender_menu():
     from datetime import date, timedelta
     
     while True:
@@ -856,6 +1898,9 @@ def menu_principal():
         print("  9. 📥 Devolver libro")
         print(" 10. 📋 Ver préstamos")
         print(" 11. 📊 Estadísticas")
+        print(" 12. 📦 Importar libros (CSV / JSON Lines)")
+        print(" 13. 🛠️  Actualización masiva de libros")
+        print(" 14. 💾 Exportar libros o préstamos (CSV / JSON Lines)")
         print("  0. 🚪 Salir")
         print("-"*60)
         
@@ -908,17 +1953,18 @@ def menu_principal():
             filtro = input("Selecciona opción (1-4, default=1): ").strip() or "1"
             
             if filtro == "1":
-                listar_libros(mostrar_todos=True)
+                _paginar_en_menu(listar_libros, clave_pagina_libro, mostrar_todos=True)
             elif filtro == "2":
-                listar_libros(estado="Disponible", mostrar_todos=False)
+                _paginar_en_menu(listar_libros, clave_pagina_libro, estado="Disponible", mostrar_todos=False)
             elif filtro == "3":
-                listar_libros(estado="Prestado", mostrar_todos=False)
+                _paginar_en_menu(listar_libros, clave_pagina_libro, estado="Prestado", mostrar_todos=False)
             elif filtro == "4":
                 categorias = listar_categorias()
                 if categorias:
                     cat_id_str = input("ID de categoría: ").strip()
                     if cat_id_str.isdigit():
-                        listar_libros(categoria_id=int(cat_id_str), mostrar_todos=False)
+                        _paginar_en_menu(listar_libros, clave_pagina_libro,
+                                         categoria_id=int(cat_id_str), mostrar_todos=False)
                     else:
                         print("❌ ID inválido")
                 else:
@@ -1017,8 +2063,9 @@ def menu_principal():
         elif opcion == "8":
             print("\n📤 PRESTAR LIBRO")
             print("-"*60)
-            libro_id_str = input("ID del libro a prestar: ").strip()
-            if not libro_id_str.isdigit():
+            libro_id_str = input("ID del libro a prestar (varios separados por coma): ").strip()
+            libro_ids = [parte.strip() for parte in libro_id_str.split(',')]
+            if not all(parte.isdigit() for parte in libro_ids):
                 print("❌ ID inválido")
                 continue
             
@@ -1037,16 +2084,23 @@ def menu_principal():
             
             notas = input("Notas (opcional): ").strip() or None
             
-            prestar_libro(int(libro_id_str), persona, fecha_devolucion, notas)
+            if len(libro_ids) == 1:
+                prestar_libro(int(libro_ids[0]), persona, fecha_devolucion, notas)
+            else:
+                prestar_libros([(int(libro_id), persona, fecha_devolucion, notas)
+                                for libro_id in libro_ids])
         
         elif opcion == "9":
             print("\n📥 DEVOLVER LIBRO")
             print("-"*60)
-            libro_id_str = input("ID del libro a devolver: ").strip()
-            if libro_id_str.isdigit():
-                devolver_libro(int(libro_id_str))
-            else:
+            libro_id_str = input("ID del libro a devolver (varios separados por coma): ").strip()
+            libro_ids = [parte.strip() for parte in libro_id_str.split(',')]
+            if not all(parte.isdigit() for parte in libro_ids):
                 print("❌ ID inválido")
+            elif len(libro_ids) == 1:
+                devolver_libro(int(libro_ids[0]))
+            else:
+                devolver_libros([int(libro_id) for libro_id in libro_ids])
         
         elif opcion == "10":
             print("\n📋 PRÉSTAMOS")
@@ -1054,31 +2108,121 @@ def menu_principal():
             print("  1. Todos los préstamos")
             print("  2. Solo préstamos activos")
             print("  3. Solo préstamos devueltos")
-            filtro = input("Selecciona opción (1-3, default=1): ").strip() or "1"
+            print("  4. Solo préstamos vencidos")
+            print("  5. Historial completo (incluye los archivados)")
+            print("  6. De una persona")
+            print("  7. Personas con más préstamos")
+            filtro = input("Selecciona opción (1-7, default=1): ").strip() or "1"
             
             if filtro == "1":
-                listar_prestamos(mostrar_todos=True)
+                _paginar_en_menu(listar_prestamos, clave_pagina_prestamo, mostrar_todos=True)
             elif filtro == "2":
-                listar_prestamos(estado="Prestado", mostrar_todos=False)
+                # Un préstamo vencido sigue activo: el libro no se devolvió
+                _paginar_en_menu(listar_prestamos, clave_pagina_prestamo, activos=True)
             elif filtro == "3":
-                listar_prestamos(estado="Devuelto", mostrar_todos=False)
+                _paginar_en_menu(listar_prestamos, clave_pagina_prestamo, estado="Devuelto", mostrar_todos=False)
+            elif filtro == "4":
+                # Actualizar los vencimientos antes de listar (usa el índice de estado)
+                marcar_prestamos_vencidos(mostrar=False)
+                _paginar_en_menu(listar_prestamos, clave_pagina_prestamo, estado="Vencido", mostrar_todos=False)
+            elif filtro == "5":
+                _paginar_en_menu(listar_prestamos, clave_pagina_prestamo, mostrar_todos=True, historico=True)
+            elif filtro == "6":
+                persona = input("Nombre de la persona: ").strip()
+                if not persona:
+                    print("❌ El nombre es obligatorio")
+                    continue
+                historico = input("¿Incluir los préstamos devueltos? (s/N): ").strip().lower() == 's'
+                _paginar_en_menu(prestamos_de_persona, clave_pagina_prestamo,
+                                 persona=persona, historico=historico)
+            elif filtro == "7":
+                personas_con_mas_prestamos()
         
         elif opcion == "11":
             estadisticas_biblioteca()
         
+        elif opcion == "12":
+            print("\n📦 IMPORTAR LIBROS")
+            print("-"*60)
+            print("Columnas: titulo, autor, isbn, editorial, año_publicacion,")
+            print("          categoria_id, paginas, ubicacion, notas")
+            ruta = input("Ruta del archivo (.csv o .jsonl): ").strip()
+            if not ruta:
+                print("❌ La ruta es obligatoria")
+                continue
+            lote_str = input("Tamaño de lote (opcional, default=1000): ").strip()
+            tamaño_lote = int(lote_str) if lote_str.isdigit() and int(lote_str) > 0 else 1000
+            importar_libros_archivo(ruta, tamaño_lote)
+        
+        elif opcion == "13":
+            print("\n🛠️ ACTUALIZACIÓN MASIVA DE LIBROS")
+            print("-"*60)
+            print("Filtrar por: 1. Estado  2. Categoría  3. Ubicación  4. Autor  5. Lista de IDs")
+            filtro = input("Selecciona filtro (1-5): ").strip()
+            valor = input("Valor del filtro: ").strip()
+            filtros = {}
+            if filtro == "1" and valor:
+                filtros['estado'] = valor
+            elif filtro == "2" and valor.isdigit():
+                filtros['categoria_id'] = int(valor)
+            elif filtro == "3" and valor:
+                filtros['ubicacion'] = valor
+            elif filtro == "4" and valor:
+                filtros['autor'] = valor
+            elif filtro == "5" and all(parte.strip().isdigit() for parte in valor.split(',')):
+                filtros['ids'] = [int(parte) for parte in valor.split(',')]
+            else:
+                print("❌ Filtro inválido")
+                continue
+            
+            campo = input(f"Campo a modificar ({', '.join(CAMPOS_ACTUALIZABLES_LIBRO)}): ").strip()
+            if campo not in CAMPOS_ACTUALIZABLES_LIBRO:
+                print("❌ Campo inválido")
+                continue
+            nuevo_valor = input("Nuevo valor (vacío = sin valor): ").strip() or None
+            if nuevo_valor and campo in ('año_publicacion', 'categoria_id', 'paginas'):
+                if not nuevo_valor.isdigit():
+                    print("❌ El valor debe ser un número")
+                    continue
+                nuevo_valor = int(nuevo_valor)
+            
+            cantidad = actualizar_libros({campo: nuevo_valor}, simular=True, **filtros)
+            if cantidad and input(f"¿Actualizar {cantidad} libros? (s/n): ").strip().lower() == 's':
+                actualizar_libros({campo: nuevo_valor}, **filtros)
+        
+        elif opcion == "14":
+            print("\n💾 EXPORTAR")
+            print("-"*60)
+            print("  1. Libros (con su categoría)")
+            print("  2. Préstamos")
+            tabla = {"1": "libros", "2": "prestamos"}.get(input("Selecciona opción (1-2): ").strip())
+            if not tabla:
+                print("❌ Opción inválida")
+                continue
+            ruta = input("Archivo de salida (.csv, .jsonl, con .gz para comprimir): ").strip()
+            if not ruta or ruta == '-':
+                print("❌ La ruta es obligatoria")
+                continue
+            exportar(tabla, ruta)
+        
         else:
             print("❌ Opción inválida. Por favor selecciona una opción del menú.")
         
         input("\n⏎ Presiona Enter para continuar...")
 
 if __name__ == "__main__":
-    # Verificar conexión y crear estructura
-    print("🔌 Verificando conexión a la base de datos...")
-    conectar_pymysql()
-    
-    print("\n" + "="*50)
-    print("Creando estructura de biblioteca (si no existe)...")
-    crear_estructura_biblioteca()
-    
-    # Iniciar menú interactivo
-    menu_principal()
\ No newline at end of file
+    try:
+        # La verificación inicial y el menú comparten la misma conexión
+        with sesion_persistente():
+            # Verificar conexión y crear estructura
+            print("🔌 Verificando conexión a la base de datos...")
+            conectar_pymysql()
+            
+            print("\n" + "="*50)
+            print("Creando estructura de biblioteca (si no existe)...")
+            crear_estructura_biblioteca()
+            
+            # Iniciar menú interactivo
+            menu_principal()
+    finally:
+        cerrar_pool()
\ No newline at end of file
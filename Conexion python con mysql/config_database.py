@@ -20,6 +20,11 @@ DATABASE_CONFIG = {
     'autocommit': True
 }
 
+def _segundos(variable, por_defecto):
+    """Lee un tiempo límite en segundos; 0 significa sin límite (None)"""
+    valor = float(os.getenv(variable, por_defecto))
+    return valor if valor > 0 else None
+
 # Configuración alternativa para PyMySQL
 PYMYSQL_CONFIG = {
     'host': os.getenv('DB_HOST', 'localhost'),
@@ -27,7 +32,90 @@ PYMYSQL_CONFIG = {
     'password': os.getenv('DB_PASSWORD', ''),
     'database': os.getenv('DB_NAME', 'test_db'),
     'port': int(os.getenv('DB_PORT', 3306)),
-    'charset': 'utf8mb4'
+    'charset': 'utf8mb4',
+    # Sin límites, un servidor que deja de responder bloquea la llamada para siempre
+    'connect_timeout': float(os.getenv('DB_CONNECT_TIMEOUT', 5)),
+    'read_timeout': _segundos('DB_READ_TIMEOUT', 300),
+    'write_timeout': _segundos('DB_WRITE_TIMEOUT', 60)
+}
+
+# Motor de almacenamiento: 'mysql' (servidor) o 'sqlite' (archivo local, sin servidor)
+MOTOR = os.getenv('DB_MOTOR', 'mysql').strip().lower()
+
+# Configuración del motor SQLite embebido
+SQLITE_CONFIG = {
+    'ruta': os.getenv('DB_SQLITE_RUTA', 'biblioteca.db'),
+    # Segundos que una escritura espera a que otra libere el archivo
+    'tiempo_espera': float(os.getenv('DB_SQLITE_ESPERA', 5))
+}
+
+# Configuración del pool de conexiones compartido
+POOL_CONFIG = {
+    'min_conexiones': int(os.getenv('DB_POOL_MIN', 1)),
+    'max_conexiones': int(os.getenv('DB_POOL_MAX', 10)),
+    'tiempo_inactividad': float(os.getenv('DB_POOL_IDLE_TIMEOUT', 300)),
+    'vida_maxima': float(os.getenv('DB_POOL_MAX_LIFETIME', 3600)),
+    'espera_maxima': float(os.getenv('DB_POOL_CHECKOUT_TIMEOUT', 30))
+}
+
+def _replicas(hosts):
+    """
+    Convierte 'host1:3306,host2' en configuraciones de PyMySQL para cada réplica,
+    con las mismas credenciales y base que el primario
+    """
+    replicas = []
+    for host in hosts.split(','):
+        host, _, puerto = host.strip().partition(':')
+        if host:
+            replicas.append({**PYMYSQL_CONFIG, 'host': host,
+                             'port': int(puerto) if puerto else PYMYSQL_CONFIG['port']})
+    return replicas
+
+# Réplicas de lectura: las consultas de solo lectura se reparten entre ellas
+REPLICAS_CONFIG = {
+    'replicas': _replicas(os.getenv('DB_REPLICAS', '')),
+    'estrategia': os.getenv('DB_REPLICA_ESTRATEGIA', 'round_robin'),
+    'retraso_maximo': float(os.getenv('DB_REPLICA_MAX_RETRASO', 5)),
+    'intervalo_verificacion': float(os.getenv('DB_REPLICA_VERIFICACION', 5)),
+    'ventana_escrituras': float(os.getenv('DB_REPLICA_VENTANA_ESCRITURAS', 5))
+}
+
+# Configuración de la sesión persistente del menú interactivo
+SESION_CONFIG = {
+    'intervalo_keepalive': float(os.getenv('DB_SESION_KEEPALIVE', 60))
+}
+
+# Reintentos y corte de circuito de las llamadas a la base de datos
+RESILIENCIA_CONFIG = {
+    'intentos': int(os.getenv('DB_INTENTOS', 3)),
+    'espera_base': float(os.getenv('DB_REINTENTO_ESPERA', 0.05)),
+    'espera_maxima': float(os.getenv('DB_REINTENTO_ESPERA_MAX', 2)),
+    'fallos_circuito': int(os.getenv('DB_CIRCUITO_FALLOS', 5)),
+    'tiempo_circuito_abierto': float(os.getenv('DB_CIRCUITO_ESPERA', 30))
+}
+
+# Configuración de las cachés en memoria
+CACHE_CONFIG = {
+    'ttl_categorias': float(os.getenv('DB_CACHE_CATEGORIAS_TTL', 300))
+}
+
+# Configuración de la instrumentación de consultas
+INSTRUMENTACION_CONFIG = {
+    'activa': os.getenv('DB_METRICAS', '1') != '0',
+    'umbral_lento_ms': float(os.getenv('DB_SLOW_QUERY_MS', 500))
+}
+
+# Archivo de préstamos devueltos (archivado.py)
+ARCHIVADO_CONFIG = {
+    # Días desde la devolución a partir de los cuales un préstamo se archiva
+    'dias': int(os.getenv('DB_ARCHIVO_DIAS', 365)),
+    'tamaño_lote': int(os.getenv('DB_ARCHIVO_LOTE', 1000))
+}
+
+# Préstamos
+PRESTAMOS_CONFIG = {
+    # Préstamos activos por persona si no tiene un límite propio (0 = sin límite)
+    'limite_por_persona': int(os.getenv('DB_LIMITE_PRESTAMOS', 0))
 }
 
 def get_database_config():
@@ -42,4 +130,64 @@ def get_pymysql_config():
     """
     return PYMYSQL_CONFIG
 
+def get_motor():
+    """
+    Retorna el motor de almacenamiento configurado ('mysql' o 'sqlite')
+    """
+    if MOTOR not in ('mysql', 'sqlite'):
+        raise ValueError(f"DB_MOTOR inválido: {MOTOR!r} (opciones: mysql, sqlite)")
+    return MOTOR
+
+def get_sqlite_config():
+    """
+    Retorna la configuración del motor SQLite
+    """
+    return SQLITE_CONFIG
+
+def get_pool_config():
+    """
+    Retorna la configuración del pool de conexiones
+    """
+    return POOL_CONFIG
+
+def get_replicas_config():
+    """
+    Retorna la configuración de las réplicas de lectura
+    """
+    return REPLICAS_CONFIG
+
+def get_sesion_config():
+    """
+    Retorna la configuración de la sesión persistente
+    """
+    return SESION_CONFIG
+
+def get_resiliencia_config():
+    """
+    Retorna la política de reintentos y del corte de circuito
+    """
+    return RESILIENCIA_CONFIG
 
+def get_cache_config():
+    """
+    Retorna la configuración de las cachés en memoria
+    """
+    return CACHE_CONFIG
+
+def get_instrumentacion_config():
+    """
+    Retorna la configuración de la instrumentación de consultas
+    """
+    return INSTRUMENTACION_CONFIG
+
+def get_archivado_config():
+    """
+    Retorna la configuración del archivo de préstamos devueltos
+    """
+    return ARCHIVADO_CONFIG
+
+def get_prestamos_config():
+    """
+    Retorna la configuración de los préstamos
+    """
+    return PRESTAMOS_CONFIG
@@ -0,0 +1,5 @@
+"""
+Configuración de pytest: elige la base de las pruebas (ver base_pruebas.py)
+antes de que algún módulo de prueba importe la biblioteca
+"""
+import base_pruebas  # noqa: F401
@@ -0,0 +1,340 @@
+"""
+Generador de datos sintéticos para la biblioteca hogareña
+Carga categorías, libros e historiales de préstamos a escala (10k, 1M o 10M
+libros) con distribuciones sesgadas como las reales: pocas palabras, autores,
+categorías y lectores concentran la mayoría de los títulos y préstamos.
+
+La carga usa INSERT multi-fila por lote con un commit por lote, y es
+reproducible: la misma semilla genera exactamente los mismos datos.
+Todas las filas quedan marcadas con MARCA_BENCHMARK para poder borrarlas.
+
+Uso: python datos_sinteticos.py --escala 1m
+"""
+import argparse
+import itertools
+import random
+import time
+from datetime import date, timedelta
+
+from pymysql import Error
+from pool_conexiones import obtener_conexion, liberar_conexion, cerrar_pool
+from motor_sqlite import es_sqlite
+from isbn import isbn13, digito_control_isbn13
+from personas import normalizar_nombre
+
+MARCA_BENCHMARK = '__benchmark__'
+
+PALABRAS_TITULO = [
+    'historia', 'secreto', 'jardín', 'noche', 'ciudad', 'río', 'memoria', 'viaje',
+    'sombra', 'tiempo', 'guerra', 'amor', 'silencio', 'montaña', 'mar', 'casa',
+    'invierno', 'verano', 'libro', 'camino', 'fuego', 'luz', 'isla', 'reino',
+    'ciencia', 'universo', 'física', 'química', 'cocina', 'arte', 'música', 'poesía'
+]
+NOMBRES = ['Ana', 'Juan', 'María', 'Pedro', 'Lucía', 'Carlos', 'Elena', 'Jorge',
+           'Sofía', 'Miguel', 'Laura', 'Diego', 'Marta', 'Pablo', 'Clara', 'Andrés']
+APELLIDOS = ['García', 'Fernández', 'López', 'Martínez', 'Sánchez', 'Pérez', 'Gómez',
+             'Díaz', 'Álvarez', 'Romero', 'Torres', 'Ruiz', 'Castro', 'Ortega', 'Vidal']
+# Personas que piden los préstamos sintéticos
+PERSONAS = [f"{nombre} {apellido}" for nombre, apellido in itertools.product(NOMBRES, APELLIDOS)]
+SILABAS = ['ba', 'ce', 'di', 'fo', 'gu', 'la', 'me', 'ni', 'po', 'ru',
+           'sa', 'te', 'vi', 'zo', 'tra', 'cla', 'mon', 'ter', 'bri', 'quen']
+
+# Cantidad de libros de cada escala predefinida
+ESCALAS = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+
+INSERT_CATEGORIA_SINTETICA = "INSERT IGNORE INTO categorias (nombre, descripcion) VALUES (%s, %s)"
+
+INSERT_LIBRO_SINTETICO = """
+INSERT INTO libros (titulo, autor, isbn, editorial, año_publicacion,
+                    categoria_id, paginas, estado, ubicacion, notas, isbn13)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+INSERT_PRESTAMO_SINTETICO = """
+INSERT INTO prestamos (libro_id, persona_id, persona_prestamo, fecha_prestamo,
+                       fecha_devolucion_esperada, fecha_devolucion_real, estado, notas)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+INSERT_PERSONA_SINTETICA = "INSERT IGNORE INTO personas (nombre, nombre_normalizado) VALUES (%s, %s)"
+
+
+def _pesos_zipf(cantidad, exponente=1.1):
+    """Pesos acumulados de una distribución de Zipf sobre `cantidad` rangos"""
+    return list(itertools.accumulate(1 / rango ** exponente for rango in range(1, cantidad + 1)))
+
+
+class GeneradorBiblioteca:
+    """
+    Genera libros e historiales de préstamo de forma determinista a partir de una semilla
+    """
+
+    def __init__(self, semilla=42, prefijo_isbn='7', categorias=20,
+                 prestamos_por_libro=1.5, proporcion_activos=0.05):
+        """
+        Args:
+            semilla: Semilla del generador aleatorio
+            prefijo_isbn: Primer dígito de los ISBN (13 dígitos) generados
+            categorias: Cantidad de categorías sintéticas
+            prestamos_por_libro: Promedio de préstamos en el historial de cada libro
+            proporcion_activos: Probabilidad de que el último préstamo siga sin devolver
+        """
+        self.semilla = semilla
+        self.prefijo_isbn = prefijo_isbn
+        self.prestamos_por_libro = prestamos_por_libro
+        self.proporcion_activos = proporcion_activos
+        self.hoy = date.today()
+        self._azar = random.Random(semilla)
+
+        # Vocabulario: las palabras comunes primero y luego palabras inventadas,
+        # de modo que la cola de la distribución sirve para búsquedas selectivas
+        inventadas = (''.join(silabas) for silabas in itertools.product(SILABAS, repeat=3))
+        self.vocabulario = PALABRAS_TITULO + list(itertools.islice(inventadas, 5000))
+        self.autores = [f"{nombre} {apellido} {segundo}" for nombre, apellido, segundo
+                        in itertools.product(NOMBRES, APELLIDOS, APELLIDOS)]
+        random.Random(semilla).shuffle(self.autores)
+        self.personas = PERSONAS
+        self.categorias = [f"Sintética {i + 1:03d}" for i in range(categorias)]
+
+        self._pesos_vocabulario = _pesos_zipf(len(self.vocabulario))
+        self._pesos_autores = _pesos_zipf(len(self.autores))
+        self._pesos_personas = _pesos_zipf(len(self.personas), 0.8)
+        self.ids_categorias = []
+        self._pesos_categorias = []
+
+    def asignar_categorias(self, ids_categorias):
+        """Define los id de categoría a repartir, del más al menos frecuente"""
+        self.ids_categorias = list(ids_categorias)
+        self._pesos_categorias = _pesos_zipf(len(self.ids_categorias), 0.9)
+
+    def isbn(self, indice):
+        """ISBN-13 válido (con dígito de control), creciente con el índice"""
+        doce = f"{self.prefijo_isbn}{indice:011d}"
+        return doce + digito_control_isbn13(doce)
+
+    def palabra(self, rango):
+        """Palabra del vocabulario en la posición `rango` de frecuencia (0 = la más común)"""
+        return self.vocabulario[rango]
+
+    def libro(self, indice):
+        """
+        Genera un libro y su historial de préstamos
+
+        Returns:
+            (valores para INSERT_LIBRO_SINTETICO, lista de préstamos sin libro_id)
+        """
+        azar = self._azar
+        palabras = azar.choices(self.vocabulario, cum_weights=self._pesos_vocabulario,
+                                k=azar.randint(2, 5))
+        historial = self._historial()
+        if historial and historial[-1][4] != 'Devuelto':
+            estado = 'Prestado'
+        else:
+            estado = azar.choices(['Disponible', 'Perdido', 'En reparación'], [98, 1, 1])[0]
+        categoria_id = None
+        if self.ids_categorias and azar.random() < 0.9:
+            categoria_id = azar.choices(self.ids_categorias, cum_weights=self._pesos_categorias)[0]
+
+        valores = (
+            ' '.join(palabras).capitalize(),
+            azar.choices(self.autores, cum_weights=self._pesos_autores)[0],
+            self.isbn(indice),
+            f"Editorial {azar.choice(APELLIDOS)}",
+            int(min(2025, max(1800, azar.gauss(1995, 20)))),
+            categoria_id,
+            int(max(40, azar.lognormvariate(5.6, 0.4))),
+            estado,
+            f"Estante {azar.randint(1, 200)}",
+            MARCA_BENCHMARK,
+            isbn13(self.isbn(indice))
+        )
+        return valores, historial
+
+    def _historial(self):
+        """
+        Préstamos sucesivos sin solapamiento; solo el último puede seguir activo
+
+        Returns:
+            Lista de (persona, fecha_prestamo, esperada, devolucion_real, estado)
+        """
+        azar = self._azar
+        cantidad = min(round(azar.expovariate(1 / self.prestamos_por_libro)), 40) \
+            if self.prestamos_por_libro > 0 else 0
+        if not cantidad:
+            return []
+
+        # Cada préstamo consume a lo sumo 48 días, así que el historial termina antes de hoy
+        fecha = self.hoy - timedelta(days=azar.randint(48 * cantidad, 48 * cantidad + 3650))
+        historial = []
+        for numero in range(cantidad):
+            fecha += timedelta(days=azar.randint(1, 20))
+            esperada = fecha + timedelta(days=14)
+            persona = azar.choices(self.personas, cum_weights=self._pesos_personas)[0]
+            if numero == cantidad - 1 and azar.random() < self.proporcion_activos:
+                # Préstamo activo: se lleva a una fecha reciente
+                fecha = self.hoy - timedelta(days=azar.randint(0, 45))
+                esperada = fecha + timedelta(days=14)
+                estado = 'Vencido' if esperada < self.hoy else 'Prestado'
+                historial.append((persona, fecha, esperada, None, estado))
+                break
+            devolucion = fecha + timedelta(days=azar.randint(3, 28))
+            historial.append((persona, fecha, esperada, devolucion, 'Devuelto'))
+            fecha = devolucion
+        return historial
+
+
+def sembrar_biblioteca(libros, categorias=20, prestamos_por_libro=1.5, tamaño_lote=5000,
+                       semilla=42, prefijo_isbn='7', mostrar_progreso=True):
+    """
+    Carga categorías, libros y préstamos sintéticos en la base configurada
+
+    Durante la carga se desactivan los chequeos de unicidad y de claves foráneas
+    de la sesión (las claves se resuelven en el propio lote), por lo que antes
+    se verifica que no haya datos sintéticos previos con el mismo prefijo.
+
+    Args:
+        libros: Cantidad de libros (ver ESCALAS)
+        categorias: Cantidad de categorías sintéticas
+        prestamos_por_libro: Promedio de préstamos del historial de cada libro
+        tamaño_lote: Libros por INSERT/commit
+        semilla: Semilla para obtener siempre los mismos datos
+        prefijo_isbn: Primer dígito de los ISBN generados
+        mostrar_progreso: Si es True, imprime el avance
+
+    Returns:
+        Diccionario con 'libros', 'prestamos', 'categorias', 'segundos' y
+        'filas_por_segundo', o None si hay error
+    """
+    if tamaño_lote < 1:
+        raise ValueError("tamaño_lote debe ser mayor que 0")
+
+    generador = GeneradorBiblioteca(semilla, prefijo_isbn, categorias, prestamos_por_libro)
+    conexion = None
+    cursor = None
+    total_prestamos = 0
+    inicio = time.perf_counter()
+
+    try:
+        conexion = obtener_conexion()
+        cursor = conexion.cursor()
+
+        cursor.execute("SELECT 1 FROM libros WHERE isbn BETWEEN %s AND %s LIMIT 1",
+                       (generador.isbn(0), generador.isbn(libros - 1)))
+        if cursor.fetchone():
+            print(f"❌ Ya hay libros sintéticos con prefijo {prefijo_isbn}: "
+                  f"bórralos antes (python benchmark_biblioteca.py limpiar)")
+            return None
+
+        cursor.executemany(INSERT_CATEGORIA_SINTETICA,
+                           [(nombre, MARCA_BENCHMARK) for nombre in generador.categorias])
+        cursor.execute("SELECT id FROM categorias WHERE descripcion = %s ORDER BY nombre",
+                       (MARCA_BENCHMARK,))
+        generador.asignar_categorias(fila[0] for fila in cursor.fetchall())
+        claves = [normalizar_nombre(persona) for persona in generador.personas]
+        cursor.executemany(INSERT_PERSONA_SINTETICA, list(zip(generador.personas, claves)))
+        cursor.execute(f"SELECT nombre_normalizado, id FROM personas WHERE nombre_normalizado "
+                       f"IN ({', '.join(['%s'] * len(claves))})", claves)
+        id_por_clave = dict(cursor.fetchall())
+        ids_personas = {persona: id_por_clave[clave] for persona, clave in zip(generador.personas, claves)}
+        conexion.commit()
+
+        if not es_sqlite(conexion):
+            cursor.execute("SET SESSION unique_checks = 0, foreign_key_checks = 0")
+        for desde in range(0, libros, tamaño_lote):
+            hasta = min(desde + tamaño_lote, libros)
+            lote = [generador.libro(i) for i in range(desde, hasta)]
+            cursor.executemany(INSERT_LIBRO_SINTETICO, [valores for valores, _ in lote])
+
+            # Los ISBN del lote son consecutivos: un rango del índice resuelve sus id
+            cursor.execute("SELECT isbn, id FROM libros WHERE isbn BETWEEN %s AND %s",
+                           (generador.isbn(desde), generador.isbn(hasta - 1)))
+            ids = dict(cursor.fetchall())
+            prestamos = [(ids[valores[2]], ids_personas[prestamo[0]]) + prestamo + (MARCA_BENCHMARK,)
+                         for valores, historial in lote for prestamo in historial]
+            if prestamos:
+                cursor.executemany(INSERT_PRESTAMO_SINTETICO, prestamos)
+            conexion.commit()
+            total_prestamos += len(prestamos)
+
+            if mostrar_progreso:
+                print(f"   📦 {hasta}/{libros} libros, {total_prestamos} préstamos")
+
+        segundos = time.perf_counter() - inicio
+        filas = libros + total_prestamos
+        if mostrar_progreso:
+            print(f"✅ Carga sintética finalizada: {filas} filas en {segundos:.1f}s")
+        return {
+            'libros': libros,
+            'prestamos': total_prestamos,
+            'categorias': len(generador.ids_categorias),
+            'segundos': segundos,
+            'filas_por_segundo': filas / segundos if segundos > 0 else 0.0
+        }
+    except Error as e:
+        print(f"❌ Error al cargar datos sintéticos: {e}")
+        if conexion:
+            conexion.rollback()
+        return None
+    finally:
+        if cursor and not es_sqlite(conexion):
+            try:
+                cursor.execute("SET SESSION unique_checks = 1, foreign_key_checks = 1")
+            except Error:
+                # La conexión quedó inutilizable: se cierra para que el pool la descarte
+                conexion.close()
+        if cursor:
+            cursor.close()
+        if conexion:
+            liberar_conexion(conexion)
+
+
+def limpiar_datos_sinteticos(tamaño_lote=10000):
+    """
+    Borra en lotes los libros (y sus préstamos, en cascada) y las categorías
+    creados por los benchmarks y el generador sintético, y las personas que
+    quedaron sin préstamos ni un límite propio
+    """
+    from cache_categorias import cache_categorias
+
+    conexion = obtener_conexion()
+    # SQLite no admite DELETE ... LIMIT y MySQL no admite LIMIT en un IN (subconsulta)
+    if es_sqlite(conexion):
+        borrar_lote = ("DELETE FROM libros WHERE id IN "
+                       "(SELECT id FROM libros WHERE notas = %s LIMIT %s)")
+    else:
+        borrar_lote = "DELETE FROM libros WHERE notas = %s LIMIT %s"
+    try:
+        with conexion.cursor() as cursor:
+            while True:
+                cursor.execute(borrar_lote, (MARCA_BENCHMARK, tamaño_lote))
+                conexion.commit()
+                if cursor.rowcount < tamaño_lote:
+                    break
+            cursor.execute("DELETE FROM categorias WHERE descripcion = %s", (MARCA_BENCHMARK,))
+            # Sin préstamos ni límite propio, una persona no guarda ningún dato
+            cursor.execute("DELETE FROM personas WHERE total_prestamos = 0 AND limite_prestamos IS NULL")
+            conexion.commit()
+    finally:
+        liberar_conexion(conexion)
+    cache_categorias.invalidar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga datos sintéticos en la biblioteca")
+    parser.add_argument('--escala', choices=ESCALAS, default='10k')
+    parser.add_argument('--libros', type=int, help="Cantidad exacta de libros (reemplaza --escala)")
+    parser.add_argument('--categorias', type=int, default=20)
+    parser.add_argument('--prestamos-por-libro', type=float, default=1.5)
+    parser.add_argument('--lote', type=int, default=5000)
+    parser.add_argument('--semilla', type=int, default=42)
+    args = parser.parse_args()
+
+    try:
+        sembrar_biblioteca(args.libros or ESCALAS[args.escala], args.categorias,
+                           args.prestamos_por_libro, args.lote, args.semilla)
+    finally:
+        cerrar_pool()
+
+
+if __name__ == "__main__":
+    main()
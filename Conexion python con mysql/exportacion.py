@@ -0,0 +1,185 @@
+"""
+Exportación del catálogo y del historial de préstamos a CSV o JSON Lines
+Las filas se leen con un cursor del lado del servidor (SSCursor) y se escriben
+por bloques, de modo que exportar millones de filas usa memoria constante.
+La salida puede comprimirse con gzip o enviarse a stdout para encadenarla
+con otras herramientas.
+
+Uso:
+    python exportacion.py libros catalogo.csv.gz
+    python exportacion.py prestamos - --formato jsonl | jq .persona_prestamo
+"""
+import argparse
+import contextlib
+import csv
+import gzip
+import json
+import os
+import sys
+import time
+
+from pool_conexiones import iterar_en_servidor, cerrar_pool
+from resiliencia import ErrorBaseDatos, operacion_bd
+
+COLUMNAS_EXPORTAR_LIBROS = ['id', 'titulo', 'autor', 'isbn', 'editorial', 'año_publicacion',
+                            'categoria_id', 'categoria', 'paginas', 'estado', 'ubicacion',
+                            'notas', 'fecha_registro']
+CONSULTA_EXPORTAR_LIBROS = """
+SELECT l.id, l.titulo, l.autor, l.isbn, l.editorial, l.año_publicacion,
+       l.categoria_id, c.nombre, l.paginas, l.estado, l.ubicacion,
+       l.notas, l.fecha_registro
+FROM libros l
+LEFT JOIN categorias c ON l.categoria_id = c.id
+ORDER BY l.id
+"""
+
+COLUMNAS_EXPORTAR_PRESTAMOS = ['id', 'libro_id', 'persona_id', 'persona_prestamo', 'fecha_prestamo',
+                               'fecha_devolucion_esperada', 'fecha_devolucion_real',
+                               'estado', 'notas']
+CONSULTA_EXPORTAR_PRESTAMOS = f"""
+SELECT {', '.join(COLUMNAS_EXPORTAR_PRESTAMOS)}
+FROM prestamos
+ORDER BY id
+"""
+
+COLUMNAS_EXPORTAR_HISTORICO = COLUMNAS_EXPORTAR_PRESTAMOS + ['fecha_archivado']
+CONSULTA_EXPORTAR_HISTORICO = f"""
+SELECT {', '.join(COLUMNAS_EXPORTAR_HISTORICO)}
+FROM prestamos_historico
+ORDER BY id
+"""
+
+# Tablas exportables: nombre -> (consulta, columnas)
+EXPORTACIONES = {
+    'libros': (CONSULTA_EXPORTAR_LIBROS, COLUMNAS_EXPORTAR_LIBROS),
+    'prestamos': (CONSULTA_EXPORTAR_PRESTAMOS, COLUMNAS_EXPORTAR_PRESTAMOS),
+    'prestamos_historico': (CONSULTA_EXPORTAR_HISTORICO, COLUMNAS_EXPORTAR_HISTORICO),
+}
+
+FORMATOS = ('csv', 'jsonl')
+
+
+def _formato_por_ruta(ruta):
+    """Deduce (formato, comprimir) de la extensión del archivo"""
+    nombre = ruta.lower()
+    comprimir = nombre.endswith('.gz')
+    if comprimir:
+        nombre = nombre[:-3]
+    formato = 'jsonl' if nombre.endswith(('.jsonl', '.json', '.ndjson')) else 'csv'
+    return formato, comprimir
+
+
+def _abrir_salida(ruta, comprimir):
+    """Abre la salida en modo texto; '-' es stdout (que no se cierra al terminar)"""
+    if ruta == '-':
+        if comprimir:
+            return gzip.open(sys.stdout.buffer, 'wt', encoding='utf-8', newline='')
+        return contextlib.nullcontext(sys.stdout)
+    if comprimir:
+        return gzip.open(ruta, 'wt', encoding='utf-8', newline='')
+    return open(ruta, 'w', encoding='utf-8', newline='')
+
+
+def _escribir_csv(salida, columnas, bloques):
+    escritor = csv.writer(salida)
+    escritor.writerow(columnas)
+    for filas in bloques:
+        escritor.writerows(filas)
+        yield len(filas)
+
+
+def _escribir_jsonl(salida, columnas, bloques):
+    for filas in bloques:
+        # default=str convierte fechas y decimales; un write por bloque
+        salida.write(''.join(
+            json.dumps(dict(zip(columnas, fila)), ensure_ascii=False, default=str) + '\n'
+            for fila in filas))
+        yield len(filas)
+
+
+# Sin reintentar tras un corte: lo ya escrito en stdout no se puede deshacer
+@operacion_bd("exportar datos", idempotente=False)
+def exportar(tabla, ruta='-', formato=None, comprimir=None, tamaño_lectura=5000,
+             mostrar_progreso=True):
+    """
+    Exporta una tabla completa a CSV o JSON Lines leyendo con un cursor del servidor
+
+    Args:
+        tabla: 'libros' (con el nombre de la categoría), 'prestamos' o 'prestamos_historico'
+        ruta: Archivo de salida, o '-' para stdout
+        formato: 'csv' o 'jsonl' (por defecto se deduce de la extensión)
+        comprimir: Si es True, escribe gzip (por defecto, si la ruta termina en .gz)
+        tamaño_lectura: Filas que se leen y escriben por bloque
+        mostrar_progreso: Si es True, informa el avance (en stderr si la salida es stdout)
+
+    Returns:
+        Cantidad de filas exportadas o None si no se pudo escribir la salida
+
+    Raises:
+        ErrorBaseDatos: Si falla la lectura de la base de datos
+        ValueError: Si la tabla o el formato no son válidos
+    """
+    if tabla not in EXPORTACIONES:
+        raise ValueError(f"Tabla no exportable: {tabla!r} (opciones: {', '.join(EXPORTACIONES)})")
+    formato_ruta, comprimir_ruta = _formato_por_ruta(ruta)
+    formato = formato or formato_ruta
+    comprimir = comprimir_ruta if comprimir is None else comprimir
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato!r} (opciones: {', '.join(FORMATOS)})")
+
+    # Con la salida en stdout los mensajes no deben mezclarse con los datos
+    mensajes = sys.stderr if ruta == '-' else sys.stdout
+    consulta, columnas = EXPORTACIONES[tabla]
+    escribir = _escribir_csv if formato == 'csv' else _escribir_jsonl
+    exportadas = 0
+    inicio = time.perf_counter()
+
+    try:
+        with _abrir_salida(ruta, comprimir) as salida, \
+                contextlib.closing(iterar_en_servidor(consulta, None, tamaño_lectura)) as bloques:
+            for cantidad in escribir(salida, columnas, bloques):
+                exportadas += cantidad
+                if mostrar_progreso and exportadas % (tamaño_lectura * 100) < cantidad:
+                    print(f"   📦 {exportadas} filas exportadas", file=mensajes)
+    except BrokenPipeError:
+        raise
+    except OSError as e:
+        print(f"❌ Error al escribir '{ruta}': {e}", file=mensajes)
+        return None
+
+    if mostrar_progreso:
+        segundos = time.perf_counter() - inicio
+        destino = 'stdout' if ruta == '-' else ruta
+        print(f"✅ {exportadas} filas de '{tabla}' exportadas a {destino} en {segundos:.1f}s",
+              file=mensajes)
+    return exportadas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta libros o préstamos a CSV / JSON Lines")
+    parser.add_argument('tabla', choices=EXPORTACIONES)
+    parser.add_argument('ruta', nargs='?', default='-', help="Archivo de salida ('-' = stdout)")
+    parser.add_argument('--formato', choices=FORMATOS, help="Por defecto se deduce de la extensión")
+    parser.add_argument('--gzip', action='store_true', default=None, help="Comprime la salida con gzip")
+    parser.add_argument('--lectura', type=int, default=5000, help="Filas por bloque")
+    parser.add_argument('--silencioso', action='store_true', help="No informa el avance")
+    args = parser.parse_args()
+
+    try:
+        if exportar(args.tabla, args.ruta, args.formato, args.gzip, args.lectura,
+                    not args.silencioso) is None:
+            sys.exit(1)
+    except BrokenPipeError:
+        # El consumidor (por ejemplo `head`) cerró la tubería antes del final:
+        # stdout se redirige a /dev/null para que Python no falle al vaciarlo
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+    except ErrorBaseDatos as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        cerrar_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Importación masiva de libros desde archivos CSV o JSON Lines
+Inserta los registros por lotes con executemany (INSERT multi-fila)
+y un commit por lote, informando los rechazos fila por fila
+"""
+import csv
+import json
+import time
+from itertools import islice
+
+from pymysql import Error
+from pool_conexiones import obtener_conexion, liberar_conexion
+from isbn import isbn13
+from resiliencia import operacion_bd
+
+# Columnas de `libros` que acepta la importación, en el orden del INSERT
+COLUMNAS_LIBRO = ['titulo', 'autor', 'isbn', 'editorial', 'año_publicacion',
+                  'categoria_id', 'paginas', 'ubicacion', 'notas']
+COLUMNAS_ENTERAS = ['año_publicacion', 'categoria_id', 'paginas']
+
+# Después de las columnas de COLUMNAS_LIBRO va isbn13, el ISBN-13 canónico
+# calculado a partir de isbn (ver isbn.py)
+INSERT_LIBRO = f"""
+INSERT INTO libros ({', '.join(COLUMNAS_LIBRO)}, isbn13)
+VALUES ({', '.join(['%s'] * (len(COLUMNAS_LIBRO) + 1))})
+"""
+
+# Códigos de error de MySQL que rechazan una fila sin invalidar el resto del lote
+ER_DUP_ENTRY = 1062
+ER_NO_REFERENCED_ROW = 1452
+
+
+def leer_libros_csv(ruta, delimitador=','):
+    """
+    Lee un archivo CSV con encabezados y genera un diccionario por fila
+
+    Args:
+        ruta: Ruta del archivo CSV
+        delimitador: Separador de columnas (por defecto ',')
+    """
+    with open(ruta, newline='', encoding='utf-8-sig') as archivo:
+        for fila in csv.DictReader(archivo, delimiter=delimitador):
+            yield fila
+
+
+def leer_libros_jsonl(ruta):
+    """
+    Lee un archivo JSON Lines y genera un diccionario por línea no vacía
+
+    Args:
+        ruta: Ruta del archivo .jsonl
+    """
+    with open(ruta, encoding='utf-8') as archivo:
+        for linea in archivo:
+            linea = linea.strip()
+            if linea:
+                yield json.loads(linea)
+
+
+def leer_libros(ruta):
+    """
+    Elige el lector según la extensión del archivo (.csv o .jsonl/.json)
+    """
+    if ruta.lower().endswith(('.jsonl', '.json', '.ndjson')):
+        return leer_libros_jsonl(ruta)
+    return leer_libros_csv(ruta)
+
+
+def _normalizar_registro(registro):
+    """
+    Convierte un registro de entrada en la tupla de valores del INSERT
+
+    Returns:
+        Tupla de valores en el orden de COLUMNAS_LIBRO, más el isbn13 canónico
+
+    Raises:
+        ValueError: Si falta un campo obligatorio o un número es inválido
+    """
+    datos = dict(registro)
+    # Se acepta 'año' como en agregar_libro
+    if 'año_publicacion' not in datos and 'año' in datos:
+        datos['año_publicacion'] = datos['año']
+
+    valores = []
+    for columna in COLUMNAS_LIBRO:
+        valor = datos.get(columna)
+        if isinstance(valor, str):
+            valor = valor.strip() or None
+        if valor is not None and columna in COLUMNAS_ENTERAS:
+            try:
+                valor = int(valor)
+            except (TypeError, ValueError):
+                raise ValueError(f"'{columna}' no es un número válido: {valor!r}")
+        valores.append(valor)
+
+    if not valores[0]:
+        raise ValueError("El título es obligatorio")
+    if not valores[1]:
+        raise ValueError("El autor es obligatorio")
+    valores.append(isbn13(valores[2]))
+    return tuple(valores)
+
+
+def _motivo_error(error):
+    codigo = error.args[0] if error.args else None
+    if codigo == ER_DUP_ENTRY:
+        return "ISBN duplicado"
+    if codigo == ER_NO_REFERENCED_ROW:
+        return "categoria_id inexistente"
+    return str(error)
+
+
+def _prevalidar_lote(cursor, lote, categorias_validas):
+    """
+    Separa las filas que fallarían por ISBN duplicado o categoría inexistente
+
+    Returns:
+        (filas válidas, rechazos) donde cada fila es (numero_fila, valores)
+    """
+    validas = []
+    rechazos = []
+
+    # Un ISBN se repite si coincide el texto o la forma canónica (isbn13),
+    # por ejemplo '84-291-4323-8' y '9788429143232'
+    isbns = [valores[2] for _, valores in lote if valores[2]]
+    canonicos = [valores[-1] for _, valores in lote if valores[-1] is not None]
+    existentes = set()
+    if isbns:
+        condicion = f"isbn IN ({', '.join(['%s'] * len(isbns))})"
+        if canonicos:
+            condicion += f" OR isbn13 IN ({', '.join(['%s'] * len(canonicos))})"
+        cursor.execute(f"SELECT isbn, isbn13 FROM libros WHERE {condicion}", isbns + canonicos)
+        for isbn, canonico in cursor.fetchall():
+            existentes.add(isbn)
+            if canonico is not None:
+                existentes.add(canonico)
+
+    vistos = set()
+    for numero, valores in lote:
+        isbn, categoria_id, canonico = valores[2], valores[5], valores[-1]
+        claves = [clave for clave in (isbn, canonico) if clave is not None]
+        if categoria_id is not None and categoria_id not in categorias_validas:
+            rechazos.append((numero, "categoria_id inexistente"))
+        elif any(clave in existentes or clave in vistos for clave in claves):
+            rechazos.append((numero, "ISBN duplicado"))
+        else:
+            vistos.update(claves)
+            validas.append((numero, valores))
+    return validas, rechazos
+
+
+def _insertar_fila_por_fila(conexion, cursor, filas):
+    """
+    Inserta las filas de un lote una a una, para aislar las que la base rechaza
+
+    Returns:
+        (cantidad insertada, rechazos)
+    """
+    insertados = 0
+    rechazos = []
+    for numero, valores in filas:
+        try:
+            cursor.execute(INSERT_LIBRO, valores)
+            insertados += 1
+        except Error as e:
+            rechazos.append((numero, _motivo_error(e)))
+    conexion.commit()
+    return insertados, rechazos
+
+
+# Sin reintentos: los registros pueden venir de un generador ya consumido en
+# parte, y los lotes confirmados no deben insertarse dos veces
+@operacion_bd("importar libros", idempotente=False, reintentar=False)
+def importar_libros(registros, tamaño_lote=1000, mostrar_progreso=True):
+    """
+    Importa libros de forma masiva en lotes de tamaño configurable
+
+    Cada lote se inserta con un único executemany y se confirma con un commit.
+    Las filas con ISBN duplicado o categoria_id inexistente se rechazan
+    individualmente sin abortar el resto de la carga.
+
+    Args:
+        registros: Iterable de diccionarios (por ejemplo leer_libros('libros.csv'))
+        tamaño_lote: Cantidad de filas por INSERT/commit
+        mostrar_progreso: Si es True, imprime el avance por lote
+
+    Returns:
+        Diccionario con 'insertados', 'rechazados' (lista de (fila, motivo)),
+        'segundos' y 'filas_por_segundo'
+
+    Raises:
+        ErrorBaseDatos: Si falla la conexión o la operación (los lotes ya
+                        confirmados quedan insertados)
+        ValueError: Si tamaño_lote no es positivo
+    """
+    if tamaño_lote < 1:
+        raise ValueError("tamaño_lote debe ser mayor que 0")
+
+    conexion = None
+    cursor = None
+    insertados = 0
+    rechazados = []
+    inicio = time.perf_counter()
+
+    try:
+        conexion = obtener_conexion()
+        cursor = conexion.cursor()
+
+        cursor.execute("SELECT id FROM categorias")
+        categorias_validas = {fila[0] for fila in cursor.fetchall()}
+
+        numerados = enumerate(registros, start=1)
+        while True:
+            bloque = list(islice(numerados, tamaño_lote))
+            if not bloque:
+                break
+
+            lote = []
+            for numero, registro in bloque:
+                try:
+                    lote.append((numero, _normalizar_registro(registro)))
+                except (ValueError, TypeError, AttributeError) as e:
+                    rechazados.append((numero, str(e)))
+
+            validas, rechazos = _prevalidar_lote(cursor, lote, categorias_validas)
+            rechazados.extend(rechazos)
+
+            if validas:
+                try:
+                    cursor.executemany(INSERT_LIBRO, [valores for _, valores in validas])
+                    conexion.commit()
+                    insertados += len(validas)
+                except Error:
+                    # Otro cliente insertó un ISBN o borró una categoría entre la
+                    # validación y el INSERT: se reintenta el lote fila por fila
+                    conexion.rollback()
+                    cantidad, rechazos = _insertar_fila_por_fila(conexion, cursor, validas)
+                    insertados += cantidad
+                    rechazados.extend(rechazos)
+
+            if mostrar_progreso:
+                print(f"   📦 Lote procesado: {insertados} insertados, {len(rechazados)} rechazados")
+
+        segundos = time.perf_counter() - inicio
+        if mostrar_progreso:
+            print(f"✅ Importación finalizada: {insertados} libros en {segundos:.2f}s")
+            for numero, motivo in rechazados[:20]:
+                print(f"   ⚠️ Fila {numero}: {motivo}")
+            if len(rechazados) > 20:
+                print(f"   ... y {len(rechazados) - 20} rechazos más")
+
+        return {
+            'insertados': insertados,
+            'rechazados': rechazados,
+            'segundos': segundos,
+            'filas_por_segundo': insertados / segundos if segundos > 0 else 0.0
+        }
+    finally:
+        if cursor:
+            cursor.close()
+        if conexion:
+            liberar_conexion(conexion)
+
+
+def importar_libros_archivo(ruta, tamaño_lote=1000):
+    """
+    Importa libros desde un archivo CSV o JSON Lines
+
+    Args:
+        ruta: Ruta del archivo (.csv, .jsonl)
+        tamaño_lote: Cantidad de filas por lote
+
+    Returns:
+        Resultado de importar_libros o None si no se pudo leer el archivo
+
+    Raises:
+        ErrorBaseDatos: Si falla la operación en la base de datos
+    """
+    try:
+        return importar_libros(leer_libros(ruta), tamaño_lote)
+    except (OSError, ValueError, csv.Error) as e:
+        print(f"❌ Error al leer el archivo '{ruta}': {e}")
+        return None
@@ -0,0 +1,293 @@
+"""
+Instrumentación de las consultas a la base de datos
+Mide la latencia, las filas devueltas y los errores de cada sentencia SQL,
+el tiempo de espera para obtener una conexión del pool, y registra las
+consultas lentas. Las métricas se exportan en JSON o en el formato de texto
+de Prometheus, y se pueden publicar por HTTP para que un scraper las lea.
+
+Las conexiones del pool usan CursorInstrumentado, así que todas las
+funciones de la biblioteca quedan medidas sin cambios.
+"""
+import json
+import logging
+import re
+import reprlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pymysql.cursors import Cursor, SSCursor
+from config_database import get_instrumentacion_config
+
+logger_consultas_lentas = logging.getLogger('biblioteca.consultas_lentas')
+
+# Límites superiores (en segundos) de los buckets de los histogramas
+BUCKETS_SEGUNDOS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_RE_ESPACIOS = re.compile(r'\s+')
+_RE_LISTA_MARCADORES = re.compile(r'\(\s*%s(?:\s*,\s*%s)+\s*\)')
+_RE_VALORES_MULTIFILA = re.compile(r'(VALUES\s*\([^)]*\))(?:\s*,\s*\([^)]*\))+', re.IGNORECASE)
+
+
+def normalizar_sentencia(sql):
+    """
+    Reduce una sentencia a una forma estable para agrupar métricas:
+    espacios colapsados y listas IN (...) o VALUES multi-fila de largo variable unificadas
+    """
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    sql = _RE_ESPACIOS.sub(' ', sql).strip()
+    sql = _RE_VALORES_MULTIFILA.sub(r'\1, ...', sql)
+    return _RE_LISTA_MARCADORES.sub('(...)', sql)
+
+
+class Histograma:
+    """
+    Histograma acumulativo con buckets fijos, al estilo de Prometheus
+    """
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS_SEGUNDOS)
+        self.cantidad = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+
+    def observar(self, segundos):
+        self.cantidad += 1
+        self.suma += segundos
+        self.maximo = max(self.maximo, segundos)
+        for i, limite in enumerate(BUCKETS_SEGUNDOS):
+            if segundos <= limite:
+                self.buckets[i] += 1
+                break
+
+    def acumulados(self):
+        """Retorna [(límite, cantidad <= límite)] incluyendo +Inf"""
+        total = 0
+        resultado = []
+        for limite, cantidad in zip(BUCKETS_SEGUNDOS, self.buckets):
+            total += cantidad
+            resultado.append((limite, total))
+        resultado.append((float('inf'), self.cantidad))
+        return resultado
+
+    def a_dict(self):
+        return {
+            'cantidad': self.cantidad,
+            'suma_segundos': self.suma,
+            'maximo_segundos': self.maximo,
+            'promedio_segundos': self.suma / self.cantidad if self.cantidad else 0.0,
+            'buckets': {('+Inf' if limite == float('inf') else str(limite)): cantidad
+                        for limite, cantidad in self.acumulados()}
+        }
+
+
+class MetricasSentencia:
+    def __init__(self):
+        self.latencia = Histograma()
+        self.filas = 0
+        self.errores = {}
+
+
+class RegistroMetricas:
+    """
+    Acumula las métricas de todas las sentencias de forma segura entre hilos
+    """
+
+    def __init__(self, umbral_lento_ms=500, activo=True):
+        """
+        Args:
+            umbral_lento_ms: Milisegundos a partir de los cuales una consulta se registra como lenta
+            activo: Si es False, no se mide nada
+        """
+        self.umbral_lento_ms = umbral_lento_ms
+        self.activo = activo
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Descarta todas las métricas acumuladas"""
+        with self._lock:
+            self._sentencias = {}
+            self._espera_conexion = Histograma()
+            self._consultas_lentas = 0
+
+    def registrar_sentencia(self, sql, parametros, segundos, filas=None, error=None):
+        if not self.activo:
+            return
+        clave = normalizar_sentencia(sql)
+        with self._lock:
+            metricas = self._sentencias.get(clave)
+            if metricas is None:
+                metricas = self._sentencias[clave] = MetricasSentencia()
+            metricas.latencia.observar(segundos)
+            if filas is not None and filas >= 0:
+                metricas.filas += filas
+            if error is not None:
+                codigo = str(error.args[0]) if error.args and isinstance(error.args[0], int) \
+                    else type(error).__name__
+                metricas.errores[codigo] = metricas.errores.get(codigo, 0) + 1
+            lenta = segundos * 1000 >= self.umbral_lento_ms
+            if lenta:
+                self._consultas_lentas += 1
+        if lenta:
+            logger_consultas_lentas.warning(
+                "Consulta lenta (%.1f ms): %s | parámetros: %s",
+                segundos * 1000, clave, reprlib.repr(parametros))
+
+    def registrar_espera_conexion(self, segundos):
+        if not self.activo:
+            return
+        with self._lock:
+            self._espera_conexion.observar(segundos)
+
+    def instantanea(self):
+        """
+        Retorna un diccionario con todas las métricas acumuladas
+        """
+        with self._lock:
+            return {
+                'umbral_lento_ms': self.umbral_lento_ms,
+                'consultas_lentas': self._consultas_lentas,
+                'espera_conexion': self._espera_conexion.a_dict(),
+                'sentencias': {
+                    sql: {
+                        'latencia': metricas.latencia.a_dict(),
+                        'filas': metricas.filas,
+                        'errores': dict(metricas.errores)
+                    }
+                    for sql, metricas in self._sentencias.items()
+                }
+            }
+
+    def exportar_json(self, indent=2):
+        """Retorna la instantánea de métricas como texto JSON"""
+        return json.dumps(self.instantanea(), indent=indent, ensure_ascii=False)
+
+    def exportar_prometheus(self):
+        """Retorna las métricas en el formato de texto de Prometheus"""
+        with self._lock:
+            lineas = [
+                "# HELP biblioteca_sql_duracion_segundos Latencia de cada sentencia SQL",
+                "# TYPE biblioteca_sql_duracion_segundos histogram",
+            ]
+            for sql, metricas in self._sentencias.items():
+                etiqueta = f'sentencia="{_escapar_etiqueta(sql)}"'
+                lineas.extend(_lineas_histograma('biblioteca_sql_duracion_segundos',
+                                                 metricas.latencia, etiqueta))
+
+            lineas += ["# HELP biblioteca_sql_filas_total Filas devueltas o afectadas por sentencia",
+                       "# TYPE biblioteca_sql_filas_total counter"]
+            for sql, metricas in self._sentencias.items():
+                lineas.append(f'biblioteca_sql_filas_total{{sentencia="{_escapar_etiqueta(sql)}"}} '
+                              f'{metricas.filas}')
+
+            lineas += ["# HELP biblioteca_sql_errores_total Errores por sentencia y código",
+                       "# TYPE biblioteca_sql_errores_total counter"]
+            for sql, metricas in self._sentencias.items():
+                for codigo, cantidad in metricas.errores.items():
+                    lineas.append(f'biblioteca_sql_errores_total{{sentencia="{_escapar_etiqueta(sql)}",'
+                                  f'codigo="{codigo}"}} {cantidad}')
+
+            lineas += ["# HELP biblioteca_sql_consultas_lentas_total Consultas que superaron el umbral",
+                       "# TYPE biblioteca_sql_consultas_lentas_total counter",
+                       f"biblioteca_sql_consultas_lentas_total {self._consultas_lentas}",
+                       "# HELP biblioteca_pool_espera_segundos Tiempo para obtener una conexión del pool",
+                       "# TYPE biblioteca_pool_espera_segundos histogram"]
+            lineas.extend(_lineas_histograma('biblioteca_pool_espera_segundos', self._espera_conexion))
+        return '\n'.join(lineas) + '\n'
+
+
+def _escapar_etiqueta(valor):
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _lineas_histograma(nombre, histograma, etiqueta=''):
+    separador = ',' if etiqueta else ''
+    lineas = []
+    for limite, cantidad in histograma.acumulados():
+        le = '+Inf' if limite == float('inf') else repr(limite)
+        lineas.append(f'{nombre}_bucket{{{etiqueta}{separador}le="{le}"}} {cantidad}')
+    sufijo = f'{{{etiqueta}}}' if etiqueta else ''
+    lineas.append(f'{nombre}_sum{sufijo} {histograma.suma}')
+    lineas.append(f'{nombre}_count{sufijo} {histograma.cantidad}')
+    return lineas
+
+
+_config = get_instrumentacion_config()
+metricas = RegistroMetricas(_config['umbral_lento_ms'], _config['activa'])
+
+
+class _MedicionMixin:
+    """
+    Mide cada execute/executemany del cursor y lo registra en `metricas`
+    """
+
+    _en_lote = False
+
+    def _medir(self, ejecutar, query, args):
+        inicio = time.perf_counter()
+        try:
+            resultado = ejecutar(query, args)
+        except Exception as e:
+            metricas.registrar_sentencia(query, args, time.perf_counter() - inicio, error=e)
+            raise
+        # En un SSCursor la cantidad de filas no se conoce hasta leerlas
+        filas = None if isinstance(self, SSCursor) else self.rowcount
+        metricas.registrar_sentencia(query, args, time.perf_counter() - inicio, filas)
+        return resultado
+
+    def execute(self, query, args=None):
+        if self._en_lote:
+            return super().execute(query, args)
+        return self._medir(super().execute, query, args)
+
+    def executemany(self, query, args):
+        # executemany llama a execute con el SQL ya interpolado; se mide una
+        # sola vez con la plantilla para no crear una métrica por lote
+        self._en_lote = True
+        try:
+            return self._medir(super().executemany, query, args)
+        finally:
+            self._en_lote = False
+
+
+class CursorInstrumentado(_MedicionMixin, Cursor):
+    """Cursor de PyMySQL que registra métricas de cada sentencia"""
+
+
+class SSCursorInstrumentado(_MedicionMixin, SSCursor):
+    """SSCursor (sin buffer) que registra métricas de cada sentencia"""
+
+
+class _ManejadorMetricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == '/metrics':
+            cuerpo, tipo = metricas.exportar_prometheus(), 'text/plain; version=0.0.4'
+        elif self.path == '/metrics.json':
+            cuerpo, tipo = metricas.exportar_json(), 'application/json'
+        else:
+            self.send_error(404)
+            return
+        datos = cuerpo.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', f'{tipo}; charset=utf-8')
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+def servir_metricas(puerto=9108, host='127.0.0.1'):
+    """
+    Publica las métricas por HTTP en un hilo en segundo plano
+    (/metrics en formato Prometheus y /metrics.json)
+
+    Returns:
+        El servidor HTTP; llamar a .shutdown() para detenerlo
+    """
+    servidor = ThreadingHTTPServer((host, puerto), _ManejadorMetricas)
+    threading.Thread(target=servidor.serve_forever, name='servidor-metricas', daemon=True).start()
+    return servidor
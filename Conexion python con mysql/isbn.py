@@ -0,0 +1,52 @@
+"""
+Normalización de ISBN
+El ISBN se guarda tal como se cargó (con o sin guiones, ISBN-10 o ISBN-13)
+y además como ISBN-13 canónico en la columna numérica `isbn13`, que tiene
+un índice único: el mismo libro escrito de dos formas no se duplica y
+buscar por ISBN es una sola lectura del índice, sin importar el formato
+del término.
+"""
+
+
+def compactar_isbn(texto):
+    """Quita guiones y espacios y pasa la X final a mayúscula"""
+    return texto.replace('-', '').replace(' ', '').upper()
+
+
+def es_isbn(texto):
+    """
+    Indica si el texto tiene forma de ISBN (10 o 13 dígitos, con guiones
+    opcionales); no comprueba el dígito de control
+    """
+    compacto = compactar_isbn(texto)
+    return (len(compacto) in (10, 13) and compacto[:-1].isdigit()
+            and (compacto[-1].isdigit() or compacto[-1] == 'X'))
+
+
+def digito_control_isbn13(doce_digitos):
+    """Dígito de control (como texto) de los primeros 12 dígitos de un ISBN-13"""
+    suma = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(doce_digitos))
+    return str((10 - suma % 10) % 10)
+
+
+def isbn13(texto):
+    """
+    Retorna el ISBN-13 canónico (como entero) de un ISBN-10 o ISBN-13
+
+    Los ISBN-10 se convierten con el prefijo 978. Los textos que no son un
+    ISBN o cuyo dígito de control no coincide retornan None, igual que None.
+    """
+    if texto is None:
+        return None
+    compacto = compactar_isbn(str(texto))
+    if len(compacto) == 13 and compacto.isdigit():
+        if digito_control_isbn13(compacto[:12]) != compacto[12]:
+            return None
+        return int(compacto)
+    if len(compacto) == 10 and compacto[:9].isdigit() and (compacto[9].isdigit() or compacto[9] == 'X'):
+        digitos = [int(d) for d in compacto[:9]] + [10 if compacto[9] == 'X' else int(compacto[9])]
+        if sum(d * (10 - i) for i, d in enumerate(digitos)) % 11:
+            return None
+        doce = '978' + compacto[:9]
+        return int(doce + digito_control_isbn13(doce))
+    return None
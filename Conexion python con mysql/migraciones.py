@@ -0,0 +1,717 @@
+"""
+Migraciones del esquema de la biblioteca hogareña
+Cada migración se aplica una sola vez y queda registrada en la tabla
+`esquema_migraciones`; además comprueba lo que ya existe, de modo que
+puede ejecutarse sobre una base creada con una versión anterior.
+
+Las migraciones sirven para los dos motores: donde la sintaxis difiere
+(FULLTEXT frente a FTS5, triggers) eligen la variante según la conexión.
+
+Uso: python migraciones.py
+"""
+import sys
+
+from pool_conexiones import obtener_conexion, liberar_conexion, cerrar_pool
+from resiliencia import ErrorBaseDatos, operacion_bd
+from motor_sqlite import es_sqlite
+from isbn import isbn13
+from personas import limpiar_nombre, normalizar_nombre
+
+
+def _indice_existe(cursor, tabla, indice):
+    if es_sqlite(cursor.connection):
+        cursor.execute("""
+            SELECT COUNT(*) FROM sqlite_master
+            WHERE type = 'index' AND tbl_name = %s AND name = %s
+        """, (tabla, indice))
+    else:
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        """, (tabla, indice))
+    return cursor.fetchone()[0] > 0
+
+
+def _columna_existe(cursor, tabla, columna):
+    if es_sqlite(cursor.connection):
+        cursor.execute("SELECT COUNT(*) FROM pragma_table_info(%s) WHERE name = %s",
+                       (tabla, columna))
+    else:
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+        """, (tabla, columna))
+    return cursor.fetchone()[0] > 0
+
+
+def _crear_indice(cursor, tabla, indice, columnas):
+    """Crea el índice si no existe (CREATE INDEX vale para MySQL y SQLite)"""
+    if not _indice_existe(cursor, tabla, indice):
+        cursor.execute(f"CREATE INDEX {indice} ON {tabla} ({columnas})")
+
+
+# Tabla FTS5 de SQLite equivalente al índice FULLTEXT: guarda solo el índice
+# invertido (content='libros') y los triggers la mantienen sincronizada.
+# remove_diacritics ignora los acentos, como la colación de MySQL.
+TABLA_FTS_SQLITE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS libros_fts USING fts5(
+    titulo, autor, content='libros', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+)
+"""
+
+TRIGGERS_FTS_SQLITE = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_libros_fts_ai AFTER INSERT ON libros BEGIN
+        INSERT INTO libros_fts (rowid, titulo, autor) VALUES (NEW.id, NEW.titulo, NEW.autor);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_libros_fts_ad AFTER DELETE ON libros BEGIN
+        INSERT INTO libros_fts (libros_fts, rowid, titulo, autor)
+        VALUES ('delete', OLD.id, OLD.titulo, OLD.autor);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_libros_fts_au AFTER UPDATE OF titulo, autor ON libros BEGIN
+        INSERT INTO libros_fts (libros_fts, rowid, titulo, autor)
+        VALUES ('delete', OLD.id, OLD.titulo, OLD.autor);
+        INSERT INTO libros_fts (rowid, titulo, autor) VALUES (NEW.id, NEW.titulo, NEW.autor);
+    END
+    """,
+]
+
+
+def _m001_fulltext_libros(cursor):
+    """Índice FULLTEXT (FTS5 en SQLite) sobre título y autor para buscar_libro"""
+    if es_sqlite(cursor.connection):
+        cursor.execute(TABLA_FTS_SQLITE)
+        for definicion in TRIGGERS_FTS_SQLITE:
+            cursor.execute(definicion)
+        # Indexa los libros que ya estaban cargados
+        cursor.execute("INSERT INTO libros_fts (libros_fts) VALUES ('rebuild')")
+    elif not _indice_existe(cursor, 'libros', 'ft_titulo_autor'):
+        cursor.execute("ALTER TABLE libros ADD FULLTEXT INDEX ft_titulo_autor (titulo, autor)")
+
+
+def _m002_indices_prestamos(cursor):
+    """Índices para paginar préstamos por fecha con y sin filtro de estado"""
+    _crear_indice(cursor, 'prestamos', 'idx_fecha_prestamo', 'fecha_prestamo')
+    _crear_indice(cursor, 'prestamos', 'idx_estado_fecha_prestamo', 'estado, fecha_prestamo')
+
+
+# Estados de préstamo que cuentan como activos (el libro no fue devuelto)
+ESTADOS_PRESTAMO_ACTIVO = "('Prestado', 'Vencido')"
+
+# Conteo real de las estadísticas como filas (tipo, clave, valor), con la misma
+# forma que la tabla estadisticas_contadores
+CONTEO_ESTADISTICAS = f"""
+SELECT 'total' AS tipo, 'libros' AS clave, COUNT(*) AS valor FROM libros
+UNION ALL
+SELECT 'total', 'categorias', COUNT(*) FROM categorias
+UNION ALL
+SELECT 'total', 'prestamos_activos', COUNT(*) FROM prestamos WHERE estado IN {ESTADOS_PRESTAMO_ACTIVO}
+UNION ALL
+SELECT 'estado', estado, COUNT(*) FROM libros WHERE estado IS NOT NULL GROUP BY estado
+UNION ALL
+SELECT 'categoria', CAST(categoria_id AS CHAR), COUNT(*) FROM libros
+WHERE categoria_id IS NOT NULL GROUP BY categoria_id
+"""
+
+
+def _sumar_contador(tipo, clave, delta):
+    """SQL de trigger que suma delta al contador (tipo, clave), creándolo si no existe"""
+    return (f"INSERT INTO estadisticas_contadores (tipo, clave, valor) "
+            f"VALUES ('{tipo}', {clave}, {delta}) "
+            f"ON DUPLICATE KEY UPDATE valor = valor + ({delta});")
+
+
+TRIGGERS_ESTADISTICAS = {
+    'trg_libros_estadisticas_ai': f"""
+        CREATE TRIGGER trg_libros_estadisticas_ai AFTER INSERT ON libros FOR EACH ROW
+        BEGIN
+            {_sumar_contador('total', "'libros'", 1)}
+            IF NEW.estado IS NOT NULL THEN
+                {_sumar_contador('estado', 'NEW.estado', 1)}
+            END IF;
+            IF NEW.categoria_id IS NOT NULL THEN
+                {_sumar_contador('categoria', 'NEW.categoria_id', 1)}
+            END IF;
+        END
+    """,
+    'trg_libros_estadisticas_au': f"""
+        CREATE TRIGGER trg_libros_estadisticas_au AFTER UPDATE ON libros FOR EACH ROW
+        BEGIN
+            IF NOT (OLD.estado <=> NEW.estado) THEN
+                IF OLD.estado IS NOT NULL THEN
+                    {_sumar_contador('estado', 'OLD.estado', -1)}
+                END IF;
+                IF NEW.estado IS NOT NULL THEN
+                    {_sumar_contador('estado', 'NEW.estado', 1)}
+                END IF;
+            END IF;
+            IF NOT (OLD.categoria_id <=> NEW.categoria_id) THEN
+                IF OLD.categoria_id IS NOT NULL THEN
+                    {_sumar_contador('categoria', 'OLD.categoria_id', -1)}
+                END IF;
+                IF NEW.categoria_id IS NOT NULL THEN
+                    {_sumar_contador('categoria', 'NEW.categoria_id', 1)}
+                END IF;
+            END IF;
+        END
+    """,
+    # BEFORE DELETE: los préstamos borrados en cascada por la FK no disparan triggers,
+    # así que los préstamos activos del libro se descuentan aquí
+    'trg_libros_estadisticas_bd': f"""
+        CREATE TRIGGER trg_libros_estadisticas_bd BEFORE DELETE ON libros FOR EACH ROW
+        BEGIN
+            DECLARE activos INT;
+            SELECT COUNT(*) INTO activos FROM prestamos
+            WHERE libro_id = OLD.id AND estado IN {ESTADOS_PRESTAMO_ACTIVO};
+            {_sumar_contador('total', "'libros'", -1)}
+            {_sumar_contador('total', "'prestamos_activos'", '-activos')}
+            IF OLD.estado IS NOT NULL THEN
+                {_sumar_contador('estado', 'OLD.estado', -1)}
+            END IF;
+            IF OLD.categoria_id IS NOT NULL THEN
+                {_sumar_contador('categoria', 'OLD.categoria_id', -1)}
+            END IF;
+        END
+    """,
+    'trg_prestamos_estadisticas_ai': f"""
+        CREATE TRIGGER trg_prestamos_estadisticas_ai AFTER INSERT ON prestamos FOR EACH ROW
+        BEGIN
+            IF NEW.estado IN {ESTADOS_PRESTAMO_ACTIVO} THEN
+                {_sumar_contador('total', "'prestamos_activos'", 1)}
+            END IF;
+        END
+    """,
+    'trg_prestamos_estadisticas_au': f"""
+        CREATE TRIGGER trg_prestamos_estadisticas_au AFTER UPDATE ON prestamos FOR EACH ROW
+        BEGIN
+            IF COALESCE(OLD.estado, '') IN {ESTADOS_PRESTAMO_ACTIVO}
+               AND COALESCE(NEW.estado, '') NOT IN {ESTADOS_PRESTAMO_ACTIVO} THEN
+                {_sumar_contador('total', "'prestamos_activos'", -1)}
+            ELSEIF COALESCE(NEW.estado, '') IN {ESTADOS_PRESTAMO_ACTIVO}
+                   AND COALESCE(OLD.estado, '') NOT IN {ESTADOS_PRESTAMO_ACTIVO} THEN
+                {_sumar_contador('total', "'prestamos_activos'", 1)}
+            END IF;
+        END
+    """,
+    'trg_prestamos_estadisticas_ad': f"""
+        CREATE TRIGGER trg_prestamos_estadisticas_ad AFTER DELETE ON prestamos FOR EACH ROW
+        BEGIN
+            IF OLD.estado IN {ESTADOS_PRESTAMO_ACTIVO} THEN
+                {_sumar_contador('total', "'prestamos_activos'", -1)}
+            END IF;
+        END
+    """,
+    'trg_categorias_estadisticas_ai': f"""
+        CREATE TRIGGER trg_categorias_estadisticas_ai AFTER INSERT ON categorias FOR EACH ROW
+        BEGIN
+            {_sumar_contador('total', "'categorias'", 1)}
+        END
+    """,
+    # Los libros pasan a categoria_id NULL por la FK sin disparar triggers
+    'trg_categorias_estadisticas_ad': f"""
+        CREATE TRIGGER trg_categorias_estadisticas_ad AFTER DELETE ON categorias FOR EACH ROW
+        BEGIN
+            {_sumar_contador('total', "'categorias'", -1)}
+            DELETE FROM estadisticas_contadores
+            WHERE tipo = 'categoria' AND clave = CAST(OLD.id AS CHAR);
+        END
+    """,
+}
+
+
+def _sumar_contador_sqlite(tipo, clave, delta, condicion='1'):
+    """SQL de trigger de SQLite que suma delta al contador (tipo, clave) si se cumple la condición"""
+    return (f"INSERT INTO estadisticas_contadores (tipo, clave, valor) "
+            f"SELECT '{tipo}', {clave}, {delta} WHERE {condicion} "
+            f"ON CONFLICT (tipo, clave) DO UPDATE SET valor = valor + excluded.valor;")
+
+
+# Los mismos contadores para SQLite, donde los triggers no tienen IF: cada
+# suma lleva su condición. A diferencia de MySQL, en SQLite las acciones de
+# las claves foráneas (borrado en cascada, SET NULL) sí disparan triggers.
+TRIGGERS_ESTADISTICAS_SQLITE = {
+    'trg_libros_estadisticas_ai': f"""
+        CREATE TRIGGER trg_libros_estadisticas_ai AFTER INSERT ON libros BEGIN
+            {_sumar_contador_sqlite('total', "'libros'", 1)}
+            {_sumar_contador_sqlite('estado', 'NEW.estado', 1, 'NEW.estado IS NOT NULL')}
+            {_sumar_contador_sqlite('categoria', 'CAST(NEW.categoria_id AS TEXT)', 1,
+                                    'NEW.categoria_id IS NOT NULL')}
+        END
+    """,
+    'trg_libros_estadisticas_au': f"""
+        CREATE TRIGGER trg_libros_estadisticas_au AFTER UPDATE OF estado, categoria_id ON libros BEGIN
+            {_sumar_contador_sqlite('estado', 'OLD.estado', -1,
+                                    'OLD.estado IS NOT NEW.estado AND OLD.estado IS NOT NULL')}
+            {_sumar_contador_sqlite('estado', 'NEW.estado', 1,
+                                    'OLD.estado IS NOT NEW.estado AND NEW.estado IS NOT NULL')}
+            {_sumar_contador_sqlite('categoria', 'CAST(OLD.categoria_id AS TEXT)', -1,
+                                    'OLD.categoria_id IS NOT NEW.categoria_id '
+                                    'AND OLD.categoria_id IS NOT NULL')}
+            {_sumar_contador_sqlite('categoria', 'CAST(NEW.categoria_id AS TEXT)', 1,
+                                    'OLD.categoria_id IS NOT NEW.categoria_id '
+                                    'AND NEW.categoria_id IS NOT NULL')}
+        END
+    """,
+    # Los préstamos borrados en cascada descuentan los activos con su propio trigger
+    'trg_libros_estadisticas_ad': f"""
+        CREATE TRIGGER trg_libros_estadisticas_ad AFTER DELETE ON libros BEGIN
+            {_sumar_contador_sqlite('total', "'libros'", -1)}
+            {_sumar_contador_sqlite('estado', 'OLD.estado', -1, 'OLD.estado IS NOT NULL')}
+            {_sumar_contador_sqlite('categoria', 'CAST(OLD.categoria_id AS TEXT)', -1,
+                                    'OLD.categoria_id IS NOT NULL')}
+        END
+    """,
+    'trg_prestamos_estadisticas_ai': f"""
+        CREATE TRIGGER trg_prestamos_estadisticas_ai AFTER INSERT ON prestamos BEGIN
+            {_sumar_contador_sqlite('total', "'prestamos_activos'", 1,
+                                    f'NEW.estado IN {ESTADOS_PRESTAMO_ACTIVO}')}
+        END
+    """,
+    'trg_prestamos_estadisticas_au': f"""
+        CREATE TRIGGER trg_prestamos_estadisticas_au AFTER UPDATE OF estado ON prestamos BEGIN
+            {_sumar_contador_sqlite('total', "'prestamos_activos'", -1,
+                                    f"COALESCE(OLD.estado, '') IN {ESTADOS_PRESTAMO_ACTIVO} "
+                                    f"AND COALESCE(NEW.estado, '') NOT IN {ESTADOS_PRESTAMO_ACTIVO}")}
+            {_sumar_contador_sqlite('total', "'prestamos_activos'", 1,
+                                    f"COALESCE(NEW.estado, '') IN {ESTADOS_PRESTAMO_ACTIVO} "
+                                    f"AND COALESCE(OLD.estado, '') NOT IN {ESTADOS_PRESTAMO_ACTIVO}")}
+        END
+    """,
+    'trg_prestamos_estadisticas_ad': f"""
+        CREATE TRIGGER trg_prestamos_estadisticas_ad AFTER DELETE ON prestamos BEGIN
+            {_sumar_contador_sqlite('total', "'prestamos_activos'", -1,
+                                    f'OLD.estado IN {ESTADOS_PRESTAMO_ACTIVO}')}
+        END
+    """,
+    'trg_categorias_estadisticas_ai': f"""
+        CREATE TRIGGER trg_categorias_estadisticas_ai AFTER INSERT ON categorias BEGIN
+            {_sumar_contador_sqlite('total', "'categorias'", 1)}
+        END
+    """,
+    # El SET NULL de los libros ya descontó sus contadores antes de este trigger
+    'trg_categorias_estadisticas_ad': f"""
+        CREATE TRIGGER trg_categorias_estadisticas_ad AFTER DELETE ON categorias BEGIN
+            {_sumar_contador_sqlite('total', "'categorias'", -1)}
+            DELETE FROM estadisticas_contadores
+            WHERE tipo = 'categoria' AND clave = CAST(OLD.id AS TEXT);
+        END
+    """,
+}
+
+
+def _m003_estadisticas_contadores(cursor):
+    """Tabla de contadores mantenida por triggers para estadisticas_biblioteca"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS estadisticas_contadores (
+            tipo VARCHAR(20) NOT NULL,
+            clave VARCHAR(100) NOT NULL,
+            valor BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (tipo, clave)
+        )
+    """)
+    _instalar_triggers_estadisticas(cursor)
+
+
+def _instalar_triggers_estadisticas(cursor):
+    """Reemplaza los triggers de estadísticas y recuenta los contadores"""
+    triggers = TRIGGERS_ESTADISTICAS_SQLITE if es_sqlite(cursor.connection) else TRIGGERS_ESTADISTICAS
+    for nombre, definicion in triggers.items():
+        cursor.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+        cursor.execute(definicion)
+    cursor.execute("DELETE FROM estadisticas_contadores")
+    cursor.execute(f"INSERT INTO estadisticas_contadores (tipo, clave, valor) {CONTEO_ESTADISTICAS}")
+
+
+def _m004_prestamos_vencidos(cursor):
+    """Índice para el barrido de vencidos; los préstamos 'Vencido' siguen activos"""
+    _crear_indice(cursor, 'prestamos', 'idx_estado_devolucion', 'estado, fecha_devolucion_esperada')
+    _instalar_triggers_estadisticas(cursor)
+
+
+def completar_isbn13(cursor, tamaño_lote=5000):
+    """
+    Calcula isbn13 de los libros que ya estaban cargados, recorriéndolos por
+    id en lotes confirmados por separado (no bloquea toda la tabla)
+
+    Returns:
+        Cantidad de libros con isbn13 calculado
+    """
+    completados = 0
+    ultimo_id = 0
+    while True:
+        cursor.execute("SELECT id, isbn FROM libros WHERE id > %s ORDER BY id LIMIT %s",
+                       (ultimo_id, tamaño_lote))
+        filas = cursor.fetchall()
+        if not filas:
+            break
+        canonicos = ((isbn13(isbn), libro_id) for libro_id, isbn in filas)
+        cambios = [(canonico, libro_id) for canonico, libro_id in canonicos if canonico is not None]
+        if cambios:
+            cursor.executemany("UPDATE libros SET isbn13 = %s WHERE id = %s", cambios)
+        cursor.connection.commit()
+        completados += len(cambios)
+        ultimo_id = filas[-1][0]
+    return completados
+
+
+def _m005_isbn13(cursor):
+    """
+    Columna isbn13 con el ISBN-13 canónico de cada libro (ver isbn.py),
+    completada por lotes, con índice único
+    """
+    if not _columna_existe(cursor, 'libros', 'isbn13'):
+        tipo = 'INTEGER' if es_sqlite(cursor.connection) else 'BIGINT UNSIGNED'
+        cursor.execute(f"ALTER TABLE libros ADD COLUMN isbn13 {tipo} NULL")
+    if _indice_existe(cursor, 'libros', 'uq_isbn13'):
+        # Un intento anterior creó el índice pero falló antes de registrarse:
+        # recalcular devolvería isbn13 a los repetidos y chocaría con el índice
+        return
+    completados = completar_isbn13(cursor)
+    print(f"   🔢 isbn13 calculado para {completados} libros")
+
+    # El mismo libro cargado dos veces con distinto formato de ISBN: conserva
+    # isbn13 el primero y los demás quedan sin él para poder crear el índice
+    cursor.execute("""
+        SELECT isbn13, MIN(id) FROM libros
+        WHERE isbn13 IS NOT NULL
+        GROUP BY isbn13 HAVING COUNT(*) > 1
+    """)
+    repetidos = cursor.fetchall()
+    for canonico, primero in repetidos:
+        cursor.execute("SELECT id FROM libros WHERE isbn13 = %s AND id <> %s", (canonico, primero))
+        duplicados = [str(fila[0]) for fila in cursor.fetchall()]
+        print(f"   ⚠️ ISBN {canonico}: los libros {', '.join(duplicados)} repiten el del "
+              f"libro {primero} y quedan sin isbn13")
+        cursor.execute("UPDATE libros SET isbn13 = NULL WHERE isbn13 = %s AND id <> %s",
+                       (canonico, primero))
+    cursor.connection.commit()
+    cursor.execute("CREATE UNIQUE INDEX uq_isbn13 ON libros (isbn13)")
+
+
+# Columnas comunes a prestamos y prestamos_historico (persona_id desde la migración 7)
+COLUMNAS_PRESTAMO = ('id, libro_id, persona_id, persona_prestamo, fecha_prestamo, '
+                     'fecha_devolucion_esperada, fecha_devolucion_real, estado, notas')
+
+
+def _crear_vista_prestamos_todos(cursor, columnas):
+    """
+    (Re)crea la vista del historial completo: préstamos vigentes y archivados,
+    con `archivado` para distinguirlos
+    """
+    cursor.execute("DROP VIEW IF EXISTS prestamos_todos")
+    cursor.execute(f"""
+        CREATE VIEW prestamos_todos AS
+        SELECT {columnas}, 0 AS archivado FROM prestamos
+        UNION ALL
+        SELECT {columnas}, 1 AS archivado FROM prestamos_historico
+    """)
+
+
+def _m006_prestamos_historico(cursor):
+    """
+    Tabla prestamos_historico para los préstamos devueltos que archiva
+    archivado.py, la vista prestamos_todos y el índice con que se eligen
+    """
+    if es_sqlite(cursor.connection):
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS prestamos_historico (
+                id INTEGER PRIMARY KEY,
+                libro_id INTEGER NOT NULL REFERENCES libros(id) ON DELETE CASCADE,
+                persona_prestamo TEXT NOT NULL,
+                fecha_prestamo DATE NOT NULL,
+                fecha_devolucion_esperada DATE,
+                fecha_devolucion_real DATE,
+                estado TEXT NOT NULL,
+                notas TEXT,
+                fecha_archivado TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+    else:
+        # Conserva el id original: no es AUTO_INCREMENT
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS prestamos_historico (
+                id INT PRIMARY KEY,
+                libro_id INT NOT NULL,
+                persona_prestamo VARCHAR(100) NOT NULL,
+                fecha_prestamo DATE NOT NULL,
+                fecha_devolucion_esperada DATE,
+                fecha_devolucion_real DATE,
+                estado ENUM('Prestado', 'Devuelto', 'Vencido') NOT NULL,
+                notas TEXT,
+                fecha_archivado TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (libro_id) REFERENCES libros(id) ON DELETE CASCADE,
+                INDEX idx_historico_libro (libro_id),
+                INDEX idx_historico_fecha_prestamo (fecha_prestamo),
+                INDEX idx_historico_persona (persona_prestamo)
+            )
+        """)
+    _crear_vista_prestamos_todos(cursor, 'id, libro_id, persona_prestamo, fecha_prestamo, '
+                                 'fecha_devolucion_esperada, fecha_devolucion_real, estado, notas')
+    _crear_indice(cursor, 'prestamos_historico', 'idx_historico_fecha_prestamo', 'fecha_prestamo')
+    _crear_indice(cursor, 'prestamos_historico', 'idx_historico_libro', 'libro_id')
+    _crear_indice(cursor, 'prestamos_historico', 'idx_historico_persona', 'persona_prestamo')
+    _crear_indice(cursor, 'prestamos', 'idx_estado_devolucion_real', 'estado, fecha_devolucion_real')
+
+
+# Total de préstamos (vigentes y archivados) de cada persona, para ordenar por
+# el índice de personas.total_prestamos sin agrupar todos los préstamos.
+# En MySQL el borrado en cascada de los préstamos de un libro no dispara
+# triggers, así que trg_libros_personas_bd los descuenta antes.
+TRIGGERS_PERSONAS = {
+    'trg_prestamos_personas_ai': """
+        CREATE TRIGGER trg_prestamos_personas_ai AFTER INSERT ON prestamos FOR EACH ROW
+        UPDATE personas SET total_prestamos = total_prestamos + 1 WHERE id = NEW.persona_id
+    """,
+    'trg_prestamos_personas_ad': """
+        CREATE TRIGGER trg_prestamos_personas_ad AFTER DELETE ON prestamos FOR EACH ROW
+        UPDATE personas SET total_prestamos = total_prestamos - 1 WHERE id = OLD.persona_id
+    """,
+    'trg_historico_personas_ai': """
+        CREATE TRIGGER trg_historico_personas_ai AFTER INSERT ON prestamos_historico FOR EACH ROW
+        UPDATE personas SET total_prestamos = total_prestamos + 1 WHERE id = NEW.persona_id
+    """,
+    'trg_historico_personas_ad': """
+        CREATE TRIGGER trg_historico_personas_ad AFTER DELETE ON prestamos_historico FOR EACH ROW
+        UPDATE personas SET total_prestamos = total_prestamos - 1 WHERE id = OLD.persona_id
+    """,
+    'trg_libros_personas_bd': """
+        CREATE TRIGGER trg_libros_personas_bd BEFORE DELETE ON libros FOR EACH ROW
+        BEGIN
+            UPDATE personas p
+            JOIN (SELECT persona_id, COUNT(*) AS cantidad FROM prestamos
+                  WHERE libro_id = OLD.id GROUP BY persona_id) t ON t.persona_id = p.id
+            SET p.total_prestamos = p.total_prestamos - t.cantidad;
+            UPDATE personas p
+            JOIN (SELECT persona_id, COUNT(*) AS cantidad FROM prestamos_historico
+                  WHERE libro_id = OLD.id GROUP BY persona_id) t ON t.persona_id = p.id
+            SET p.total_prestamos = p.total_prestamos - t.cantidad;
+        END
+    """,
+}
+
+# En SQLite el borrado en cascada sí dispara los triggers de los préstamos
+TRIGGERS_PERSONAS_SQLITE = {
+    'trg_prestamos_personas_ai': """
+        CREATE TRIGGER trg_prestamos_personas_ai AFTER INSERT ON prestamos
+        WHEN NEW.persona_id IS NOT NULL BEGIN
+            UPDATE personas SET total_prestamos = total_prestamos + 1 WHERE id = NEW.persona_id;
+        END
+    """,
+    'trg_prestamos_personas_ad': """
+        CREATE TRIGGER trg_prestamos_personas_ad AFTER DELETE ON prestamos
+        WHEN OLD.persona_id IS NOT NULL BEGIN
+            UPDATE personas SET total_prestamos = total_prestamos - 1 WHERE id = OLD.persona_id;
+        END
+    """,
+    'trg_historico_personas_ai': """
+        CREATE TRIGGER trg_historico_personas_ai AFTER INSERT ON prestamos_historico
+        WHEN NEW.persona_id IS NOT NULL BEGIN
+            UPDATE personas SET total_prestamos = total_prestamos + 1 WHERE id = NEW.persona_id;
+        END
+    """,
+    'trg_historico_personas_ad': """
+        CREATE TRIGGER trg_historico_personas_ad AFTER DELETE ON prestamos_historico
+        WHEN OLD.persona_id IS NOT NULL BEGIN
+            UPDATE personas SET total_prestamos = total_prestamos - 1 WHERE id = OLD.persona_id;
+        END
+    """,
+}
+
+# Recuento de personas.total_prestamos a partir de los préstamos
+RECONTAR_PERSONAS = """
+UPDATE personas SET total_prestamos =
+    (SELECT COUNT(*) FROM prestamos p WHERE p.persona_id = personas.id)
+    + (SELECT COUNT(*) FROM prestamos_historico h WHERE h.persona_id = personas.id)
+"""
+
+
+def completar_personas(cursor, tabla, tamaño_lote=5000):
+    """
+    Asigna persona_id a los préstamos de `tabla` que solo tienen el nombre,
+    creando las personas que falten; recorre la tabla por id en lotes
+    confirmados por separado
+
+    Returns:
+        Cantidad de préstamos asignados
+    """
+    ids_persona = {}
+    asignados = 0
+    ultimo_id = 0
+    while True:
+        cursor.execute(f"SELECT id, persona_prestamo, persona_id FROM {tabla} "
+                       f"WHERE id > %s ORDER BY id LIMIT %s", (ultimo_id, tamaño_lote))
+        filas = cursor.fetchall()
+        if not filas:
+            break
+        ultimo_id = filas[-1][0]
+        pendientes = [(prestamo_id, normalizar_nombre(nombre), nombre)
+                      for prestamo_id, nombre, persona_id in filas if persona_id is None]
+        pendientes = [pendiente for pendiente in pendientes if pendiente[1]]
+
+        nuevas = {}
+        for _, clave, nombre in pendientes:
+            if clave not in ids_persona:
+                nuevas.setdefault(clave, limpiar_nombre(nombre))
+        if nuevas:
+            cursor.executemany("INSERT IGNORE INTO personas (nombre, nombre_normalizado) VALUES (%s, %s)",
+                               [(nombre, clave) for clave, nombre in nuevas.items()])
+            claves = list(nuevas)
+            cursor.execute(f"SELECT nombre_normalizado, id FROM personas WHERE nombre_normalizado "
+                           f"IN ({', '.join(['%s'] * len(claves))})", claves)
+            ids_persona.update(cursor.fetchall())
+
+        if pendientes:
+            cursor.executemany(f"UPDATE {tabla} SET persona_id = %s WHERE id = %s",
+                               [(ids_persona[clave], prestamo_id) for prestamo_id, clave, _ in pendientes])
+        cursor.connection.commit()
+        asignados += len(pendientes)
+    return asignados
+
+
+def _m007_personas(cursor):
+    """
+    Tabla personas referenciada por id desde los préstamos, completada a
+    partir de los nombres por lotes, con el total de préstamos de cada una
+    mantenido por triggers
+    """
+    sqlite = es_sqlite(cursor.connection)
+    if sqlite:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS personas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nombre TEXT NOT NULL,
+                nombre_normalizado TEXT NOT NULL UNIQUE,
+                limite_prestamos INTEGER,
+                total_prestamos INTEGER NOT NULL DEFAULT 0,
+                fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+    else:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS personas (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                nombre VARCHAR(100) NOT NULL,
+                nombre_normalizado VARCHAR(100) NOT NULL,
+                limite_prestamos INT NULL,
+                total_prestamos INT NOT NULL DEFAULT 0,
+                fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE KEY uq_nombre_normalizado (nombre_normalizado)
+            )
+        """)
+
+    for tabla in ('prestamos', 'prestamos_historico'):
+        if _columna_existe(cursor, tabla, 'persona_id'):
+            continue
+        if sqlite:
+            cursor.execute(f"ALTER TABLE {tabla} ADD COLUMN persona_id INTEGER REFERENCES personas(id)")
+        else:
+            cursor.execute(f"ALTER TABLE {tabla} ADD COLUMN persona_id INT NULL, "
+                           f"ADD CONSTRAINT fk_{tabla}_persona FOREIGN KEY (persona_id) REFERENCES personas(id)")
+        asignados = completar_personas(cursor, tabla)
+        print(f"   👤 {asignados} préstamos de '{tabla}' asociados a su persona")
+
+    # Préstamos activos de una persona (y su límite) e historial por persona
+    _crear_indice(cursor, 'prestamos', 'idx_persona_estado_fecha', 'persona_id, estado, fecha_prestamo')
+    _crear_indice(cursor, 'prestamos_historico', 'idx_historico_persona_fecha', 'persona_id, fecha_prestamo')
+    _crear_indice(cursor, 'personas', 'idx_total_prestamos', 'total_prestamos')
+
+    cursor.execute(RECONTAR_PERSONAS)
+    triggers = TRIGGERS_PERSONAS_SQLITE if sqlite else TRIGGERS_PERSONAS
+    for nombre, definicion in triggers.items():
+        cursor.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+        cursor.execute(definicion)
+    _crear_vista_prestamos_todos(cursor, COLUMNAS_PRESTAMO)
+
+
+# Lista ordenada de migraciones: (versión, descripción, función)
+MIGRACIONES = [
+    (1, "Índice FULLTEXT de título y autor en libros", _m001_fulltext_libros),
+    (2, "Índices de fecha de préstamo para paginación", _m002_indices_prestamos),
+    (3, "Contadores de estadísticas mantenidos por triggers", _m003_estadisticas_contadores),
+    (4, "Índice de vencimientos y préstamos vencidos como activos", _m004_prestamos_vencidos),
+    (5, "ISBN-13 canónico (isbn13) con índice único", _m005_isbn13),
+    (6, "Archivo de préstamos devueltos (prestamos_historico) y vista prestamos_todos",
+     _m006_prestamos_historico),
+    (7, "Personas referenciadas por id desde los préstamos, con límites y totales",
+     _m007_personas),
+]
+
+
+def aplicar_migraciones(cursor):
+    """
+    Aplica las migraciones pendientes en orden
+
+    Args:
+        cursor: Cursor de una conexión abierta
+
+    Returns:
+        Lista de versiones aplicadas en esta llamada
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS esquema_migraciones (
+            version INT PRIMARY KEY,
+            descripcion VARCHAR(200) NOT NULL,
+            fecha_aplicacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT version FROM esquema_migraciones")
+    aplicadas = {fila[0] for fila in cursor.fetchall()}
+
+    nuevas = []
+    for version, descripcion, migracion in MIGRACIONES:
+        if version in aplicadas:
+            continue
+        migracion(cursor)
+        cursor.execute(
+            "INSERT INTO esquema_migraciones (version, descripcion) VALUES (%s, %s)",
+            (version, descripcion))
+        cursor.connection.commit()
+        print(f"✅ Migración {version} aplicada: {descripcion}")
+        nuevas.append(version)
+    return nuevas
+
+
+@operacion_bd("aplicar migraciones")
+def migrar():
+    """
+    Abre una conexión del pool y aplica las migraciones pendientes
+
+    Cada migración se registra al terminar, así que repetir la llamada tras
+    un error retoma desde la primera pendiente.
+
+    Returns:
+        Lista de versiones aplicadas
+
+    Raises:
+        ErrorBaseDatos: Si falla la operación en la base de datos
+    """
+    conexion = None
+    cursor = None
+
+    try:
+        conexion = obtener_conexion()
+        cursor = conexion.cursor()
+        nuevas = aplicar_migraciones(cursor)
+        if not nuevas:
+            print("✅ El esquema ya está actualizado")
+        return nuevas
+    finally:
+        if cursor:
+            cursor.close()
+        if conexion:
+            liberar_conexion(conexion)
+
+
+if __name__ == "__main__":
+    try:
+        migrar()
+    except ErrorBaseDatos as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        cerrar_pool()
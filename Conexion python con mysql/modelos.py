@@ -0,0 +1,142 @@
+"""
+Tipos de fila que retornan las funciones de la biblioteca
+Son clases con __slots__: se accede por nombre (libro.estado), ocupan menos
+memoria que un diccionario por fila y se construyen directamente en el
+cursor (ver cursor_registros), que ubica cada campo por el nombre de la
+columna en cursor.description y no por su posición en el SELECT.
+
+Por compatibilidad también admiten el acceso posicional (libro[7]) y el
+desempaquetado, en el orden de __slots__.
+"""
+import functools
+import operator
+
+from instrumentacion import CursorInstrumentado, SSCursorInstrumentado
+
+
+class Registro:
+    """
+    Base de los tipos de fila; cada subclase declara sus campos en __slots__
+    """
+    __slots__ = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # __init__ con un parámetro por campo, como hace namedtuple, para que
+        # construir cientos de miles de filas no pague un setattr genérico
+        campos = cls.__slots__
+        codigo = (f"def __init__(self, {', '.join(campos)}):\n"
+                  + ''.join(f"    self.{campo} = {campo}\n" for campo in campos))
+        espacio = {}
+        exec(codigo, espacio)
+        cls.__init__ = espacio['__init__']
+
+    @classmethod
+    def mapeador(cls, columnas):
+        """
+        Retorna una función que convierte una fila en un registro, ubicando
+        cada campo por el nombre de su columna
+
+        Args:
+            columnas: Nombres (o alias) de las columnas, en el orden del SELECT
+
+        Raises:
+            ValueError: Si falta alguna columna del registro
+        """
+        columnas = list(columnas)
+        faltantes = [campo for campo in cls.__slots__ if campo not in columnas]
+        if faltantes:
+            raise ValueError(f"Faltan columnas para {cls.__name__}: {', '.join(faltantes)}")
+        posiciones = [columnas.index(campo) for campo in cls.__slots__]
+        if posiciones == list(range(len(columnas))):
+            return lambda fila: cls(*fila)
+        extraer = operator.itemgetter(*posiciones)
+        return lambda fila: cls(*extraer(fila))
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return tuple(getattr(self, campo) for campo in self.__slots__[indice])
+        return getattr(self, self.__slots__[indice])
+
+    def __iter__(self):
+        return (getattr(self, campo) for campo in self.__slots__)
+
+    def __eq__(self, otro):
+        if type(otro) is not type(self):
+            return NotImplemented
+        return tuple(self) == tuple(otro)
+
+    __hash__ = None
+
+    def __repr__(self):
+        valores = ', '.join(f"{campo}={getattr(self, campo)!r}" for campo in self.__slots__)
+        return f"{type(self).__name__}({valores})"
+
+    def a_dict(self):
+        """Retorna el registro como diccionario {campo: valor}"""
+        return {campo: getattr(self, campo) for campo in self.__slots__}
+
+
+class Libro(Registro):
+    """Fila de listar_libros / iterar_libros"""
+    __slots__ = ('id', 'titulo', 'autor', 'isbn', 'editorial', 'año_publicacion',
+                 'paginas', 'estado', 'ubicacion', 'categoria')
+
+
+class LibroEncontrado(Registro):
+    """Fila de buscar_libro"""
+    __slots__ = ('id', 'titulo', 'autor', 'isbn', 'estado', 'categoria', 'ubicacion')
+
+
+class Prestamo(Registro):
+    """Fila de listar_prestamos / iterar_prestamos"""
+    __slots__ = ('id', 'titulo', 'autor', 'persona_prestamo', 'fecha_prestamo',
+                 'fecha_devolucion_esperada', 'fecha_devolucion_real', 'estado')
+
+
+class Persona(Registro):
+    """Fila de personas_con_mas_prestamos"""
+    __slots__ = ('id', 'nombre', 'limite_prestamos', 'total_prestamos', 'prestamos_activos')
+
+
+class Categoria(Registro):
+    """Fila de listar_categorias"""
+    __slots__ = ('id', 'nombre', 'descripcion')
+
+
+class _RegistrosMixin:
+    """
+    Convierte cada fila leída en una instancia de `registro`, al estilo de DictCursor
+    """
+
+    registro = None
+    _convertir = None
+
+    def _do_get_result(self):
+        super()._do_get_result()
+        self._convertir = None
+        if self.description:
+            self._convertir = self.registro.mapeador(campo[0] for campo in self.description)
+            if self._rows:
+                self._rows = [self._convertir(fila) for fila in self._rows]
+
+    def _conv_row(self, fila):
+        # Lo usa el SSCursor al leer cada fila del socket
+        if fila is None or self._convertir is None:
+            return fila
+        return self._convertir(fila)
+
+
+@functools.lru_cache(maxsize=None)
+def cursor_registros(registro, servidor=False):
+    """
+    Retorna la clase de cursor que produce filas `registro`; se usa como
+    conexion.cursor(cursor_registros(Libro))
+
+    Args:
+        registro: Subclase de Registro
+        servidor: Si es True, el cursor es un SSCursor (sin buffer en el cliente)
+    """
+    base = SSCursorInstrumentado if servidor else CursorInstrumentado
+    sufijo = 'SS' if servidor else ''
+    return type(f"Cursor{sufijo}{registro.__name__}", (_RegistrosMixin, base), {'registro': registro})
@@ -0,0 +1,352 @@
+"""
+Motor SQLite embebido para la biblioteca hogareña
+Permite usar la biblioteca sin un servidor MySQL (DB_MOTOR=sqlite): la base
+es un archivo local en modo WAL y las consultas se resuelven dentro del
+proceso, sin viajes por la red.
+
+ConexionSQLite y CursorSQLite ofrecen la misma interfaz de PyMySQL que usan
+el pool, la sesión persistente y las funciones de la biblioteca, así que
+estas no cambian:
+- Las sentencias se escriben con marcadores %s y se traducen una sola vez
+  al dialecto de SQLite (?, INSERT OR IGNORE, sin FOR UPDATE)
+- SELECT ... FOR UPDATE y las escrituras abren la transacción con BEGIN
+  IMMEDIATE, que toma el bloqueo de escritura al empezar
+- Los errores se convierten en los de PyMySQL con el código de MySQL
+  equivalente (1062 clave duplicada, 1205 base bloqueada, 1146 tabla
+  inexistente, ...), de modo que reintentos y mensajes funcionan igual
+- Las columnas DATE y TIMESTAMP se leen como date y datetime
+"""
+import functools
+import re
+import sqlite3
+import time
+from datetime import date, datetime
+
+import pymysql
+from pymysql.constants import CR, ER, SERVER_STATUS
+from instrumentacion import metricas
+
+# SQLite guarda las fechas como texto ISO, que se ordena y compara bien
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda valor: valor.isoformat(' '))
+sqlite3.register_converter('DATE', lambda valor: date.fromisoformat(valor.decode()))
+sqlite3.register_converter('TIMESTAMP', lambda valor: datetime.fromisoformat(valor.decode()))
+
+# Código de MySQL para una restricción CHECK violada (equivale a un ENUM inválido)
+ER_CHECK_CONSTRAINT_VIOLATED = 3819
+
+_RE_FOR_UPDATE = re.compile(r'\s+FOR\s+UPDATE\s*$', re.IGNORECASE)
+_RE_INSERT_IGNORE = re.compile(r'^(\s*)INSERT\s+IGNORE\b', re.IGNORECASE)
+_RE_MARCADOR = re.compile(r'%([s%])')
+_RE_PRIMERA_PALABRA = re.compile(r'\s*(\w+)')
+
+# Sentencias que modifican datos y por lo tanto abren una transacción
+_ESCRITURAS = frozenset(('INSERT', 'UPDATE', 'DELETE', 'REPLACE'))
+
+
+@functools.lru_cache(maxsize=512)
+def traducir(sql, con_parametros=True):
+    """
+    Traduce una sentencia con marcadores %s al dialecto de SQLite
+
+    Returns:
+        Tupla (sql traducido, abre_transaccion); abre_transaccion es True si
+        la sentencia escribe o bloquea filas (SELECT ... FOR UPDATE)
+    """
+    sql, bloqueos = _RE_FOR_UPDATE.subn('', sql)
+    sql = _RE_INSERT_IGNORE.sub(r'\1INSERT OR IGNORE', sql)
+    if con_parametros:
+        # Igual que PyMySQL: %% solo es un % literal cuando hay parámetros
+        sql = _RE_MARCADOR.sub(lambda m: '?' if m.group(1) == 's' else '%', sql)
+    palabra = _RE_PRIMERA_PALABRA.match(sql)
+    escribe = palabra is not None and palabra.group(1).upper() in _ESCRITURAS
+    return sql, bool(bloqueos) or escribe
+
+
+def _error_pymysql(error):
+    """Convierte un error de sqlite3 en el error de PyMySQL equivalente"""
+    mensaje = str(error)
+    if isinstance(error, sqlite3.IntegrityError):
+        if mensaje.startswith('UNIQUE'):
+            return pymysql.err.IntegrityError(ER.DUP_ENTRY, mensaje)
+        if mensaje.startswith('FOREIGN KEY'):
+            return pymysql.err.IntegrityError(ER.NO_REFERENCED_ROW_2, mensaje)
+        if mensaje.startswith('NOT NULL'):
+            return pymysql.err.IntegrityError(ER.BAD_NULL_ERROR, mensaje)
+        if mensaje.startswith('CHECK'):
+            return pymysql.err.IntegrityError(ER_CHECK_CONSTRAINT_VIOLATED, mensaje)
+        return pymysql.err.IntegrityError(mensaje)
+    if isinstance(error, sqlite3.OperationalError):
+        if 'locked' in mensaje or 'busy' in mensaje:
+            # Otra conexión retuvo el archivo más que tiempo_espera: se trata
+            # como la espera de bloqueo de InnoDB, que se resuelve reintentando
+            return pymysql.err.OperationalError(ER.LOCK_WAIT_TIMEOUT, mensaje)
+        if mensaje.startswith('no such table'):
+            return pymysql.err.ProgrammingError(ER.NO_SUCH_TABLE, mensaje)
+        if mensaje.startswith('no such column'):
+            return pymysql.err.OperationalError(ER.BAD_FIELD_ERROR, mensaje)
+        if 'syntax error' in mensaje:
+            return pymysql.err.ProgrammingError(ER.PARSE_ERROR, mensaje)
+        if mensaje.startswith('unable to open'):
+            return pymysql.err.OperationalError(CR.CR_CONNECTION_ERROR, mensaje)
+        return pymysql.err.OperationalError(mensaje)
+    if isinstance(error, sqlite3.ProgrammingError):
+        # Conexión o cursor ya cerrados, cantidad de parámetros incorrecta
+        return pymysql.err.InterfaceError(mensaje)
+    return pymysql.err.DatabaseError(mensaje)
+
+
+class CursorSQLite:
+    """
+    Cursor con la interfaz de los cursores de PyMySQL que usa la biblioteca
+
+    Si la clase de cursor pedida produce registros (ver modelos.cursor_registros),
+    las filas se convierten en ese registro ubicando cada campo por nombre.
+    Cada sentencia se registra en las métricas de instrumentacion.py.
+    """
+
+    def __init__(self, conexion, registro=None):
+        self.connection = conexion
+        self.registro = registro
+        self._cursor = conexion._sqlite.cursor()
+        self._convertir = None
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def _ejecutar(self, metodo, query, args):
+        sql, abre_transaccion = traducir(query, args is not None)
+        inicio = time.perf_counter()
+        try:
+            if abre_transaccion:
+                self.connection.begin()
+            if args is None:
+                metodo(sql)
+            else:
+                metodo(sql, args)
+        except sqlite3.Error as e:
+            error = _error_pymysql(e)
+            metricas.registrar_sentencia(query, args, time.perf_counter() - inicio, error=error)
+            raise error from e
+        filas = self._cursor.rowcount
+        metricas.registrar_sentencia(query, args, time.perf_counter() - inicio,
+                                     filas if filas >= 0 else None)
+        self._convertir = None
+        if self.registro is not None and self._cursor.description:
+            self._convertir = self.registro.mapeador(campo[0] for campo in self._cursor.description)
+        return filas
+
+    def execute(self, query, args=None):
+        if isinstance(args, dict):
+            raise pymysql.err.ProgrammingError("Los parámetros con nombre no están soportados")
+        if args is not None:
+            args = tuple(args)
+        return self._ejecutar(self._cursor.execute, query, args)
+
+    def executemany(self, query, args):
+        filas = [tuple(fila) for fila in args]
+        if not filas:
+            return 0
+        return self._ejecutar(self._cursor.executemany, query, filas)
+
+    def _leer(self, leer, *args):
+        try:
+            filas = leer(*args)
+        except sqlite3.Error as e:
+            raise _error_pymysql(e) from e
+        return filas
+
+    def fetchone(self):
+        fila = self._leer(self._cursor.fetchone)
+        if fila is not None and self._convertir is not None:
+            return self._convertir(fila)
+        return fila
+
+    def fetchmany(self, tamaño=None):
+        filas = self._leer(self._cursor.fetchmany, tamaño or self._cursor.arraysize)
+        if self._convertir is not None:
+            return [self._convertir(fila) for fila in filas]
+        return filas
+
+    def fetchall(self):
+        filas = self._leer(self._cursor.fetchall)
+        if self._convertir is not None:
+            return [self._convertir(fila) for fila in filas]
+        return filas
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        try:
+            self._cursor.close()
+        except sqlite3.Error:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.close()
+
+
+class ConexionSQLite:
+    """
+    Conexión a un archivo SQLite con la interfaz de pymysql.Connection que
+    usan el pool, la sesión persistente y las funciones de la biblioteca
+    """
+
+    def __init__(self, ruta, tiempo_espera=5):
+        """
+        Args:
+            ruta: Archivo de la base (se crea si no existe)
+            tiempo_espera: Segundos que una escritura espera a que otra libere el archivo
+        """
+        self.ruta = ruta
+        try:
+            # isolation_level=None: las transacciones se abren explícitamente en begin()
+            self._sqlite = sqlite3.connect(ruta, timeout=tiempo_espera, isolation_level=None,
+                                           detect_types=sqlite3.PARSE_DECLTYPES,
+                                           check_same_thread=False)
+            # WAL: las lecturas no esperan a las escrituras ni al revés
+            self._sqlite.execute("PRAGMA journal_mode = WAL")
+            self._sqlite.execute("PRAGMA synchronous = NORMAL")
+            self._sqlite.execute("PRAGMA foreign_keys = ON")
+        except sqlite3.Error as e:
+            raise _error_pymysql(e) from e
+        # Compatibilidad con los SELECT VERSION() de las demostraciones y benchmarks
+        self._sqlite.create_function('VERSION', 0, lambda: f"SQLite {sqlite3.sqlite_version}",
+                                     deterministic=True)
+
+    @property
+    def open(self):
+        return self._sqlite is not None
+
+    @property
+    def server_status(self):
+        """Estado al estilo de MySQL: solo informa si hay una transacción abierta"""
+        if self._sqlite is not None and self._sqlite.in_transaction:
+            return SERVER_STATUS.SERVER_STATUS_IN_TRANS
+        return 0
+
+    def _sqlite_abierta(self):
+        if self._sqlite is None:
+            raise pymysql.err.InterfaceError(0, "La conexión SQLite está cerrada")
+        return self._sqlite
+
+    def cursor(self, clase=None):
+        """
+        Args:
+            clase: Clase de cursor de PyMySQL pedida; solo se tiene en cuenta
+                   su registro (ver modelos.cursor_registros)
+        """
+        self._sqlite_abierta()
+        return CursorSQLite(self, getattr(clase, 'registro', None))
+
+    def begin(self):
+        """Abre una transacción con el bloqueo de escritura, si no hay una abierta"""
+        sqlite = self._sqlite_abierta()
+        if not sqlite.in_transaction:
+            # IMMEDIATE evita que dos transacciones que leyeron intenten luego
+            # escribir a la vez, caso que SQLite no resuelve esperando
+            sqlite.execute("BEGIN IMMEDIATE")
+
+    def commit(self):
+        sqlite = self._sqlite_abierta()
+        try:
+            if sqlite.in_transaction:
+                sqlite.execute("COMMIT")
+        except sqlite3.Error as e:
+            raise _error_pymysql(e) from e
+
+    def rollback(self):
+        sqlite = self._sqlite_abierta()
+        try:
+            if sqlite.in_transaction:
+                sqlite.execute("ROLLBACK")
+        except sqlite3.Error as e:
+            raise _error_pymysql(e) from e
+
+    def ping(self, reconnect=False):
+        """Un archivo local no se desconecta: solo se verifica que siga abierta"""
+        self._sqlite_abierta()
+
+    def close(self):
+        sqlite, self._sqlite = self._sqlite, None
+        if sqlite is not None:
+            sqlite.close()
+
+
+def conectar_sqlite(ruta, tiempo_espera=5):
+    """
+    Abre una conexión al archivo SQLite (lo crea si no existe)
+
+    Raises:
+        pymysql.err.OperationalError: Si no se puede abrir el archivo
+    """
+    return ConexionSQLite(ruta, tiempo_espera)
+
+
+def es_sqlite(conexion):
+    """Indica si la conexión (o la ConexionAgrupada que la envuelve) es del motor SQLite"""
+    return isinstance(getattr(conexion, 'conexion', conexion), ConexionSQLite)
+
+
+# Tablas de crear_estructura_biblioteca con tipos de SQLite: los ENUM pasan a
+# CHECK, los VARCHAR a TEXT y titulo/autor/nombre comparan sin distinguir
+# mayúsculas, como la colación por defecto de MySQL
+TABLAS_SQLITE = [
+    """
+    CREATE TABLE IF NOT EXISTS categorias (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre TEXT NOT NULL UNIQUE COLLATE NOCASE,
+        descripcion TEXT,
+        fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS libros (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        titulo TEXT NOT NULL COLLATE NOCASE,
+        autor TEXT NOT NULL COLLATE NOCASE,
+        isbn TEXT UNIQUE,
+        editorial TEXT,
+        año_publicacion INTEGER,
+        categoria_id INTEGER REFERENCES categorias(id) ON DELETE SET NULL,
+        paginas INTEGER,
+        estado TEXT DEFAULT 'Disponible'
+            CHECK (estado IN ('Disponible', 'Prestado', 'Perdido', 'En reparación')),
+        ubicacion TEXT,
+        notas TEXT,
+        fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_libros_titulo ON libros (titulo)",
+    "CREATE INDEX IF NOT EXISTS idx_libros_autor ON libros (autor)",
+    "CREATE INDEX IF NOT EXISTS idx_libros_estado ON libros (estado)",
+    "CREATE INDEX IF NOT EXISTS idx_libros_categoria ON libros (categoria_id)",
+    """
+    CREATE TABLE IF NOT EXISTS prestamos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        libro_id INTEGER NOT NULL REFERENCES libros(id) ON DELETE CASCADE,
+        persona_prestamo TEXT NOT NULL,
+        fecha_prestamo DATE NOT NULL,
+        fecha_devolucion_esperada DATE,
+        fecha_devolucion_real DATE,
+        estado TEXT DEFAULT 'Prestado' CHECK (estado IN ('Prestado', 'Devuelto', 'Vencido')),
+        notas TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_prestamos_libro ON prestamos (libro_id)",
+    "CREATE INDEX IF NOT EXISTS idx_prestamos_persona ON prestamos (persona_prestamo)",
+    "CREATE INDEX IF NOT EXISTS idx_prestamos_estado ON prestamos (estado)",
+]
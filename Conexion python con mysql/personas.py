@@ -0,0 +1,30 @@
+"""
+Normalización de los nombres de las personas que piden libros prestados
+Cada persona se guarda una sola vez en la tabla `personas`, identificada por
+su nombre normalizado (índice único): "Ana  Gómez", "ana gómez" y "ANA GOMEZ"
+son la misma persona, y los préstamos la referencian por id.
+"""
+import unicodedata
+
+
+def limpiar_nombre(nombre):
+    """Quita los espacios de los extremos y reduce los repetidos a uno"""
+    return ' '.join(str(nombre).split())
+
+
+def normalizar_nombre(nombre):
+    """
+    Clave de búsqueda de una persona: sin acentos, en minúsculas y con los
+    espacios reducidos; retorna '' si el nombre está vacío
+    """
+    descompuesto = unicodedata.normalize('NFKD', limpiar_nombre(nombre))
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).casefold()
+
+
+def limite_efectivo(limite_persona, limite_general):
+    """
+    Límite de préstamos activos de una persona: el suyo, o el general
+    (DB_LIMITE_PRESTAMOS) si no tiene uno; 0 significa sin límite (None)
+    """
+    limite = limite_general if limite_persona is None else limite_persona
+    return limite if limite and limite > 0 else None
@@ -0,0 +1,811 @@
+"""
+Pool de conexiones compartido para la biblioteca hogareña
+Reutiliza conexiones PyMySQL entre llamadas para evitar el costo
+de un handshake TCP + autenticación en cada operación
+
+Para procesos interactivos de un solo hilo (el menú) está además la
+sesión persistente: una única conexión fija, sin ping en cada operación.
+La sesión puede además agrupar varias operaciones en una sola transacción
+(ver SesionPersistente.agrupar), como hace el modo --batch de biblioteca.py.
+
+Si hay réplicas configuradas (DB_REPLICAS), las consultas de solo lectura
+(obtener_conexion(lectura=True)) se reparten entre ellas con un pool por
+réplica; las escrituras, y las lecturas que siguen a una escritura del
+mismo hilo, van al primario.
+
+Con DB_MOTOR=sqlite las conexiones son de un archivo SQLite local (ver
+motor_sqlite.py) y no se usan réplicas.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pymysql
+from config_database import (
+    get_pymysql_config, get_pool_config, get_sesion_config, get_replicas_config,
+    get_motor, get_sqlite_config
+)
+from pymysql import Error
+from pymysql.constants import SERVER_STATUS
+from pymysql.cursors import DictCursor
+from instrumentacion import metricas, CursorInstrumentado, SSCursorInstrumentado
+from resiliencia import TiempoAgotadoError, interruptor_para
+from motor_sqlite import conectar_sqlite
+
+
+class PoolAgotadoError(TiempoAgotadoError):
+    """
+    Se lanza cuando no se obtiene una conexión libre dentro del tiempo de espera
+    """
+    # Reintentar solo volvería a esperar lo mismo
+    transitorio = False
+
+
+def _config_conexion(config=None):
+    """
+    Parámetros de conexión para el pool y la sesión persistente: los de
+    pymysql.connect o, con DB_MOTOR=sqlite, los de conectar_sqlite
+    """
+    if config is None:
+        config = get_sqlite_config() if get_motor() == 'sqlite' else get_pymysql_config()
+    config = dict(config)
+    if _es_config_sqlite(config):
+        return config
+    # Todas las sentencias ejecutadas con conexion.cursor() quedan medidas
+    config.setdefault('cursorclass', CursorInstrumentado)
+    return config
+
+
+def _es_config_sqlite(config):
+    return 'ruta' in config
+
+
+def _conectar(config, interruptor):
+    """Abre una conexión e informa el resultado al corte de circuito del servidor"""
+    try:
+        if _es_config_sqlite(config):
+            conexion = conectar_sqlite(**config)
+        else:
+            conexion = pymysql.connect(**config)
+    except Error:
+        interruptor.fallo()
+        raise
+    interruptor.exito()
+    return conexion
+
+
+class PoolConexiones:
+    """
+    Pool de conexiones acotado y seguro para uso desde varios hilos
+
+    Cada conexión se entrega tras comprobar con ping que sigue viva, y se
+    descarta si superó su tiempo máximo de inactividad o de vida. Si el
+    servidor falla varias veces seguidas, el corte de circuito hace que
+    obtener() falle al instante con CircuitoAbiertoError durante un tiempo.
+    """
+
+    def __init__(self, config=None, min_conexiones=1, max_conexiones=10,
+                 tiempo_inactividad=300, vida_maxima=3600, espera_maxima=30):
+        """
+        Args:
+            config: Parámetros para pymysql.connect o conectar_sqlite
+                    (por defecto los del motor de config_database)
+            min_conexiones: Conexiones que se abren al crear el pool
+            max_conexiones: Límite de conexiones abiertas al mismo tiempo
+            tiempo_inactividad: Segundos que una conexión puede estar libre antes de cerrarse
+            vida_maxima: Segundos de vida de una conexión antes de reemplazarla
+            espera_maxima: Segundos que se espera una conexión libre antes de fallar
+        """
+        if min_conexiones < 0 or max_conexiones < 1 or min_conexiones > max_conexiones:
+            raise ValueError("Tamaños de pool inválidos")
+
+        self.config = _config_conexion(config)
+        self.interruptor = interruptor_para(self.config)
+        self.min_conexiones = min_conexiones
+        self.max_conexiones = max_conexiones
+        self.tiempo_inactividad = tiempo_inactividad
+        self.vida_maxima = vida_maxima
+        self.espera_maxima = espera_maxima
+
+        self._condicion = threading.Condition()
+        # Conexiones libres: (conexion, momento de creación, último uso)
+        self._libres = deque()
+        # Momento de creación de cada conexión abierta, prestada o libre
+        self._creadas = {}
+        self._cerrado = False
+
+        for _ in range(min_conexiones):
+            conexion = _conectar(self.config, self.interruptor)
+            ahora = time.monotonic()
+            self._creadas[id(conexion)] = ahora
+            self._libres.append((conexion, ahora, ahora))
+
+    def _descartar(self, conexion):
+        self._creadas.pop(id(conexion), None)
+        try:
+            conexion.close()
+        except Error:
+            pass
+
+    def _vencida(self, creada, ultimo_uso, ahora):
+        return (ahora - creada > self.vida_maxima
+                or ahora - ultimo_uso > self.tiempo_inactividad)
+
+    def obtener(self):
+        """
+        Entrega una conexión viva del pool, abriendo una nueva si hace falta
+
+        El tiempo de espera se registra en las métricas de instrumentación.
+
+        Returns:
+            Conexión (PyMySQL o SQLite) lista para usar
+
+        Raises:
+            PoolAgotadoError: Si no hay conexiones libres tras espera_maxima segundos
+            CircuitoAbiertoError: Si el servidor viene fallando y el circuito está abierto
+        """
+        inicio = time.perf_counter()
+        try:
+            return self._obtener()
+        finally:
+            metricas.registrar_espera_conexion(time.perf_counter() - inicio)
+
+    def _obtener(self):
+        limite = time.monotonic() + self.espera_maxima
+
+        while True:
+            self.interruptor.permitir()
+            candidata = None
+            reserva = None
+
+            with self._condicion:
+                while candidata is None and reserva is None:
+                    if self._cerrado:
+                        raise pymysql.err.InterfaceError("El pool de conexiones está cerrado")
+
+                    if self._libres:
+                        conexion, creada, ultimo_uso = self._libres.pop()
+                        if self._vencida(creada, ultimo_uso, time.monotonic()):
+                            self._descartar(conexion)
+                        else:
+                            candidata = conexion
+                    elif len(self._creadas) < self.max_conexiones:
+                        # Reservar el lugar antes de soltar el lock para conectar
+                        reserva = object()
+                        self._creadas[id(reserva)] = time.monotonic()
+                    else:
+                        restante = limite - time.monotonic()
+                        if restante <= 0:
+                            raise PoolAgotadoError(
+                                "obtener una conexión del pool", None,
+                                f"No hay conexiones libres (máximo {self.max_conexiones})")
+                        self._condicion.wait(restante)
+
+            # El ping y la conexión se hacen fuera del lock para no bloquear a otros hilos
+            if candidata is not None:
+                try:
+                    candidata.ping(reconnect=False)
+                    self.interruptor.exito()
+                    return candidata
+                except Error:
+                    self.interruptor.fallo()
+                    with self._condicion:
+                        self._descartar(candidata)
+                        self._condicion.notify()
+                    continue
+
+            conexion = None
+            try:
+                conexion = _conectar(self.config, self.interruptor)
+                return conexion
+            finally:
+                with self._condicion:
+                    del self._creadas[id(reserva)]
+                    if conexion is not None:
+                        self._creadas[id(conexion)] = time.monotonic()
+                    self._condicion.notify()
+
+    def liberar(self, conexion):
+        """
+        Devuelve una conexión al pool
+
+        Deshace cualquier transacción pendiente para que el próximo
+        usuario reciba la conexión en un estado limpio.
+
+        Args:
+            conexion: Conexión obtenida previamente con obtener()
+        """
+        with self._condicion:
+            creada = self._creadas.get(id(conexion))
+        if creada is None:
+            return
+
+        reutilizable = (not self._cerrado and conexion.open
+                        and time.monotonic() - creada <= self.vida_maxima)
+        if reutilizable:
+            try:
+                conexion.rollback()
+            except Error:
+                reutilizable = False
+
+        with self._condicion:
+            if reutilizable and not self._cerrado:
+                self._libres.append((conexion, creada, time.monotonic()))
+            else:
+                self._descartar(conexion)
+            self._condicion.notify()
+
+    @contextmanager
+    def conexion(self):
+        """
+        Context manager que obtiene una conexión y la libera al salir
+        """
+        conexion = self.obtener()
+        try:
+            yield conexion
+        finally:
+            self.liberar(conexion)
+
+    def cerrar(self):
+        """
+        Cierra todas las conexiones libres y rechaza nuevas solicitudes
+        """
+        with self._condicion:
+            self._cerrado = True
+            while self._libres:
+                conexion, _, _ = self._libres.pop()
+                self._descartar(conexion)
+            self._condicion.notify_all()
+
+    def estado(self):
+        """
+        Retorna un diccionario con el uso actual del pool
+        """
+        with self._condicion:
+            return {
+                'abiertas': len(self._creadas),
+                'libres': len(self._libres),
+                'en_uso': len(self._creadas) - len(self._libres),
+                'max_conexiones': self.max_conexiones
+            }
+
+
+class ConexionAgrupada:
+    """
+    Conexión que entrega la sesión persistente mientras agrupa transacciones
+
+    Cada operación corre dentro de un SAVEPOINT: su commit() lo libera sin
+    confirmar y su rollback() vuelve a él, de modo que un error deshace solo
+    esa operación y la transacción sigue abierta hasta confirmar_grupo().
+    El resto de los atributos son los de la conexión real.
+    """
+
+    def __init__(self, sesion, conexion):
+        self.sesion = sesion
+        self.conexion = conexion
+        self.pendiente = False
+
+    def __getattr__(self, nombre):
+        return getattr(self.conexion, nombre)
+
+    def _ejecutar(self, sql):
+        with self.conexion.cursor() as cursor:
+            cursor.execute(sql)
+
+    def abrir(self):
+        """Abre la transacción del grupo (si hace falta) y el SAVEPOINT de la operación"""
+        if not self.conexion.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+            self.conexion.begin()
+        self._ejecutar("SAVEPOINT operacion")
+        self.pendiente = True
+
+    def commit(self):
+        if self.pendiente:
+            self._ejecutar("RELEASE SAVEPOINT operacion")
+            self.pendiente = False
+            self.sesion.operaciones_grupo += 1
+
+    def rollback(self):
+        if not self.pendiente:
+            return
+        self.pendiente = False
+        try:
+            self._ejecutar("ROLLBACK TO SAVEPOINT operacion")
+            self._ejecutar("RELEASE SAVEPOINT operacion")
+        except Error:
+            # El servidor ya deshizo toda la transacción (deadlock, conexión
+            # perdida): las operaciones anteriores del grupo se perdieron
+            self.sesion.grupo_perdido = True
+            try:
+                self.conexion.rollback()
+            except Error:
+                self.sesion.cerrar()
+
+
+class SesionPersistente:
+    """
+    Una sola conexión, abierta en el primer uso y reutilizada por todas las
+    operaciones del hilo que activó la sesión
+
+    A diferencia del pool, no hace ping en cada entrega: solo comprueba la
+    conexión si estuvo más de `intervalo_keepalive` segundos sin usarse (por
+    ejemplo, mientras el menú espera al usuario) y la reabre si el servidor
+    la cerró o si una operación anterior la dejó rota.
+
+    Con `agrupar` en True las operaciones no confirman cada una su
+    transacción (ver ConexionAgrupada): quien agrupa llama a confirmar_grupo()
+    cada tantas operaciones, y si `grupo_perdido` pasa a True debe repetir
+    las operaciones del grupo, porque el servidor deshizo la transacción.
+    """
+
+    def __init__(self, config=None, intervalo_keepalive=60):
+        """
+        Args:
+            config: Parámetros para pymysql.connect o conectar_sqlite
+                    (por defecto los del motor de config_database)
+            intervalo_keepalive: Segundos sin uso tras los cuales se hace ping antes de entregarla
+        """
+        self.config = _config_conexion(config)
+        self.interruptor = interruptor_para(self.config)
+        self.intervalo_keepalive = intervalo_keepalive
+        self.hilo = threading.get_ident()
+        self.reconexiones = 0
+        self.agrupar = False
+        self.operaciones_grupo = 0
+        self.grupo_perdido = False
+        self._conexion = None
+        self._agrupada = None
+        self._ultimo_uso = 0.0
+        self._prestada = False
+
+    def disponible(self):
+        """Indica si la sesión puede atender al hilo actual (si no, se usa el pool)"""
+        return threading.get_ident() == self.hilo and not self._prestada
+
+    def obtener(self):
+        """
+        Entrega la conexión de la sesión, abriéndola o reabriéndola si hace falta
+        """
+        inicio = time.perf_counter()
+        try:
+            self.interruptor.permitir()
+            conexion = self._conexion
+            # Con el circuito en prueba también se comprueba, para poder cerrarlo
+            if conexion is not None and conexion.open and (
+                    time.monotonic() - self._ultimo_uso > self.intervalo_keepalive
+                    or self.interruptor.estado != self.interruptor.CERRADO):
+                try:
+                    conexion.ping(reconnect=False)
+                    self.interruptor.exito()
+                except Error:
+                    self.interruptor.fallo()
+                    self.cerrar()
+            if self._conexion is None or not self._conexion.open:
+                if self._conexion is not None:
+                    self.reconexiones += 1
+                    # La transacción del grupo se fue con la conexión anterior
+                    if self.operaciones_grupo:
+                        self.grupo_perdido = True
+                self._conexion = None
+                self._conexion = _conectar(self.config, self.interruptor)
+            if self.agrupar:
+                self._agrupada = ConexionAgrupada(self, self._conexion)
+                try:
+                    self._agrupada.abrir()
+                except Error:
+                    self._agrupada = None
+                    raise
+                self._prestada = True
+                return self._agrupada
+            self._prestada = True
+            return self._conexion
+        finally:
+            metricas.registrar_espera_conexion(time.perf_counter() - inicio)
+
+    def es_propia(self, conexion):
+        return conexion is self._conexion or (conexion is not None and conexion is self._agrupada)
+
+    def liberar(self, conexion):
+        """
+        Recupera la conexión tras una operación, deshaciendo la transacción
+        pendiente (si la hay) como hace el pool al liberar; si agrupa, solo
+        deshace lo que la operación dejó sin confirmar
+        """
+        self._prestada = False
+        self._ultimo_uso = time.monotonic()
+        if conexion is self._agrupada:
+            self._agrupada = None
+            if conexion.open:
+                conexion.rollback()
+            return
+        if not conexion.open:
+            return
+        if conexion.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+            try:
+                conexion.rollback()
+            except Error:
+                self.cerrar()
+
+    def confirmar_grupo(self):
+        """Confirma la transacción con las operaciones agrupadas hasta ahora"""
+        if self._conexion is not None and self._conexion.open:
+            self._conexion.commit()
+        self.operaciones_grupo = 0
+        self.grupo_perdido = False
+
+    def deshacer_grupo(self):
+        """Deshace las operaciones agrupadas que todavía no se confirmaron"""
+        try:
+            if self._conexion is not None and self._conexion.open:
+                self._conexion.rollback()
+        except Error:
+            self.cerrar()
+        self.operaciones_grupo = 0
+        self.grupo_perdido = False
+
+    def cerrar(self):
+        """Cierra la conexión; la próxima operación abre una nueva"""
+        conexion, self._conexion = self._conexion, None
+        if conexion is not None:
+            try:
+                conexion.close()
+            except Error:
+                pass
+
+
+def medir_retraso_replica(conexion):
+    """
+    Retorna los segundos de retraso de la réplica, 0 si el servidor no está
+    configurado como réplica, o None si la replicación está detenida
+
+    Requiere el privilegio REPLICATION CLIENT.
+    """
+    with conexion.cursor(DictCursor) as cursor:
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+        except pymysql.err.ProgrammingError:
+            # MySQL anterior a 8.0.22 y MariaDB
+            cursor.execute("SHOW SLAVE STATUS")
+        estado = cursor.fetchone()
+    if not estado:
+        return 0
+    return estado.get('Seconds_Behind_Source', estado.get('Seconds_Behind_Master'))
+
+
+class Replica:
+    """
+    Una réplica de lectura con su propio pool, creado en el primer uso
+    """
+
+    def __init__(self, config, pool_config):
+        self.config = config
+        self.nombre = f"{config['host']}:{config.get('port', 3306)}"
+        # Sin conexiones iniciales: una réplica caída no impide arrancar
+        self._pool_config = {**pool_config, 'min_conexiones': 0}
+        self.pool = None
+        self.retraso = None
+        self.disponible = True
+        self.verificada = float('-inf')
+
+    def obtener_pool(self):
+        if self.pool is None:
+            self.pool = PoolConexiones(self.config, **self._pool_config)
+        return self.pool
+
+    def en_uso(self):
+        return self.pool.estado()['en_uso'] if self.pool is not None else 0
+
+    def actualizar(self, disponible, retraso=None):
+        self.disponible = disponible
+        self.retraso = retraso
+        self.verificada = time.monotonic()
+
+
+class EnrutadorLecturas:
+    """
+    Reparte las lecturas entre las réplicas que están al día
+
+    Cada réplica se verifica (conexión y retraso) como mucho una vez cada
+    `intervalo_verificacion` segundos, aprovechando una conexión que se iba a
+    entregar igual. Las réplicas caídas o con más de `retraso_maximo` segundos
+    de retraso se saltean hasta la próxima verificación. Si ninguna sirve,
+    obtener() retorna None y la lectura va al primario.
+    """
+
+    ESTRATEGIAS = ('round_robin', 'menos_conexiones')
+
+    def __init__(self, replicas, estrategia='round_robin', retraso_maximo=5,
+                 intervalo_verificacion=5, ventana_escrituras=5, pool_config=None):
+        """
+        Args:
+            replicas: Lista de configuraciones de PyMySQL, una por réplica
+            estrategia: 'round_robin' o 'menos_conexiones' (la réplica con menos conexiones en uso)
+            retraso_maximo: Segundos de retraso de replicación tolerados
+            intervalo_verificacion: Segundos entre verificaciones de cada réplica
+            ventana_escrituras: Segundos durante los que un hilo que usó el primario
+                                sigue leyendo del primario (leer lo que escribió)
+            pool_config: Tamaños del pool de cada réplica (por defecto los del primario)
+        """
+        if estrategia not in self.ESTRATEGIAS:
+            raise ValueError(f"Estrategia inválida: {estrategia!r} (opciones: {', '.join(self.ESTRATEGIAS)})")
+        pool_config = pool_config if pool_config is not None else get_pool_config()
+        self.replicas = [Replica(_config_conexion(config), pool_config) for config in replicas]
+        self.estrategia = estrategia
+        self.retraso_maximo = retraso_maximo
+        self.intervalo_verificacion = intervalo_verificacion
+        self.ventana_escrituras = ventana_escrituras
+        self._lock = threading.Lock()
+        self._siguiente = 0
+        # Réplica de cada conexión entregada, para devolverla a su pool
+        self._prestadas = {}
+        self._local = threading.local()
+
+    def registrar_escritura(self):
+        """Marca que el hilo actual usó el primario (posible escritura)"""
+        self._local.ultima_escritura = time.monotonic()
+
+    def leer_del_primario(self):
+        """Indica si las lecturas del hilo actual deben ir al primario"""
+        if getattr(self._local, 'forzar_primario', 0):
+            return True
+        ultima = getattr(self._local, 'ultima_escritura', None)
+        return ultima is not None and time.monotonic() - ultima < self.ventana_escrituras
+
+    @contextmanager
+    def forzar_primario(self):
+        self._local.forzar_primario = getattr(self._local, 'forzar_primario', 0) + 1
+        try:
+            yield
+        finally:
+            self._local.forzar_primario -= 1
+
+    def _candidatas(self):
+        ahora = time.monotonic()
+        with self._lock:
+            candidatas = [replica for replica in self.replicas
+                          if (replica.disponible and (replica.retraso is None
+                                                      or replica.retraso <= self.retraso_maximo))
+                          or ahora - replica.verificada > self.intervalo_verificacion]
+            if self.estrategia == 'menos_conexiones':
+                return sorted(candidatas, key=Replica.en_uso)
+            inicio = self._siguiente % len(candidatas) if candidatas else 0
+            self._siguiente += 1
+            return candidatas[inicio:] + candidatas[:inicio]
+
+    def _verificar(self, replica, conexion):
+        """Mide el retraso si toca y retorna True si la réplica puede atender lecturas"""
+        if time.monotonic() - replica.verificada <= self.intervalo_verificacion:
+            return True
+        retraso = medir_retraso_replica(conexion)
+        al_dia = retraso is not None and retraso <= self.retraso_maximo
+        replica.actualizar(al_dia, retraso)
+        return al_dia
+
+    def obtener(self):
+        """
+        Entrega una conexión de una réplica al día, o None si no hay ninguna
+        """
+        for replica in self._candidatas():
+            try:
+                pool = replica.obtener_pool()
+                conexion = pool.obtener()
+            except Error:
+                replica.actualizar(False)
+                continue
+            try:
+                utilizable = self._verificar(replica, conexion)
+            except Error:
+                replica.actualizar(False)
+                utilizable = False
+            if not utilizable:
+                pool.liberar(conexion)
+                continue
+            with self._lock:
+                self._prestadas[id(conexion)] = replica
+            return conexion
+        return None
+
+    def liberar(self, conexion):
+        """
+        Devuelve la conexión al pool de su réplica
+
+        Returns:
+            False si la conexión no es de una réplica
+        """
+        with self._lock:
+            replica = self._prestadas.pop(id(conexion), None)
+        if replica is None:
+            return False
+        replica.pool.liberar(conexion)
+        return True
+
+    def estado(self):
+        """
+        Retorna el estado de cada réplica: disponibilidad, retraso y uso del pool
+        """
+        return {
+            replica.nombre: {
+                'disponible': replica.disponible,
+                'retraso_segundos': replica.retraso,
+                'pool': replica.pool.estado() if replica.pool is not None else None
+            }
+            for replica in self.replicas
+        }
+
+    def cerrar(self):
+        for replica in self.replicas:
+            if replica.pool is not None:
+                replica.pool.cerrar()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_sesion = None
+_enrutador = None
+
+
+def obtener_pool():
+    """
+    Retorna el pool compartido, creándolo en el primer uso con la configuración del .env
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PoolConexiones(**get_pool_config())
+    return _pool
+
+
+def obtener_enrutador():
+    """
+    Retorna el enrutador de lecturas, creándolo en el primer uso con la
+    configuración del .env, o None si no hay réplicas configuradas (o el
+    motor es SQLite)
+    """
+    global _enrutador
+    if _enrutador is None:
+        config = get_replicas_config()
+        if not config['replicas'] or get_motor() == 'sqlite':
+            return None
+        with _pool_lock:
+            if _enrutador is None:
+                _enrutador = EnrutadorLecturas(**config)
+    return _enrutador
+
+
+def obtener_conexion(lectura=False):
+    """
+    Obtiene la conexión de la sesión persistente, si hay una activa para este
+    hilo y está libre, o una del pool compartido
+
+    Args:
+        lectura: Si es True, la conexión solo se usará para leer y puede ser
+                 de una réplica (salvo que el hilo haya escrito hace poco)
+    """
+    sesion = _sesion
+    if sesion is not None and sesion.disponible():
+        return sesion.obtener()
+    enrutador = obtener_enrutador()
+    if enrutador is not None:
+        if not lectura:
+            enrutador.registrar_escritura()
+        elif not enrutador.leer_del_primario():
+            conexion = enrutador.obtener()
+            if conexion is not None:
+                return conexion
+    return obtener_pool().obtener()
+
+
+def liberar_conexion(conexion):
+    """
+    Devuelve una conexión a la sesión persistente, a su réplica o al pool compartido
+    """
+    sesion = _sesion
+    if sesion is not None and sesion.es_propia(conexion):
+        sesion.liberar(conexion)
+    elif _enrutador is None or not _enrutador.liberar(conexion):
+        obtener_pool().liberar(conexion)
+
+
+@contextmanager
+def leer_del_primario():
+    """
+    Context manager para secuencias que deben leer lo que acaban de escribir:
+    dentro del bloque, las lecturas del hilo actual van al primario
+    """
+    enrutador = obtener_enrutador()
+    if enrutador is None:
+        yield
+        return
+    with enrutador.forzar_primario():
+        yield
+
+
+@contextmanager
+def sesion_persistente(intervalo_keepalive=None):
+    """
+    Context manager que hace que las operaciones del hilo actual usen una
+    única conexión (ver SesionPersistente) hasta salir del bloque
+
+    La conexión se abre recién en la primera operación. Una operación anidada
+    (por ejemplo, mientras se recorre un SSCursor) usa el pool como siempre.
+    Si el hilo ya tiene una sesión activa, el bloque la reutiliza.
+
+    Args:
+        intervalo_keepalive: Segundos sin uso antes de comprobar la conexión
+                             (por defecto DB_SESION_KEEPALIVE)
+
+    Yields:
+        La SesionPersistente activa
+    """
+    global _sesion
+    if _sesion is not None:
+        if _sesion.hilo != threading.get_ident():
+            raise RuntimeError("Ya hay una sesión persistente activa en otro hilo")
+        yield _sesion
+        return
+    if intervalo_keepalive is None:
+        intervalo_keepalive = get_sesion_config()['intervalo_keepalive']
+    _sesion = sesion = SesionPersistente(intervalo_keepalive=intervalo_keepalive)
+    try:
+        yield sesion
+    finally:
+        _sesion = None
+        sesion.cerrar()
+
+
+def cerrar_pool():
+    """
+    Cierra el pool compartido y los de las réplicas (se vuelven a crear en el próximo uso)
+    """
+    global _pool, _enrutador
+    with _pool_lock:
+        if _pool is not None:
+            _pool.cerrar()
+            _pool = None
+        if _enrutador is not None:
+            _enrutador.cerrar()
+            _enrutador = None
+
+
+def iterar_en_servidor(query, params=None, tamaño_lectura=1000, clase_cursor=None, lectura=True):
+    """
+    Genera bloques de filas de una consulta leída con un SSCursor (sin buffer en el cliente)
+
+    La memoria usada es constante sin importar la cantidad de filas. Si quien
+    llama deja de iterar antes del final, la conexión se cierra en lugar de
+    leer el resto del resultado, salvo que sea la de la sesión persistente:
+    esa se conserva (con la transacción del grupo, si agrupa) y las filas
+    pendientes se leen y descartan. Los errores de PyMySQL se propagan.
+
+    Args:
+        tamaño_lectura: Filas por bloque (fetchmany)
+        clase_cursor: Subclase de SSCursor a usar (por defecto SSCursorInstrumentado)
+        lectura: Si es True, la consulta puede ir a una réplica (ver obtener_conexion)
+    """
+    conexion = obtener_conexion(lectura)
+    sesion = _sesion
+    de_la_sesion = sesion is not None and sesion.es_propia(conexion)
+    cursor = None
+    completo = False
+    try:
+        cursor = conexion.cursor(clase_cursor or SSCursorInstrumentado)
+        cursor.execute(query, params or None)
+        while True:
+            filas = cursor.fetchmany(tamaño_lectura)
+            if not filas:
+                break
+            yield filas
+        completo = True
+    finally:
+        try:
+            if completo or de_la_sesion:
+                # Cerrar el cursor lee y descarta las filas pendientes
+                if cursor:
+                    cursor.close()
+            else:
+                # Más rápido que leer todas las filas pendientes
+                conexion.close()
+        finally:
+            liberar_conexion(conexion)
@@ -0,0 +1,105 @@
+"""
+Presentación en texto de los resultados de la biblioteca
+Cada función arma el texto completo de un listado y lo escribe con una sola
+llamada a write, en lugar de un print por línea: con miles de filas en una
+terminal (que vacía el buffer en cada salto de línea) la diferencia es grande.
+"""
+import sys
+
+
+def escribir(lineas, salida=None):
+    """
+    Escribe las líneas en la salida (stdout por defecto) con un único write
+    """
+    salida = salida or sys.stdout
+    salida.write('\n'.join(lineas) + '\n')
+    salida.flush()
+
+
+def formatear_libros(libros):
+    """Líneas del listado de listar_libros"""
+    lineas = [f"\n📚 Libros encontrados: {len(libros)}", "-" * 80]
+    agregar = lineas.append
+    for libro in libros:
+        agregar(f"   [{libro.id}] {libro.titulo}")
+        agregar(f"       Autor: {libro.autor} | Estado: {libro.estado} | "
+                f"Categoría: {libro.categoria or 'Sin categoría'}")
+        if libro.isbn:
+            agregar(f"       ISBN: {libro.isbn}")
+        if libro.editorial:
+            agregar(f"       Editorial: {libro.editorial}")
+        if libro.año_publicacion:
+            agregar(f"       Año: {libro.año_publicacion}")
+        if libro.paginas:
+            agregar(f"       Páginas: {libro.paginas}")
+        if libro.ubicacion:
+            agregar(f"       Ubicación: {libro.ubicacion}")
+        agregar("")
+    return lineas
+
+
+def formatear_busqueda(termino, libros):
+    """Líneas de los resultados de buscar_libro"""
+    lineas = [f"\n🔍 Resultados de búsqueda para '{termino}': {len(libros)} encontrados", "-" * 80]
+    agregar = lineas.append
+    for libro in libros:
+        agregar(f"   [{libro.id}] {libro.titulo} - {libro.autor}")
+        agregar(f"       Estado: {libro.estado} | Categoría: {libro.categoria or 'Sin categoría'}")
+        if libro.ubicacion:
+            agregar(f"       Ubicación: {libro.ubicacion}")
+        agregar("")
+    return lineas
+
+
+def formatear_prestamos(prestamos):
+    """Líneas del listado de listar_prestamos"""
+    lineas = [f"\n📋 Préstamos encontrados: {len(prestamos)}", "-" * 80]
+    agregar = lineas.append
+    for p in prestamos:
+        agregar(f"   [{p.id}] {p.titulo} - {p.autor}")
+        agregar(f"       Prestado a: {p.persona_prestamo} | Fecha préstamo: {p.fecha_prestamo} | "
+                f"Estado: {p.estado}")
+        if p.fecha_devolucion_esperada:
+            agregar(f"       Devolución esperada: {p.fecha_devolucion_esperada}")
+        if p.fecha_devolucion_real:
+            agregar(f"       Devolución real: {p.fecha_devolucion_real}")
+        agregar("")
+    return lineas
+
+
+def formatear_personas(personas):
+    """Líneas del listado de personas_con_mas_prestamos"""
+    lineas = [f"\n👤 Personas con más préstamos: {len(personas)}", "-" * 60]
+    for persona in personas:
+        limite = f" | Límite: {persona.limite_prestamos}" if persona.limite_prestamos else ""
+        lineas.append(f"   [{persona.id}] {persona.nombre}: {persona.total_prestamos} préstamos "
+                      f"({persona.prestamos_activos} activos){limite}")
+    return lineas
+
+
+def formatear_categorias(categorias):
+    """Líneas del listado de listar_categorias"""
+    lineas = [f"\n📂 Categorías disponibles: {len(categorias)}", "-" * 60]
+    for categoria in categorias:
+        lineas.append(f"   [{categoria.id}] {categoria.nombre}")
+        if categoria.descripcion:
+            lineas.append(f"       {categoria.descripcion}")
+        lineas.append("")
+    return lineas
+
+
+def formatear_estadisticas(estadisticas):
+    """Líneas del resumen de estadisticas_biblioteca"""
+    lineas = [
+        "\n📊 ESTADÍSTICAS DE LA BIBLIOTECA",
+        "=" * 60,
+        f"📚 Total de libros: {estadisticas['total_libros']}",
+        f"📂 Total de categorías: {estadisticas['total_categorias']}",
+        f"📋 Préstamos activos: {estadisticas['prestamos_activos']}",
+        "\n📊 Libros por estado:",
+    ]
+    lineas.extend(f"   {estado}: {cantidad}" for estado, cantidad in estadisticas['por_estado'].items())
+    lineas.append("\n📊 Libros por categoría:")
+    lineas.extend(f"   {categoria}: {cantidad}"
+                  for categoria, cantidad in estadisticas['por_categoria'].items() if cantidad > 0)
+    return lineas
@@ -0,0 +1,279 @@
+"""
+Política de fallos de las llamadas a la base de datos
+- Excepciones estructuradas (ErrorBaseDatos y subclases) en lugar de mensajes
+  impresos: quien llama decide si muestra el error, lo reintenta o lo propaga
+- Reintentos con espera exponencial y aleatoria ante errores transitorios
+  (conexión perdida, deadlock 1213, espera de bloqueo 1205)
+- Corte de circuito por servidor: tras varios fallos de conexión seguidos se
+  deja de intentar conectar durante un tiempo y las llamadas fallan al instante
+
+Las excepciones heredan de pymysql.Error, así que el código que ya captura
+los errores de PyMySQL las sigue capturando.
+"""
+import asyncio
+import functools
+import random
+import threading
+import time
+
+import pymysql
+from pymysql.constants import CR
+from config_database import get_resiliencia_config
+
+# Errores de MySQL que se resuelven repitiendo la transacción
+ER_LOCK_WAIT_TIMEOUT = 1205
+ER_LOCK_DEADLOCK = 1213
+ERRORES_CONFLICTO = (ER_LOCK_WAIT_TIMEOUT, ER_LOCK_DEADLOCK)
+
+# Errores del cliente cuando no se puede conectar o se cortó la conexión
+ERRORES_CONEXION = (CR.CR_CONNECTION_ERROR, CR.CR_CONN_HOST_ERROR, CR.CR_SERVER_GONE_ERROR,
+                    CR.CR_SERVER_LOST, CR.CR_SERVER_LOST_EXTENDED)
+
+
+class ErrorBaseDatos(pymysql.err.Error):
+    """
+    Error de una operación de la biblioteca contra la base de datos
+
+    Attributes:
+        operacion: Qué se estaba haciendo ("listar libros", "prestar el libro 3", ...)
+        codigo: Código de error de MySQL o del cliente, o None
+        mensaje: Mensaje original del error
+        intentos: Cantidad de ejecuciones antes de darse por vencido
+    """
+
+    # Si repetir la llamada puede resolver el error
+    transitorio = False
+
+    def __init__(self, operacion, codigo, mensaje, intentos=1):
+        super().__init__(codigo, mensaje)
+        self.operacion = operacion
+        self.codigo = codigo
+        self.mensaje = mensaje
+        self.intentos = intentos
+
+    def __str__(self):
+        texto = f"Error al {self.operacion}: {self.mensaje}"
+        if self.codigo is not None:
+            texto += f" (código {self.codigo})"
+        if self.intentos > 1:
+            texto += f" tras {self.intentos} intentos"
+        return texto
+
+
+class ErrorConexion(ErrorBaseDatos):
+    """No se pudo conectar con el servidor o se perdió la conexión"""
+    transitorio = True
+
+
+class TiempoAgotadoError(ErrorConexion):
+    """El servidor no respondió dentro del tiempo límite (connect/read/write_timeout)"""
+
+
+class CircuitoAbiertoError(ErrorConexion):
+    """El servidor falló varias veces seguidas y no se intenta conectar por un tiempo"""
+    transitorio = False
+
+
+class ConflictoTransaccionError(ErrorBaseDatos):
+    """MySQL abortó la transacción por un deadlock o por esperar demasiado un bloqueo"""
+    transitorio = True
+
+
+class ErrorConsulta(ErrorBaseDatos):
+    """Error de la sentencia o de los datos (sintaxis, clave duplicada, FK, ...)"""
+
+
+def _tiempo_agotado(error, mensaje):
+    causa = error.__cause__ or error.__context__
+    return isinstance(causa, TimeoutError) or 'timed out' in mensaje
+
+
+def convertir_error(error, operacion, intentos=1):
+    """
+    Convierte un error de PyMySQL en el ErrorBaseDatos que corresponde
+
+    Los ErrorBaseDatos se retornan sin cambios.
+    """
+    if isinstance(error, ErrorBaseDatos):
+        return error
+    codigo = error.args[0] if error.args and isinstance(error.args[0], int) else None
+    if codigo is not None and len(error.args) > 1:
+        mensaje = str(error.args[1])
+    else:
+        mensaje = str(error)
+
+    if codigo in ERRORES_CONFLICTO:
+        clase = ConflictoTransaccionError
+    elif codigo in ERRORES_CONEXION or isinstance(error, pymysql.err.InterfaceError):
+        clase = TiempoAgotadoError if _tiempo_agotado(error, mensaje) else ErrorConexion
+    else:
+        clase = ErrorConsulta
+    return clase(operacion, codigo, mensaje, intentos)
+
+
+def espera_reintento(intento, espera_base=None, espera_maxima=None):
+    """
+    Segundos a esperar antes del intento siguiente a `intento`: crecen al doble
+    en cada intento hasta espera_maxima, con ±50 % aleatorio para que varios
+    hilos no reintenten todos a la vez
+    """
+    config = get_resiliencia_config()
+    espera_base = config['espera_base'] if espera_base is None else espera_base
+    espera_maxima = config['espera_maxima'] if espera_maxima is None else espera_maxima
+    return min(espera_maxima, espera_base * 2 ** (intento - 1)) * random.uniform(0.5, 1.5)
+
+
+def operacion_bd(descripcion, idempotente=True, reintentar=True):
+    """
+    Decorador de las funciones de la biblioteca: convierte los errores de
+    PyMySQL en ErrorBaseDatos y repite la llamada ante errores transitorios
+
+    Los conflictos (deadlock, espera de bloqueo) se reintentan siempre, porque
+    MySQL ya deshizo la transacción. La conexión perdida o el tiempo agotado
+    solo se reintentan si la operación es idempotente: una escritura pudo
+    haberse confirmado antes del corte.
+
+    Args:
+        descripcion: Qué hace la función, para el mensaje del error ("listar libros")
+        idempotente: Si repetirla tras un corte no tiene efectos adicionales
+        reintentar: False para funciones que ya reintentan sus transacciones
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            intentos = get_resiliencia_config()['intentos'] if reintentar else 1
+            intento = 1
+            while True:
+                try:
+                    return funcion(*args, **kwargs)
+                except pymysql.err.Error as e:
+                    error = convertir_error(e, descripcion, intento)
+                    if not _repetir(error, intento, intentos, idempotente):
+                        if error is e:
+                            raise
+                        raise error from e
+                time.sleep(espera_reintento(intento))
+                intento += 1
+        return envoltura
+    return decorador
+
+
+def operacion_bd_async(descripcion, idempotente=True, reintentar=True):
+    """
+    Versión de operacion_bd para las corrutinas de conexion_async.py: los
+    mismos errores, la misma cantidad de intentos y la misma espera, con
+    asyncio.sleep para no bloquear el event loop
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        async def envoltura(*args, **kwargs):
+            intentos = get_resiliencia_config()['intentos'] if reintentar else 1
+            intento = 1
+            while True:
+                try:
+                    return await funcion(*args, **kwargs)
+                except pymysql.err.Error as e:
+                    error = convertir_error(e, descripcion, intento)
+                    if not _repetir(error, intento, intentos, idempotente):
+                        if error is e:
+                            raise
+                        raise error from e
+                await asyncio.sleep(espera_reintento(intento))
+                intento += 1
+        return envoltura
+    return decorador
+
+
+def _repetir(error, intento, intentos, idempotente):
+    """Indica si operacion_bd debe repetir la llamada que falló con `error`"""
+    return (intento < intentos and error.transitorio
+            and (idempotente or isinstance(error, ConflictoTransaccionError)))
+
+
+class Interruptor:
+    """
+    Corte de circuito de las conexiones a un servidor
+
+    - cerrado: se conecta normalmente y se cuentan los fallos seguidos
+    - abierto: tras `fallos_maximos` fallos, toda conexión falla al instante
+      con CircuitoAbiertoError durante `tiempo_abierto` segundos
+    - semiabierto: pasado ese tiempo se deja pasar un solo intento de prueba;
+      si conecta, el circuito se cierra, y si falla, vuelve a abrirse
+    """
+
+    CERRADO = 'cerrado'
+    ABIERTO = 'abierto'
+    SEMIABIERTO = 'semiabierto'
+
+    def __init__(self, nombre, fallos_maximos=5, tiempo_abierto=30):
+        self.nombre = nombre
+        self.fallos_maximos = fallos_maximos
+        self.tiempo_abierto = tiempo_abierto
+        self._lock = threading.Lock()
+        self.estado = self.CERRADO
+        self.fallos = 0
+        self._desde = 0.0
+
+    def permitir(self):
+        """
+        Autoriza un intento de conexión
+
+        Raises:
+            CircuitoAbiertoError: Si el circuito está abierto (o ya hay una prueba en curso)
+        """
+        with self._lock:
+            if self.estado == self.CERRADO:
+                return
+            transcurrido = time.monotonic() - self._desde
+            # Una prueba que nunca informó su resultado no bloquea el circuito para siempre
+            if transcurrido >= self.tiempo_abierto:
+                self.estado = self.SEMIABIERTO
+                self._desde = time.monotonic()
+                return
+            restante = self.tiempo_abierto - transcurrido
+        raise CircuitoAbiertoError(
+            f"conectar con {self.nombre}", None,
+            f"circuito abierto tras {self.fallos} fallos seguidos; "
+            f"próximo intento en {restante:.0f} s")
+
+    def exito(self):
+        with self._lock:
+            self.estado = self.CERRADO
+            self.fallos = 0
+
+    def fallo(self):
+        with self._lock:
+            self.fallos += 1
+            if self.estado == self.SEMIABIERTO or self.fallos >= self.fallos_maximos:
+                self.estado = self.ABIERTO
+                self._desde = time.monotonic()
+
+
+_interruptores = {}
+_interruptores_lock = threading.Lock()
+
+
+def interruptor_para(config):
+    """
+    Retorna el Interruptor compartido del servidor de `config` (host y puerto,
+    o el archivo con SQLite), de modo que el pool, la sesión persistente y
+    las réplicas de un mismo servidor comparten el estado del circuito
+    """
+    if 'ruta' in config:
+        nombre = config['ruta']
+    else:
+        nombre = f"{config.get('host', 'localhost')}:{config.get('port', 3306)}"
+    with _interruptores_lock:
+        interruptor = _interruptores.get(nombre)
+        if interruptor is None:
+            politica = get_resiliencia_config()
+            interruptor = _interruptores[nombre] = Interruptor(
+                nombre, politica['fallos_circuito'], politica['tiempo_circuito_abierto'])
+        return interruptor
+
+
+def estado_circuitos():
+    """Retorna {servidor: {'estado', 'fallos'}} de todos los circuitos"""
+    with _interruptores_lock:
+        return {nombre: {'estado': interruptor.estado, 'fallos': interruptor.fallos}
+                for nombre, interruptor in _interruptores.items()}
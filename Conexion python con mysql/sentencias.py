@@ -0,0 +1,64 @@
+"""
+Armado de las sentencias de libros que dependen de los campos pedidos
+El UPDATE de actualizar_libro se arma una sola vez por combinación de
+campos y queda en caché, junto con las columnas calculadas (isbn13) que
+acompañan a cada cambio.
+"""
+import functools
+
+from isbn import isbn13
+
+# Columnas de `libros` que se pueden modificar con actualizar_libro
+CAMPOS_ACTUALIZABLES_LIBRO = ('titulo', 'autor', 'isbn', 'editorial', 'año_publicacion',
+                              'categoria_id', 'paginas', 'estado', 'ubicacion', 'notas')
+# Columnas que no se modifican directamente: se calculan a partir de otro campo
+CAMPOS_CALCULADOS_LIBRO = {'isbn13': ('isbn', isbn13)}
+
+
+@functools.lru_cache(maxsize=128)
+def sql_actualizar_libro(campos):
+    """
+    Retorna el UPDATE de libros para una tupla de campos, armándolo una sola vez
+
+    Args:
+        campos: Tupla de nombres de CAMPOS_ACTUALIZABLES_LIBRO, en el orden de los valores
+
+    Raises:
+        ValueError: Si algún campo no es actualizable
+    """
+    return f"UPDATE libros SET {asignaciones_libro(campos)} WHERE id = %s"
+
+
+@functools.lru_cache(maxsize=128)
+def asignaciones_libro(campos):
+    """
+    Retorna la cláusula SET ("campo = %s, ...") para una tupla de campos de libros
+
+    Raises:
+        ValueError: Si algún campo no es actualizable
+    """
+    invalidos = [campo for campo in campos
+                 if campo not in CAMPOS_ACTUALIZABLES_LIBRO and campo not in CAMPOS_CALCULADOS_LIBRO]
+    if invalidos or not campos:
+        raise ValueError(f"Campos no actualizables: {invalidos}")
+    return ', '.join(f"{campo} = %s" for campo in campos)
+
+
+def con_campos_calculados(campos, valores):
+    """
+    Agrega a un cambio de libros las columnas calculadas que dependen de los
+    campos modificados (isbn13 cuando cambia isbn)
+
+    Args:
+        campos: Tupla de campos de CAMPOS_ACTUALIZABLES_LIBRO
+        valores: Valores de esos campos, en el mismo orden
+
+    Returns:
+        Tupla (campos, valores) con las columnas calculadas al final
+    """
+    valores = list(valores)
+    for calculado, (origen, calcular) in CAMPOS_CALCULADOS_LIBRO.items():
+        if origen in campos:
+            campos += (calculado,)
+            valores.append(calcular(valores[campos.index(origen)]))
+    return campos, valores
@@ -0,0 +1,81 @@
+"""
+Pruebas de buscar_libro: texto completo (FTS5 en SQLite, FULLTEXT en
+MySQL), la búsqueda con LIKE cuando ninguna palabra llega al índice,
+prefijo e ISBN
+
+Corren sobre la base de las pruebas (ver base_pruebas.py).
+
+Uso: python -m pytest test_busqueda.py
+"""
+import unittest
+
+# base_pruebas elige el motor: se importa antes que la biblioteca
+from base_pruebas import PruebaBiblioteca, en_silencio
+from conexion_pymysql import _consulta_busqueda, _modo_busqueda, agregar_libro, buscar_libro, eliminar_libro
+
+
+class PruebaBusqueda(PruebaBiblioteca):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.libros = {
+            'teoria': en_silencio(agregar_libro, "Teoría Zanahórica del Universo", "Ofelia Quirquincho",
+                                  isbn='978-84-376-0494-7'),
+            'manual': en_silencio(agregar_libro, "Manual Zanahórico de Jardinería", "Ofelia Quirquincho"),
+            'otro': en_silencio(agregar_libro, "Crónica Quirquinchesca", "Benito Zanahorio-Pérez"),
+            'corto': en_silencio(agregar_libro, "Yo y tú en Zq", "Ana Zq"),
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        for libro_id in cls.libros.values():
+            en_silencio(eliminar_libro, libro_id)
+
+    def buscar(self, termino, modo):
+        return {libro.id for libro in buscar_libro(termino, modo, mostrar=False)}
+
+    def test_texto_exige_todas_las_palabras(self):
+        self.assertEqual(self.buscar("zanahórica teoría", 'texto'), {self.libros['teoria']})
+
+    def test_texto_acepta_prefijos_y_busca_en_el_autor(self):
+        self.assertEqual(self.buscar("Quirquinch", 'texto'),
+                         {self.libros['teoria'], self.libros['manual'], self.libros['otro']})
+
+    def test_texto_ignora_los_acentos(self):
+        self.assertEqual(self.buscar("zanahorico jardineria", 'texto'), {self.libros['manual']})
+
+    def test_texto_con_guion_interno(self):
+        self.assertEqual(self.buscar("Zanahorio-Pérez", 'texto'), {self.libros['otro']})
+
+    def test_texto_con_operadores_no_falla(self):
+        self.assertEqual(self.buscar('"Crónica" +Quirquinchesca*', 'texto'), {self.libros['otro']})
+
+    def test_texto_sin_palabras_indexables_usa_contiene(self):
+        # "Zq" es más corto que la longitud mínima de FULLTEXT; en FTS5 solo
+        # quedan sin palabras los términos hechos de operadores
+        self.assertEqual(_consulta_busqueda("Zq", 'texto')[0], "libros l")
+        self.assertEqual(_consulta_busqueda("+* -", 'texto', sqlite=True)[0], "libros l")
+        self.assertEqual(self.buscar("Zq", 'texto'), {self.libros['corto']})
+
+    def test_prefijo(self):
+        self.assertEqual(self.buscar("Manual Zanah", 'prefijo'), {self.libros['manual']})
+        self.assertEqual(self.buscar("Zanahórico", 'prefijo'), set())
+
+    def test_prefijo_escapa_los_comodines(self):
+        self.assertEqual(self.buscar("Yo_y", 'prefijo'), set())
+        self.assertEqual(self.buscar("Yo%", 'prefijo'), set())
+
+    def test_isbn_en_cualquier_formato(self):
+        for termino in ('978-84-376-0494-7', '9788437604947', '84-376-0494-X', '843760494x'):
+            with self.subTest(termino=termino):
+                self.assertEqual(self.buscar(termino, 'auto'), {self.libros['teoria']})
+
+    def test_modo_automatico(self):
+        self.assertEqual(_modo_busqueda("84-376-0494-X"), 'isbn')
+        self.assertEqual(_modo_busqueda("Yo y tú"), 'prefijo')
+        self.assertEqual(_modo_busqueda("the Zanahórica"), 'texto')
+
+
+if __name__ == "__main__":
+    unittest.main()
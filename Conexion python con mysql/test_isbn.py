@@ -0,0 +1,106 @@
+"""
+Pruebas de la normalización de ISBN y de la migración que completa isbn13
+(los libros repetidos con distinto formato de ISBN)
+
+La migración corre sobre un archivo SQLite propio con una tabla libros
+anterior a isbn13.
+
+Uso: python -m pytest test_isbn.py
+"""
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from isbn import es_isbn, isbn13
+from migraciones import _indice_existe, _m005_isbn13, completar_isbn13
+from motor_sqlite import conectar_sqlite
+
+
+class PruebaIsbn13(unittest.TestCase):
+
+    def test_isbn13_con_y_sin_guiones(self):
+        self.assertEqual(isbn13('978-0-306-40615-7'), 9780306406157)
+        self.assertEqual(isbn13('978 0 306 40615 7'), 9780306406157)
+        self.assertEqual(isbn13('9780306406157'), 9780306406157)
+
+    def test_isbn10_se_convierte_con_prefijo_978(self):
+        self.assertEqual(isbn13('0-306-40615-2'), 9780306406157)
+        self.assertEqual(isbn13('0306406152'), 9780306406157)
+
+    def test_isbn10_con_x_final(self):
+        self.assertEqual(isbn13('84-376-0494-X'), 9788437604947)
+        self.assertEqual(isbn13('843760494x'), 9788437604947)
+
+    def test_digito_de_control_incorrecto(self):
+        self.assertIsNone(isbn13('978-0-306-40615-8'))
+        self.assertIsNone(isbn13('0-306-40615-3'))
+
+    def test_textos_que_no_son_isbn(self):
+        for texto in (None, '', 'sin isbn', '12345', '978030640615X', '030640615Y'):
+            with self.subTest(texto=texto):
+                self.assertIsNone(isbn13(texto))
+
+    def test_es_isbn_no_comprueba_el_digito_de_control(self):
+        self.assertTrue(es_isbn('978-0-306-40615-8'))
+        self.assertTrue(es_isbn('84-376-0494-x'))
+        self.assertFalse(es_isbn('978-0-306'))
+        self.assertFalse(es_isbn('Rayuela'))
+
+
+class PruebaMigracionIsbn13(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp(prefix='biblioteca_isbn_')
+        self.conexion = conectar_sqlite(os.path.join(self.directorio, 'isbn.db'))
+        self.cursor = self.conexion.cursor()
+        self.cursor.execute("CREATE TABLE libros (id INTEGER PRIMARY KEY, titulo TEXT, isbn TEXT)")
+        self.cursor.executemany("INSERT INTO libros (id, titulo, isbn) VALUES (%s, %s, %s)", [
+            (1, "Rayuela", '84-376-0494-X'),
+            (2, "Rayuela (otra carga)", '9788437604947'),
+            (3, "Ficciones", '978-0-306-40615-7'),
+            (4, "Sin ISBN", None),
+            (5, "ISBN inválido", '978-0-306-40615-8'),
+            (6, "Rayuela (tercera carga)", '978-84-376-0494-7'),
+        ])
+        self.conexion.commit()
+
+    def tearDown(self):
+        self.cursor.close()
+        self.conexion.close()
+        shutil.rmtree(self.directorio, ignore_errors=True)
+
+    def migrar(self):
+        with contextlib.redirect_stdout(io.StringIO()) as salida:
+            _m005_isbn13(self.cursor)
+        return salida.getvalue()
+
+    def isbn13_por_libro(self):
+        self.cursor.execute("SELECT id, isbn13 FROM libros ORDER BY id")
+        return dict(self.cursor.fetchall())
+
+    def test_el_primer_libro_conserva_el_isbn13_repetido(self):
+        salida = self.migrar()
+        self.assertEqual(self.isbn13_por_libro(), {
+            1: 9788437604947, 2: None, 3: 9780306406157, 4: None, 5: None, 6: None
+        })
+        self.assertIn("los libros 2, 6 repiten el del libro 1", salida)
+        self.assertTrue(_indice_existe(self.cursor, 'libros', 'uq_isbn13'))
+
+    def test_completa_en_varios_lotes(self):
+        # Sin el índice único todavía: los repetidos reciben isbn13 hasta el paso siguiente
+        self.cursor.execute("ALTER TABLE libros ADD COLUMN isbn13 INTEGER NULL")
+        self.assertEqual(completar_isbn13(self.cursor, tamaño_lote=2), 4)
+        self.assertEqual(self.isbn13_por_libro()[6], 9788437604947)
+
+    def test_se_puede_repetir(self):
+        self.migrar()
+        self.migrar()
+        self.assertEqual(self.isbn13_por_libro()[1], 9788437604947)
+        self.assertEqual(self.isbn13_por_libro()[2], None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+Pruebas del modo lote de biblioteca.py (--batch): las operaciones de un
+grupo se confirman juntas y una que falla vuelve a su SAVEPOINT sin
+deshacer las demás
+
+Corren sobre la base de las pruebas (ver base_pruebas.py).
+
+Uso: python -m pytest test_lote.py
+"""
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+# base_pruebas elige el motor: se importa antes que la biblioteca
+from base_pruebas import PruebaBiblioteca, consultar
+from biblioteca import crear_parser, ejecutar_lote, leer_lote
+
+# Categoría que no existe: el INSERT del libro viola la clave foránea
+LINEAS = '''
+agregar "Lote {marca}: uno" "Autor de Lotes"
+agregar "Lote {marca}: inválido" "Autor de Lotes" --categoria 999999
+# comentario
+agregar "Lote {marca}: dos" "Autor de Lotes"   # otro comentario
+agregar "Lote {marca}: tres" "Autor de Lotes"
+'''
+
+
+class PruebaLote(PruebaBiblioteca):
+
+    @classmethod
+    def tearDownClass(cls):
+        consultar("DELETE FROM libros WHERE autor = %s", ("Autor de Lotes",))
+
+    def leer(self, marca):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', encoding='utf-8', delete=False) as archivo:
+            archivo.write(LINEAS.format(marca=marca))
+        try:
+            return leer_lote(archivo.name, crear_parser())
+        finally:
+            os.remove(archivo.name)
+
+    def ejecutar(self, marca, **opciones):
+        errores = io.StringIO()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(errores):
+            resumen = ejecutar_lote(self.leer(marca), **opciones)
+        return resumen, errores.getvalue()
+
+    def titulos(self, marca):
+        filas = consultar("SELECT titulo FROM libros WHERE titulo LIKE %s ORDER BY id", (f"Lote {marca}:%",))
+        return [fila[0] for fila in filas]
+
+    def test_lee_las_lineas_del_archivo(self):
+        operaciones = self.leer("lectura")
+        self.assertEqual([numero for numero, _ in operaciones], [2, 3, 5, 6])
+        self.assertEqual(operaciones[2][1].titulo, "Lote lectura: dos")
+        self.assertEqual(operaciones[1][1].categoria, 999999)
+
+    def test_la_operacion_fallida_se_deshace_sola(self):
+        resumen, errores = self.ejecutar("seguir", por_transaccion=10, seguir=True)
+        self.assertEqual(resumen['operaciones'], 4)
+        self.assertEqual(resumen['errores'], 1)
+        self.assertEqual(resumen['transacciones'], 1)
+        self.assertIn("Línea 3", errores)
+        self.assertEqual(self.titulos("seguir"), ["Lote seguir: uno", "Lote seguir: dos", "Lote seguir: tres"])
+
+    def test_sin_seguir_se_confirma_lo_anterior_al_error(self):
+        resumen, _ = self.ejecutar("parar", por_transaccion=10)
+        self.assertEqual(resumen['operaciones'], 2)
+        self.assertEqual(resumen['errores'], 1)
+        self.assertEqual(self.titulos("parar"), ["Lote parar: uno"])
+
+    def test_una_transaccion_cada_por_transaccion_operaciones(self):
+        resumen, _ = self.ejecutar("grupos", por_transaccion=2, seguir=True)
+        # uno y dos en la primera, tres en la segunda
+        self.assertEqual(resumen['transacciones'], 2)
+        self.assertEqual(len(self.titulos("grupos")), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
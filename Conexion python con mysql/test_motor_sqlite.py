@@ -0,0 +1,128 @@
+"""
+Pruebas del motor SQLite: traducción de las sentencias al dialecto de
+SQLite, transacciones abiertas por FOR UPDATE y las escrituras, y errores
+convertidos a los de PyMySQL
+
+Usan un archivo SQLite propio, sin las tablas de la biblioteca.
+
+Uso: python -m pytest test_motor_sqlite.py
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+
+import pymysql
+from pymysql.constants import ER, SERVER_STATUS
+
+from motor_sqlite import conectar_sqlite, traducir
+
+
+class PruebaTraducir(unittest.TestCase):
+
+    def test_marcadores_de_parametros(self):
+        sql, _ = traducir("SELECT * FROM libros WHERE id = %s AND titulo = %s")
+        self.assertEqual(sql, "SELECT * FROM libros WHERE id = ? AND titulo = ?")
+
+    def test_porcentaje_literal_solo_con_parametros(self):
+        # Igual que PyMySQL: %% es un % cuando hay parámetros y queda tal cual si no
+        sql, _ = traducir("SELECT * FROM libros WHERE titulo LIKE 'a%%' AND id = %s")
+        self.assertEqual(sql, "SELECT * FROM libros WHERE titulo LIKE 'a%' AND id = ?")
+        sql, _ = traducir("SELECT * FROM libros WHERE titulo LIKE 'a%%'", False)
+        self.assertEqual(sql, "SELECT * FROM libros WHERE titulo LIKE 'a%%'")
+
+    def test_for_update_se_quita_y_abre_transaccion(self):
+        sql, abre_transaccion = traducir("SELECT id FROM libros WHERE id = %s\n        FOR UPDATE\n")
+        self.assertEqual(sql, "SELECT id FROM libros WHERE id = ?")
+        self.assertTrue(abre_transaccion)
+
+    def test_for_update_en_minusculas(self):
+        sql, abre_transaccion = traducir("select id from libros for update")
+        self.assertEqual(sql, "select id from libros")
+        self.assertTrue(abre_transaccion)
+
+    def test_lectura_no_abre_transaccion(self):
+        _, abre_transaccion = traducir("SELECT id FROM libros WHERE titulo = %s")
+        self.assertFalse(abre_transaccion)
+
+    def test_escrituras_abren_transaccion(self):
+        for sql in ("INSERT INTO libros (titulo) VALUES (%s)",
+                    "  update libros SET estado = %s",
+                    "DELETE FROM libros WHERE id = %s",
+                    "REPLACE INTO categorias (nombre) VALUES (%s)"):
+            with self.subTest(sql=sql):
+                self.assertTrue(traducir(sql)[1])
+
+    def test_insert_ignore(self):
+        sql, abre_transaccion = traducir("\n  INSERT IGNORE INTO categorias (nombre) VALUES (%s)")
+        self.assertEqual(sql, "\n  INSERT OR IGNORE INTO categorias (nombre) VALUES (?)")
+        self.assertTrue(abre_transaccion)
+
+    def test_texto_dentro_de_la_sentencia_no_se_traduce(self):
+        sql, abre_transaccion = traducir("SELECT 'for update' AS nota, %s")
+        self.assertEqual(sql, "SELECT 'for update' AS nota, ?")
+        self.assertFalse(abre_transaccion)
+
+
+class PruebaConexionSQLite(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp(prefix='biblioteca_motor_')
+        self.conexion = conectar_sqlite(os.path.join(self.directorio, 'motor.db'))
+        with self.conexion.cursor() as cursor:
+            cursor.execute("""
+                CREATE TABLE libros (
+                    id INTEGER PRIMARY KEY, titulo TEXT NOT NULL UNIQUE, fecha DATE
+                )
+            """)
+            cursor.execute("INSERT INTO libros (titulo, fecha) VALUES (%s, %s)",
+                           ("Rayuela", date(1963, 6, 28)))
+        self.conexion.commit()
+
+    def tearDown(self):
+        self.conexion.close()
+        shutil.rmtree(self.directorio, ignore_errors=True)
+
+    def en_transaccion(self):
+        return bool(self.conexion.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS)
+
+    def test_for_update_abre_la_transaccion(self):
+        with self.conexion.cursor() as cursor:
+            cursor.execute("SELECT id, fecha FROM libros WHERE titulo = %s", ("Rayuela",))
+            self.assertFalse(self.en_transaccion())
+            cursor.execute("SELECT id, fecha FROM libros WHERE titulo = %s FOR UPDATE", ("Rayuela",))
+            self.assertEqual(cursor.fetchone(), (1, date(1963, 6, 28)))
+            self.assertTrue(self.en_transaccion())
+        self.conexion.rollback()
+        self.assertFalse(self.en_transaccion())
+
+    def test_rollback_deshace_la_escritura(self):
+        with self.conexion.cursor() as cursor:
+            cursor.execute("INSERT INTO libros (titulo) VALUES (%s)", ("Ficciones",))
+            self.assertTrue(self.en_transaccion())
+            self.conexion.rollback()
+            cursor.execute("SELECT COUNT(*) FROM libros")
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_insert_ignore_omite_duplicados(self):
+        with self.conexion.cursor() as cursor:
+            filas = cursor.execute("INSERT IGNORE INTO libros (titulo) VALUES (%s)", ("Rayuela",))
+        self.conexion.commit()
+        self.assertEqual(filas, 0)
+
+    def test_clave_duplicada_es_error_1062(self):
+        with self.conexion.cursor() as cursor:
+            with self.assertRaises(pymysql.err.IntegrityError) as contexto:
+                cursor.execute("INSERT INTO libros (titulo) VALUES (%s)", ("Rayuela",))
+        self.assertEqual(contexto.exception.args[0], ER.DUP_ENTRY)
+
+    def test_tabla_inexistente_es_error_1146(self):
+        with self.conexion.cursor() as cursor:
+            with self.assertRaises(pymysql.err.ProgrammingError) as contexto:
+                cursor.execute("SELECT * FROM prestamos WHERE id = %s", (1,))
+        self.assertEqual(contexto.exception.args[0], ER.NO_SUCH_TABLE)
+
+
+if __name__ == "__main__":
+    unittest.main()
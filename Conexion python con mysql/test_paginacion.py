@@ -0,0 +1,92 @@
+"""
+Pruebas de la paginación por keyset de libros y préstamos: recorrer las
+páginas con despues_de entrega todas las filas una sola vez y en el mismo
+orden que la consulta sin límite, también cuando se repiten el título o la
+fecha de préstamo
+
+Corren sobre la base de las pruebas (ver base_pruebas.py).
+
+Uso: python -m pytest test_paginacion.py
+"""
+import unittest
+
+# base_pruebas elige el motor: se importa antes que la biblioteca
+from base_pruebas import PRUEBAS_MYSQL, PruebaBiblioteca, consultar, en_silencio
+from archivado import archivar_prestamos
+from conexion_pymysql import (agregar_libro, clave_pagina_libro, clave_pagina_prestamo, devolver_libro,
+                              eliminar_libro, iterar_libros, iterar_prestamos, listar_libros,
+                              listar_prestamos, prestar_libro)
+
+
+def recorrer_paginas(listar, clave, tamaño, **filtros):
+    """Retorna los ids de todas las páginas pedidas con despues_de"""
+    ids = []
+    despues_de = None
+    while True:
+        pagina = listar(limite=tamaño, despues_de=despues_de, mostrar=False, **filtros)
+        ids.extend(fila.id for fila in pagina)
+        if len(pagina) < tamaño:
+            return ids
+        despues_de = clave(pagina[-1])
+
+
+class PruebaPaginacion(PruebaBiblioteca):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Títulos repetidos: el id desempata dentro de cada página y entre páginas
+        titulos = ["Paginación repetida"] * 5 + ["Paginación única", "Paginación %_ comodines"]
+        cls.libros = [en_silencio(agregar_libro, titulo, "Autor de Páginas") for titulo in titulos]
+        # Préstamos del mismo día; el primero, devuelto y archivado (archivar no
+        # se limita a los préstamos de la prueba: en MySQL queda sin archivar)
+        cls.prestamos = [en_silencio(prestar_libro, libro_id, "Lectora de Páginas")
+                         for libro_id in cls.libros]
+        en_silencio(devolver_libro, cls.libros[0])
+        if not PRUEBAS_MYSQL:
+            en_silencio(archivar_prestamos, dias=-1)
+
+    @classmethod
+    def tearDownClass(cls):
+        for libro_id in cls.libros:
+            en_silencio(eliminar_libro, libro_id)
+        consultar("DELETE FROM personas WHERE nombre = %s", ("Lectora de Páginas",))
+
+    def test_paginas_de_libros(self):
+        todos = [libro.id for libro in listar_libros(mostrar=False)]
+        self.assertTrue(set(self.libros) <= set(todos))
+        for tamaño in (1, 2, 3, len(todos), len(todos) + 1):
+            with self.subTest(tamaño=tamaño):
+                self.assertEqual(recorrer_paginas(listar_libros, clave_pagina_libro, tamaño), todos)
+
+    def test_paginas_de_libros_filtrados(self):
+        filtro = {'estado': 'Prestado', 'mostrar_todos': False}
+        prestados = [libro.id for libro in listar_libros(mostrar=False, **filtro)]
+        self.assertTrue(set(self.libros[1:]) <= set(prestados))
+        self.assertNotIn(self.libros[0], prestados)
+        self.assertEqual(recorrer_paginas(listar_libros, clave_pagina_libro, 2, **filtro), prestados)
+
+    def test_iterar_libros(self):
+        todos = [libro.id for libro in listar_libros(mostrar=False)]
+        self.assertEqual([libro.id for libro in iterar_libros(tamaño_pagina=2)], todos)
+
+    def test_paginas_de_prestamos(self):
+        todos = [prestamo.id for prestamo in listar_prestamos(mostrar=False)]
+        self.assertTrue(set(self.prestamos[1:]) <= set(todos))
+        for tamaño in (1, 3, len(todos) + 1):
+            with self.subTest(tamaño=tamaño):
+                self.assertEqual(recorrer_paginas(listar_prestamos, clave_pagina_prestamo, tamaño), todos)
+        self.assertEqual([prestamo.id for prestamo in iterar_prestamos(tamaño_pagina=2)], todos)
+
+    def test_paginas_de_prestamos_activos(self):
+        activos = [prestamo.id for prestamo in listar_prestamos(mostrar=False, activos=True)]
+        self.assertEqual(recorrer_paginas(listar_prestamos, clave_pagina_prestamo, 2, activos=True), activos)
+
+    def test_paginas_del_historial(self):
+        todos = [prestamo.id for prestamo in listar_prestamos(mostrar=False, historico=True)]
+        self.assertTrue(set(self.prestamos) <= set(todos))
+        self.assertEqual(recorrer_paginas(listar_prestamos, clave_pagina_prestamo, 2, historico=True), todos)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+"""
+Prueba de estrés de préstamos y devoluciones concurrentes
+Varios hilos prestan y devuelven los mismos libros a la vez y al final se
+verifican los invariantes de la base (ver benchmark_biblioteca.estres_prestamos).
+
+Corre sobre la base de las pruebas (ver base_pruebas.py).
+
+Uso: python -m pytest test_prestamos_concurrentes.py
+"""
+import contextlib
+import io
+import unittest
+
+# base_pruebas elige el motor: se importa antes que la biblioteca
+from base_pruebas import PruebaBiblioteca
+from benchmark_biblioteca import estres_prestamos
+
+
+class PruebaPrestamosConcurrentes(PruebaBiblioteca):
+
+    def test_invariantes_tras_prestar_y_devolver_en_hilos(self):
+        with contextlib.redirect_stdout(io.StringIO()) as salida:
+            violaciones = estres_prestamos(hilos=8, libros=3, operaciones=100)
+        self.assertEqual(violaciones, [], salida.getvalue())
+        self.assertIn("Todos los invariantes se cumplen", salida.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
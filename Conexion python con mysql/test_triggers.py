@@ -0,0 +1,124 @@
+"""
+Pruebas de los triggers: contadores de estadisticas_contadores (migraciones
+3 y 4) y total de préstamos de cada persona (migración 7), comparados con
+el conteo sobre las tablas reales después de cada operación
+
+Corren sobre la base de las pruebas (ver base_pruebas.py).
+
+Uso: python -m pytest test_triggers.py
+"""
+import unittest
+
+# base_pruebas elige el motor: se importa antes que la biblioteca
+from base_pruebas import PRUEBAS_MYSQL, PruebaBiblioteca, consultar, en_silencio
+from archivado import archivar_prestamos
+from conexion_pymysql import (actualizar_libro, agregar_categoria, agregar_libro, devolver_libro,
+                              eliminar_libro, prestar_libro, unir_personas)
+from migraciones import CONTEO_ESTADISTICAS
+
+
+# archivar_prestamos no se limita a los préstamos de la prueba
+SOLO_BASE_TEMPORAL = unittest.skipIf(PRUEBAS_MYSQL, "archiva todos los préstamos devueltos de la base")
+
+
+class PruebaTriggers(PruebaBiblioteca):
+
+    def setUp(self):
+        self.categoria = en_silencio(agregar_categoria, f"Triggers {self._testMethodName}")
+        self.libros = []
+
+    def tearDown(self):
+        for libro_id in self.libros:
+            en_silencio(eliminar_libro, libro_id)
+        consultar("DELETE FROM categorias WHERE id = %s", (self.categoria,))
+        consultar("DELETE FROM personas WHERE nombre IN (%s, %s, %s, %s)",
+                  ("Lectora de Contadores", "Lector de Triggers", "Persona Duplicada", "Persona Duplicda"))
+
+    def assertContadoresConsistentes(self):
+        def como_dict(filas):
+            return {(tipo, clave): valor for tipo, clave, valor in filas if valor != 0}
+        guardados = como_dict(consultar("SELECT tipo, clave, valor FROM estadisticas_contadores"))
+        self.assertEqual(guardados, como_dict(consultar(CONTEO_ESTADISTICAS)))
+
+    def assertTotalesDePersonasConsistentes(self):
+        distintas = consultar("""
+            SELECT p.nombre, p.total_prestamos,
+                   (SELECT COUNT(*) FROM prestamos_todos t WHERE t.persona_id = p.id)
+            FROM personas p
+            WHERE p.total_prestamos <>
+                  (SELECT COUNT(*) FROM prestamos_todos t WHERE t.persona_id = p.id)
+        """)
+        self.assertEqual(distintas, [])
+
+    def total_prestamos(self, nombre):
+        filas = consultar("SELECT total_prestamos FROM personas WHERE nombre = %s", (nombre,))
+        return filas[0][0] if filas else None
+
+    def agregar(self, titulo):
+        libro_id = en_silencio(agregar_libro, titulo, "Autora de Triggers", categoria_id=self.categoria)
+        self.libros.append(libro_id)
+        return libro_id
+
+    def test_contadores_de_libros(self):
+        libro_id = self.agregar("Contadores: alta")
+        self.assertContadoresConsistentes()
+        en_silencio(actualizar_libro, libro_id, estado='En reparación', categoria_id=None)
+        self.assertContadoresConsistentes()
+        en_silencio(actualizar_libro, libro_id, estado='Disponible', categoria_id=self.categoria)
+        self.assertContadoresConsistentes()
+        en_silencio(eliminar_libro, libro_id)
+        self.assertContadoresConsistentes()
+
+    def test_contadores_de_prestamos(self):
+        libro_id = self.agregar("Contadores: préstamo")
+        en_silencio(prestar_libro, libro_id, "Lectora de Contadores")
+        self.assertContadoresConsistentes()
+        en_silencio(devolver_libro, libro_id)
+        self.assertContadoresConsistentes()
+        en_silencio(prestar_libro, libro_id, "Lectora de Contadores")
+        # Borrar el libro borra en cascada su préstamo activo
+        en_silencio(eliminar_libro, libro_id)
+        self.assertContadoresConsistentes()
+
+    @SOLO_BASE_TEMPORAL
+    def test_total_de_prestamos_por_persona(self):
+        persona = "Lector de Triggers"
+        primero, segundo = self.agregar("Personas: primero"), self.agregar("Personas: segundo")
+        en_silencio(prestar_libro, primero, persona)
+        en_silencio(prestar_libro, segundo, persona)
+        self.assertEqual(self.total_prestamos(persona), 2)
+        en_silencio(devolver_libro, primero)
+
+        # Archivar mueve el préstamo a prestamos_historico: el total no cambia
+        en_silencio(archivar_prestamos, dias=-1)
+        self.assertEqual(consultar("SELECT COUNT(*) FROM prestamos_historico h "
+                                   "WHERE h.libro_id = %s", (primero,)), [(1,)])
+        self.assertEqual(self.total_prestamos(persona), 2)
+        self.assertTotalesDePersonasConsistentes()
+
+        # Borrar un libro descuenta sus préstamos, vigentes o archivados
+        en_silencio(eliminar_libro, primero)
+        self.assertEqual(self.total_prestamos(persona), 1)
+        self.assertTotalesDePersonasConsistentes()
+        en_silencio(eliminar_libro, segundo)
+        self.assertEqual(self.total_prestamos(persona), 0)
+        self.assertTotalesDePersonasConsistentes()
+
+    @SOLO_BASE_TEMPORAL
+    def test_unir_personas_suma_los_totales(self):
+        libros = [self.agregar(f"Unir: {numero}") for numero in range(3)]
+        en_silencio(prestar_libro, libros[0], "Persona Duplicada")
+        en_silencio(prestar_libro, libros[1], "Persona Duplicda")
+        en_silencio(prestar_libro, libros[2], "Persona Duplicda")
+        en_silencio(devolver_libro, libros[2])
+        en_silencio(archivar_prestamos, dias=-1)
+
+        self.assertEqual(en_silencio(unir_personas, "Persona Duplicda", "Persona Duplicada"), 2)
+        self.assertIsNone(self.total_prestamos("Persona Duplicda"))
+        self.assertEqual(self.total_prestamos("Persona Duplicada"), 3)
+        self.assertTotalesDePersonasConsistentes()
+        self.assertContadoresConsistentes()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+Barrido de préstamos vencidos
+Marca como 'Vencido' los préstamos cuya fecha de devolución esperada ya pasó,
+con un UPDATE por lote sobre el índice (estado, fecha_devolucion_esperada)
+
+Uso: python vencimientos.py [--cada SEGUNDOS]
+"""
+import argparse
+import threading
+import time
+from datetime import date
+
+import sys
+
+from pool_conexiones import obtener_conexion, liberar_conexion, cerrar_pool
+from resiliencia import ErrorBaseDatos, operacion_bd
+
+
+@operacion_bd("marcar préstamos vencidos")
+def marcar_prestamos_vencidos(fecha=None, tamaño_lote=1000, mostrar=True):
+    """
+    Marca como vencidos los préstamos activos con devolución esperada anterior a la fecha
+
+    Cada lote se bloquea, actualiza y confirma en su propia transacción corta,
+    de modo que el barrido no retiene bloqueos sobre toda la tabla.
+
+    Args:
+        fecha: Fecha de corte (por defecto hoy); vence lo esperado antes de esa fecha
+        tamaño_lote: Préstamos por transacción
+        mostrar: Si es True, imprime el resumen
+
+    Returns:
+        Lista de tuplas (id, libro_id, persona_prestamo, fecha_devolucion_esperada)
+        de los préstamos marcados
+
+    Raises:
+        ErrorBaseDatos: Si falla la operación en la base de datos
+    """
+    fecha = fecha or date.today()
+    conexion = None
+    cursor = None
+    vencidos = []
+
+    try:
+        conexion = obtener_conexion()
+        cursor = conexion.cursor()
+
+        while True:
+            cursor.execute("""
+                SELECT id, libro_id, persona_prestamo, fecha_devolucion_esperada
+                FROM prestamos
+                WHERE estado = 'Prestado' AND fecha_devolucion_esperada < %s
+                ORDER BY fecha_devolucion_esperada, id
+                LIMIT %s
+                FOR UPDATE
+            """, (fecha, tamaño_lote))
+            lote = cursor.fetchall()
+            if not lote:
+                break
+
+            marcadores = ', '.join(['%s'] * len(lote))
+            cursor.execute(
+                f"UPDATE prestamos SET estado = 'Vencido' WHERE id IN ({marcadores})",
+                [prestamo[0] for prestamo in lote])
+            conexion.commit()
+            vencidos.extend(lote)
+
+            if len(lote) < tamaño_lote:
+                break
+
+        if mostrar:
+            print(f"⏰ Préstamos marcados como vencidos: {len(vencidos)}")
+            for prestamo_id, libro_id, persona, esperada in vencidos[:20]:
+                print(f"   [{prestamo_id}] Libro {libro_id} - {persona} (esperado: {esperada})")
+            if len(vencidos) > 20:
+                print(f"   ... y {len(vencidos) - 20} más")
+        return vencidos
+    finally:
+        if cursor:
+            cursor.close()
+        if conexion:
+            liberar_conexion(conexion)
+
+
+def programar_barrido_vencidos(intervalo=3600, tamaño_lote=1000):
+    """
+    Ejecuta marcar_prestamos_vencidos periódicamente en un hilo en segundo plano
+
+    Args:
+        intervalo: Segundos entre barridos
+        tamaño_lote: Préstamos por transacción
+
+    Returns:
+        threading.Event que detiene el barrido al llamar a .set()
+    """
+    detener = threading.Event()
+
+    def ciclo():
+        while not detener.is_set():
+            try:
+                marcar_prestamos_vencidos(tamaño_lote=tamaño_lote, mostrar=False)
+            except ErrorBaseDatos as e:
+                # El barrido sigue: el próximo intento retoma lo que quedó pendiente
+                print(f"❌ {e}", file=sys.stderr)
+            detener.wait(intervalo)
+
+    threading.Thread(target=ciclo, name='barrido-vencidos', daemon=True).start()
+    return detener
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Marca los préstamos vencidos")
+    parser.add_argument('--cada', type=float, help="Repetir cada N segundos (sin esto, una sola vez)")
+    parser.add_argument('--lote', type=int, default=1000)
+    args = parser.parse_args()
+
+    try:
+        marcar_prestamos_vencidos(tamaño_lote=args.lote)
+        while args.cada:
+            time.sleep(args.cada)
+            marcar_prestamos_vencidos(tamaño_lote=args.lote)
+    except ErrorBaseDatos as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cerrar_pool()